@@ -0,0 +1,185 @@
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import asyncio
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from PIL import Image, features
+from config_handler import ArtifactSettings, ConfigHandler
+
+ARTIFACTS_DIR = os.path.join("logs", "runs")
+
+# Shared by every run in the process, so disk writes and compression stay off the event loop
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="artifacts")
+
+# Retention sweeps run at most this often per process and directory
+PRUNE_INTERVAL_SECONDS = 300
+_last_prune: Dict[str, float] = {}
+
+# Runs written to this recently may still be going, in this process or another, so are never pruned
+ACTIVE_RUN_SECONDS = 3600
+
+def _write_file(path: str, data: bytes, compress: bool):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=6) if compress else data)
+
+def _write_webp(path: str, png: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.open(io.BytesIO(png)).save(path, format="WEBP", lossless=True, method=2)
+
+def _write_gif(agent, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    agent.create_history_gif(output_path=path)
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def _last_modified(path: str) -> float:
+    # A directory's own mtime only moves when entries are added to it, not to its subdirectories
+    mtimes = [os.path.getmtime(path)]
+    for root, dirs, names in os.walk(path):
+        mtimes.extend(os.path.getmtime(os.path.join(root, name)) for name in dirs + names)
+    return max(mtimes)
+
+def prune(
+    directory: str = ARTIFACTS_DIR,
+    max_mb: Optional[int] = None,
+    max_age_days: Optional[int] = None,
+    keep: Optional[str] = None,
+    active_seconds: float = ACTIVE_RUN_SECONDS
+) -> int:
+    """
+    Delete the oldest runs until the rest are within the age and total size limits. Returns how many went.
+
+    `keep` and any run written to in the last `active_seconds` are left alone, even if that
+    leaves the directory over its size limit.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            entries.append((_last_modified(path), _size(path), path))
+        except OSError:
+            # Removed by another process while we were looking
+            continue
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    cutoff = now - max_age_days * 86400 if max_age_days is not None else None
+    removed = 0
+    for mtime, size, path in entries:
+        too_old = cutoff is not None and mtime < cutoff
+        too_big = max_mb is not None and total > max_mb * 1024 * 1024
+        if not too_old and not too_big:
+            break
+        if path == keep or mtime > now - active_seconds:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+class ArtifactWriter:
+    """
+    Everything one run leaves behind, in its own directory: logs/runs/<time>_<run_id>/.
+
+    Writes are handed to a background thread and return their final path straight away;
+    flush() waits for them. After a flush, old runs are evicted past the configured size and
+    age limits, at most every PRUNE_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, run_id: str, settings: Optional[ArtifactSettings] = None, directory: str = ARTIFACTS_DIR):
+        self.settings = settings or ArtifactSettings()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run_id}")
+        self._pending: List[Future] = []
+
+    def write_json(self, name: str, data: Any) -> str:
+        return self.write_text(name, json.dumps(data, indent=2))
+
+    def write_text(self, name: str, text: str) -> str:
+        return self.write_bytes(name, text.encode("utf-8"))
+
+    def write_bytes(self, name: str, data: bytes, compress: Optional[bool] = None) -> str:
+        compress = self.settings.compress if compress is None else compress
+        path = os.path.join(self.path, f"{name}.gz" if compress else name)
+        self.submit(_write_file, path, data, compress)
+        return path
+
+    def write_image(self, name: str, png: bytes) -> str:
+        """Store a PNG screenshot, re-encoded as lossless WebP when compressing. `name` has no extension."""
+        if self.settings.compress and features.check("webp"):
+            path = os.path.join(self.path, f"{name}.webp")
+            self.submit(_write_webp, path, png)
+        else:
+            path = os.path.join(self.path, f"{name}.png")
+            self.submit(_write_file, path, png, False)
+        return path
+
+    def write_gif(self, agent, prefix: str = "") -> Optional[str]:
+        """The agent's screenshots as an animated GIF, if enabled."""
+        if not self.settings.save_gif:
+            return None
+        path = os.path.join(self.path, f"{prefix}agent_history.gif")
+        self.submit(_write_gif, agent, path)
+        return path
+
+    def submit(self, fn: Callable, *args) -> Future:
+        future = _executor.submit(fn, *args)
+        self._pending.append(future)
+        return future
+
+    async def flush(self):
+        """Wait for this run's pending writes. A failed write is reported, not raised."""
+        pending, self._pending = self._pending, []
+        for result in await asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"Could not write artifact: {str(result)}", file=sys.stderr)
+
+        last = _last_prune.get(self.directory)
+        if last is None or time.monotonic() - last > PRUNE_INTERVAL_SECONDS:
+            _last_prune[self.directory] = time.monotonic()
+            _executor.submit(prune, self.directory, self.settings.max_mb, self.settings.max_age_days, self.path)
+
+def capture_conversation(agent, artifacts: ArtifactWriter, prefix: str = ""):
+    """Save each step's prompt and response into the run's directory instead of a shared path."""
+
+    def save_conversation(input_messages, response):
+        # Formatting is cheap; compressing and writing happen in the background
+        buffer = io.StringIO()
+        agent._write_messages_to_file(buffer, input_messages)
+        agent._write_response_to_file(buffer, response)
+        artifacts.write_text(f"{prefix}conversation_{agent.n_steps:03d}.txt", buffer.getvalue())
+
+    agent._save_conversation = save_conversation
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete old run artifacts past the configured limits")
+    parser.add_argument("--directory", default=ARTIFACTS_DIR)
+    parser.add_argument("--max-mb", type=int, help="Override artifacts.max_mb from config.json")
+    parser.add_argument("--max-age-days", type=int, help="Override artifacts.max_age_days from config.json")
+    args = parser.parse_args()
+
+    settings = ConfigHandler().load_config().artifacts
+    removed = prune(
+        args.directory,
+        max_mb=args.max_mb if args.max_mb is not None else settings.max_mb,
+        max_age_days=args.max_age_days if args.max_age_days is not None else settings.max_age_days
+    )
+    remaining = _size(args.directory) if os.path.isdir(args.directory) else 0
+    print(json.dumps({"removed": removed, "remaining_mb": round(remaining / 1024 / 1024, 1)}))
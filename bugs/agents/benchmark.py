@@ -0,0 +1,405 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import psutil
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from run_test import run_test
+from browser_agent import BrowserAgent
+from browser_pool import BrowserPool, PagePool
+from test_manager import TestManager
+from step_plan import compile_plan, get_plan
+from profile_report import load_spans
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+# Test flows run against the fixture app, cycled to make up the requested number of tests
+FLOWS = [
+    {
+        "name": "Login",
+        "instructions": "Go to /login\nType \"bench\" into #username\nType \"bench\" into #password\n"
+                        "Click #submit\nWait for #stats\nVerify #dashboard-title",
+        "credentials": {"username": "bench", "password": "bench"}
+    },
+    {
+        "name": "Contact form",
+        "instructions": "Go to /form\nType \"Ada\" into #name\nType \"ada@example.com\" into #email\n"
+                        "Click #submit\nVerify #form-success",
+        "credentials": {}
+    },
+    {
+        "name": "Slow page",
+        "instructions": "Go to /slow?ms=800\nWait 3000\nVerify #slow-content",
+        "credentials": {}
+    }
+]
+
+PAGE = """<!doctype html><html><head><title>{title}</title>
+<link rel="stylesheet" href="/static/app.css"></head><body>{body}</body></html>"""
+
+LOGIN_FORM = """<form method="post" action="/login">
+<input id="username" name="username" placeholder="Username">
+<input id="password" name="password" type="password" placeholder="Password">
+<button id="submit" name="submit" type="submit">Log in</button></form>"""
+
+CONTACT_FORM = """<form method="post" action="/form">
+<input id="name" name="name" placeholder="Name">
+<input id="email" name="email" placeholder="Email">
+<button id="submit" name="submit" type="submit">Send</button></form>"""
+
+# The dashboard fills in its stats from a slow API call after load
+DASHBOARD = """<h1 id="dashboard-title">Dashboard</h1><div id="placeholder">Loading...</div>
+<script>fetch('/api/slow?ms=300').then(r => r.json()).then(data => {
+  document.getElementById('placeholder').outerHTML = '<div id="stats">' + data.value + '</div>';
+});</script>"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """A small app with a login, a form and slow endpoints, enough to exercise both runners."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        delay_ms = int(parse_qs(url.query).get("ms", ["0"])[0])
+        logged_in = "session=bench" in (self.headers.get("Cookie") or "")
+
+        if url.path == "/":
+            if not logged_in:
+                return self._redirect("/login")
+            self._html("Home", '<a href="/dashboard">Dashboard</a> <a href="/form">Contact</a>')
+        elif url.path == "/login":
+            self._html("Log in", LOGIN_FORM)
+        elif url.path == "/dashboard":
+            if not logged_in:
+                return self._redirect("/login")
+            self._html("Dashboard", DASHBOARD)
+        elif url.path == "/form":
+            self._html("Contact", CONTACT_FORM)
+        elif url.path == "/slow":
+            time.sleep(delay_ms / 1000)
+            self._html("Slow", '<div id="slow-content">Finally here</div>')
+        elif url.path == "/api/slow":
+            time.sleep(delay_ms / 1000)
+            self._send(200, "application/json", json.dumps({"value": 42}).encode())
+        elif url.path == "/static/app.css":
+            self._send(200, "text/css", b"body { font-family: sans-serif; }")
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/login":
+            self._redirect("/dashboard", cookie="session=bench; Path=/")
+        elif self.path == "/form":
+            self._html("Thanks", '<div id="form-success">Thanks, we will be in touch</div>')
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def log_message(self, format, *args):
+        # Keep the benchmark output readable
+        pass
+
+    def _html(self, title: str, body: str):
+        self._send(200, "text/html", PAGE.format(title=title, body=body).encode())
+
+    def _redirect(self, location: str, cookie: Optional[str] = None):
+        self.send_response(302)
+        self.send_header("Location", location)
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_fixture_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Stand-in for the LLM that plays back a fixed list of browser-use actions.
+
+    Element indices are looked up in the page state the agent sends, by the element's name
+    attribute. A scripted step whose element isn't on the page is skipped, and once the
+    script runs out every call answers with done.
+    """
+
+    script: List[Dict[str, Any]]
+    model_name: str = "scripted"
+    _position: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tools = kwargs.get("tools") or []
+        tool_name = tools[0]["function"]["name"] if tools else "AgentOutput"
+        output = {
+            "current_state": {
+                "page_summary": "",
+                "evaluation_previous_goal": "Success",
+                "memory": f"Scripted step {self._position}",
+                "next_goal": "Continue the script"
+            },
+            "action": [self._next_action(_text(messages[-1]))]
+        }
+        message = AIMessage(content="", tool_calls=[{"name": tool_name, "args": output, "id": f"call_{self._position}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _next_action(self, state: str) -> Dict[str, Any]:
+        while self._position < len(self.script):
+            step = self.script[self._position]
+            self._position += 1
+            if "match" not in step:
+                return {step["action"]: step["params"]}
+            found = re.search(rf'\[(\d+)\]<[^\n]*?name="{re.escape(step["match"])}"', state)
+            if found:
+                return {step["action"]: {**step["params"], "index": int(found.group(1))}}
+        return {"done": {"text": "All scripted steps completed"}}
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "\n".join(part.get("text", "") for part in message.content if isinstance(part, dict))
+
+def script_for(instructions: str, target_url: str) -> List[Dict[str, Any]]:
+    """The browser-use actions a model would take for a test's compiled steps."""
+    script = []
+    for step in compile_plan(instructions, target_url):
+        if step.type == "navigate":
+            script.append({"action": "go_to_url", "params": {"url": step.target}})
+        elif step.type == "type":
+            script.append({"action": "input_text", "params": {"text": step.value}, "match": step.target.lstrip("#")})
+        elif step.type == "click":
+            script.append({"action": "click_element", "params": {}, "match": step.target.lstrip("#")})
+    return script
+
+class PeakRSS:
+    """Samples the resident memory of this process and its children (browsers, drivers)."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _sample(self):
+        me = psutil.Process()
+        while True:
+            total = 0
+            for process in [me] + me.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak_mb = max(self.peak_mb, total / 1024 / 1024)
+            await asyncio.sleep(self.interval)
+
+async def _run_with_run_test(test_ids: List[str], target_url: str, concurrency: int, replay: bool):
+
+    test_manager = TestManager()
+    pool = BrowserPool(size=concurrency)
+    await pool.start()
+    try:
+        results = await asyncio.gather(*(
+            run_test(
+                test_id,
+                browser_pool=pool,
+                llm=ScriptedChatModel(script=script_for(test_manager.get_test(test_id).instructions, target_url)),
+                verbose=False,
+                replay=replay
+            )
+            for test_id in test_ids
+        ))
+    finally:
+        await pool.close()
+    return ["error" not in result for result in results], pool.launches
+
+async def _run_with_browser_agent(test_ids: List[str], target_url: str, concurrency: int):
+
+    test_manager = TestManager()
+    pool = PagePool(size=concurrency)
+    await pool.start()
+    # The pool bounds browsers, this bounds runs waiting on them
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run_one(test_id: str) -> bool:
+        test = test_manager.get_test(test_id)
+        async with limit:
+            agent = BrowserAgent(
+                openai_api_key="benchmark",
+                instructions=test.instructions,
+                credentials=test.credentials or None,
+                use_vision=False,
+                test_id=test_id,
+                plan=get_plan(test_manager, test, target_url),
+                page_pool=pool,
+                budget=test.budget,
+                devices=test.devices
+            )
+            return (await agent.run()).status == "passed"
+
+    try:
+        passed = await asyncio.gather(*(run_one(test_id) for test_id in test_ids))
+    finally:
+        await pool.close()
+    return list(passed), pool.launches
+
+# Where a run's config and data files (traces, sessions, caches, history) are read from;
+# the test store and logs follow the cwd
+ISOLATED_ENV = ("AGENTS_CONFIG", "AGENTS_DATA_DIR")
+
+@contextmanager
+def isolated(workdir: str):
+    """Point the cwd, AGENTS_CONFIG and AGENTS_DATA_DIR at `workdir`, restoring them all on exit."""
+    previous_cwd = os.getcwd()
+    previous_env = {name: os.environ.get(name) for name in ISOLATED_ENV}
+    try:
+        os.chdir(workdir)
+        os.environ["AGENTS_CONFIG"] = os.path.join(workdir, "config.json")
+        os.environ["AGENTS_DATA_DIR"] = workdir
+        yield
+    finally:
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        os.chdir(previous_cwd)
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 1)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(runner: str = "run_test", tests: int = 12, concurrency: int = 4, port: int = 8765, replay: bool = True) -> Dict[str, Any]:
+    """
+    Run `tests` flows against a local fixture app and measure the runner end to end.
+
+    Runs happen in a scratch directory with their own config, test store, logs, traces,
+    sessions, caches and run history, so none of the real ones are read or changed.
+    """
+
+    server = start_fixture_server(port)
+    target_url = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    memory = PeakRSS()
+    try:
+        with isolated(workdir):
+            with open("config.json", "w") as f:
+                json.dump({"target_url": target_url, "auto_run": False}, f)
+
+            test_manager = TestManager()
+            test_ids = []
+            for index in range(tests):
+                flow = FLOWS[index % len(FLOWS)]
+                test = test_manager.create_test(name=f"{flow['name']} #{index}", instructions=flow["instructions"], credentials=flow["credentials"])
+                test_ids.append(test.id)
+
+            memory.start()
+            start = time.perf_counter()
+            try:
+                if runner == "browser_agent":
+                    passed, launches = await _run_with_browser_agent(test_ids, target_url, concurrency)
+                else:
+                    passed, launches = await _run_with_run_test(test_ids, target_url, concurrency, replay)
+                elapsed = time.perf_counter() - start
+            finally:
+                await memory.stop()
+    finally:
+        server.shutdown()
+
+    steps = [span["duration_ms"] for span in load_spans(os.path.join(workdir, "logs", "profiles"), last=tests * 10) if span["kind"] == "step"]
+    return {
+        "runner": runner,
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "tests": tests,
+        "concurrency": concurrency,
+        "replay": replay,
+        "passed": sum(passed),
+        "failed": len(passed) - sum(passed),
+        "elapsed_s": round(elapsed, 2),
+        "tests_per_minute": round(tests / elapsed * 60, 2),
+        "steps": len(steps),
+        "step_p50_ms": _percentile(steps, 0.5),
+        "step_p95_ms": _percentile(steps, 0.95),
+        "peak_rss_mb": round(memory.peak_mb, 1),
+        "browser_launches": launches,
+        "workdir": workdir
+    }
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of each metric against a baseline result, e.g. +0.12 for 12% higher."""
+    metrics = ["tests_per_minute", "step_p50_ms", "step_p95_ms", "peak_rss_mb", "browser_launches"]
+    return {
+        metric: round(result[metric] / baseline[metric] - 1, 3)
+        for metric in metrics if result.get(metric) is not None and baseline.get(metric)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark a test runner end to end against a local fixture app")
+    parser.add_argument("--runner", choices=["run_test", "browser_agent"], default="run_test")
+    parser.add_argument("--tests", type=int, default=12, help="Number of test flows to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Browsers kept open, and so tests run at a time")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the fixture app")
+    parser.add_argument("--no-replay", action="store_true", help="Always run the agent, ignoring recorded traces")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    result = asyncio.run(run_benchmark(args.runner, args.tests, args.concurrency, args.port, not args.no_replay))
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            result["vs_baseline"] = compare(result, json.load(f))
+
+    os.makedirs(BENCHMARKS_DIR, exist_ok=True)
+    path = os.path.join(BENCHMARKS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{result['commit'] or 'nocommit'}_{args.runner}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    print(f"Saved to {path}", file=sys.stderr)
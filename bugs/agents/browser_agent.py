@@ -1,18 +1,40 @@
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr, BaseModel
 import asyncio
-import json
 from datetime import datetime
-import os
-from typing import List, Optional
+from typing import Dict, List, Optional
+from contextlib import asynccontextmanager
 from pyppeteer import launch
-from config_handler import ConfigHandler
+from config_handler import ConfigHandler, DeviceProfile, TestBudget
+from devices import apply_pyppeteer_device, resolve_devices
+from test_manager import TestStep
+from step_plan import compile_plan
+from profiler import Profiler, ProfilerLLMHandler
+from screenshots import ScreenshotPipeline
+from artifacts import ArtifactWriter
+from budget import BudgetExceeded, BudgetGuard
+from waits import Waiter
+from network import NetworkPolicy, apply_pyppeteer_network
+from browser_pool import PagePool
+from session_cache import SessionCache, capture_pyppeteer_session, restore_pyppeteer_session
+
+class DeviceResult(BaseModel):
+    status: str
+    issues: List[str]
+    execution_time: float
+    screenshots: List[str] = []
+    urls: List[str] = []
 
 class TestResult(BaseModel):
     status: str
     issues: List[str]
     execution_time: float
     timestamp: str
+    screenshots: List[str] = []
+    # Pages the run ended up on, for recording the test's routes
+    urls: List[str] = []
+    # The same run per device, keyed by device name
+    devices: Dict[str, DeviceResult] = {}
 
 class BrowserAgent:
     def __init__(
@@ -22,152 +44,251 @@ class BrowserAgent:
         credentials: Optional[dict] = None,
         use_vision: bool = True,
         save_logs: bool = True,
-        headless: bool = True
+        headless: bool = True,
+        plan: Optional[List[TestStep]] = None,
+        session_cache: Optional[SessionCache] = None,
+        test_id: Optional[str] = None,
+        page_pool: Optional[PagePool] = None,
+        budget: Optional[TestBudget] = None,
+        devices: Optional[List[str]] = None
     ):
+        self.profiler = Profiler(test_id)
         self.llm = ChatOpenAI(
             model="gpt-4",
             api_key=SecretStr(openai_api_key),
-            base_url="https://api.openai.com/v1"
+            base_url="https://api.openai.com/v1",
+            callbacks=[ProfilerLLMHandler(self.profiler)]
         )
         self.instructions = instructions
         self.config = ConfigHandler().load_config()
         if not self.config.target_url:
             raise ValueError("Target URL not configured in settings")
         self.target_url = self.config.target_url
+        self.budget = self.config.budget.merged(budget)
+        self.devices = resolve_devices(devices or self.config.devices, self.config.device_profiles)
+        self.artifacts = ArtifactWriter(self.profiler.run_id, self.config.artifacts)
         self.credentials = credentials
         self.use_vision = use_vision
         self.save_logs = save_logs
         self.headless = headless
-        self.logs_dir = "logs"
-        
-        if save_logs and not os.path.exists(self.logs_dir):
-            os.makedirs(self.logs_dir)
+        self.plan = plan
+        self.session_cache = session_cache or SessionCache()
+        self.page_pool = page_pool
+        self.waits = Waiter(self.target_url)
+        self._login_lock = asyncio.Lock()
 
     def parse_instructions(self, instructions: str):
-        steps = []
-        lines = [line.strip().lower() for line in instructions.split('\n') if line.strip()]
-
-        for line in lines:
-            if 'go to' in line or 'navigate to' in line:
-                # If the step mentions a specific page/route, append it to the target URL
-                route = line.split('go to')[-1].strip() if 'go to' in line else line.split('navigate to')[-1].strip()
-                if route.startswith('http'):
-                    target = route  # Use full URL if provided
-                else:
-                    # Remove leading slash if present and append to target URL
-                    route = route.lstrip('/')
-                    target = f"{self.target_url.rstrip('/')}/{route}"
-                steps.append({"type": "navigate", "target": target})
-            
-            elif 'click' in line:
-                target = line.split('click')[-1].strip()
-                steps.append({"type": "click", "target": target})
-            
-            elif 'type' in line or 'enter' in line:
-                parts = line.split(' into ')
-                if len(parts) == 2:
-                    value = parts[0].split('"')[1] if '"' in parts[0] else parts[0].split("'")[1]
-                    target = parts[1].strip()
-                    steps.append({"type": "type", "target": target, "value": value})
-            
-            elif 'wait' in line:
-                try:
-                    timeout = int(''.join(filter(str.isdigit, line)))
-                    steps.append({"type": "wait", "timeout": timeout})
-                except ValueError:
-                    continue
-            
-            elif any(word in line for word in ['verify', 'check', 'assert']):
-                for word in ['verify', 'check', 'assert']:
-                    if word in line:
-                        target = line.split(word)[-1].strip()
-                        steps.append({"type": "assert", "target": target})
-                        break
+        return [step.model_dump(exclude_none=True) for step in compile_plan(instructions, self.target_url)]
 
-        return steps
+    async def execute_step(self, page, step: TestStep, next_step: Optional[TestStep] = None) -> Optional[str]:
+        if isinstance(step, dict):
+            step = TestStep(**step)
+        with self.profiler.span("step", type=step.type, target=step.target) as span:
+            error = await self._execute_step(page, step, next_step)
+            span["errors"] = 1 if error else 0
+        return error
 
-    async def execute_step(self, page, step: dict) -> Optional[str]:
+    async def _execute_step(self, page, step: TestStep, next_step: Optional[TestStep]) -> Optional[str]:
         try:
-            if step["type"] == "navigate":
-                await page.goto(step["target"], {"waitUntil": "networkidle0"})
+            if step.type == "navigate":
+                with self.profiler.span("navigate", url=step.target):
+                    await self.waits.navigate(page, step.target)
             
-            elif step["type"] == "click":
-                await page.click(step["target"])
+            elif step.type == "click":
+                await self.waits.selector(page, "click", step.target, 10000)
+                await page.click(step.target)
+                await self.waits.settle(page)
             
-            elif step["type"] == "type":
-                await page.type(step["target"], step["value"])
+            elif step.type == "type":
+                await self.waits.selector(page, "type", step.target, 10000)
+                await page.type(step.target, step.value)
             
-            elif step["type"] == "wait":
-                await asyncio.sleep(step["timeout"] / 1000)  # Convert to seconds
+            elif step.type == "wait":
+                return await self.wait(page, step, next_step)
             
-            elif step["type"] == "assert":
-                try:
-                    await page.waitForSelector(step["target"], {"timeout": 5000})
-                except Exception as e:
-                    return f"Assertion failed: {step['target']} - {str(e)}"
+            elif step.type == "assert":
+                timeout = self.waits.timeout("assert", 5000)
+                if not await self.waits.selector(page, "assert", step.target, 5000, visible=False):
+                    return f"Assertion failed: {step.target} - not found within {timeout} ms"
             
             return None
         except Exception as e:
-            return f"Step failed: {json.dumps(step)} - {str(e)}"
+            return f"Step failed: {step.model_dump_json(exclude_none=True)} - {str(e)}"
 
-    async def run(self) -> TestResult:
-        start_time = datetime.now()
-        issues = []
+    async def wait(self, page, step: TestStep, next_step: Optional[TestStep]) -> Optional[str]:
+        # Explicit waits become condition waits, exiting as soon as the condition holds
+        if step.value == "response":
+            timeout = self.waits.timeout("response", step.timeout or 10000)
+            if not await self.waits.response(page, step.target, step.timeout or 10000):
+                return f"Wait failed: no response matching {step.target} within {timeout} ms"
+        elif step.target:
+            timeout = self.waits.timeout("wait", step.timeout or 10000)
+            if not await self.waits.selector(page, "wait", step.target, step.timeout or 10000):
+                return f"Wait failed: {step.target} - not found within {timeout} ms"
+        elif next_step and next_step.target and next_step.type in ("click", "type", "assert"):
+            # The sleep was only there for the next step's element, so wait for that instead
+            await self.waits.selector(page, "wait", next_step.target, step.timeout, visible=next_step.type != "assert")
+        else:
+            await self.waits.settle(page, max_ms=step.timeout)
+
+    async def authenticate(self, page):
+        # Reuse a cached session for this account, logging in again only if it expired or was logged out
+        state = self.session_cache.load(self.target_url, self.credentials)
+        if state and await restore_pyppeteer_session(page, state):
+            return
+        if state:
+            self.session_cache.invalidate(self.target_url, self.credentials)
+
+        await page.type('#username, [name="username"], [type="email"]', self.credentials.get("username", ""))
+        await page.type('#password, [name="password"]', self.credentials.get("password", ""))
+        await asyncio.gather(
+            page.waitForNavigation({"waitUntil": "domcontentloaded"}),
+            page.click('[type="submit"], .login-button, .submit-button')
+        )
+        await self.waits.settle(page)
+
+        session = await capture_pyppeteer_session(page)
+        self.session_cache.save(self.target_url, self.credentials, session["cookies"], session["local_storage"])
+
+    async def capture_screenshot(self, screenshots: ScreenshotPipeline, page, label: str):
+        try:
+            with self.profiler.span("screenshot", label=label):
+                return await screenshots.capture(page, label)
+        except Exception:
+            # A missing screenshot must not turn into a test failure of its own
+            return None
+
+    @asynccontextmanager
+    async def open_pages(self, count: int):
+        """Pages in `count` sibling incognito contexts of one browser: a pooled one, or our own without a pool."""
+        if self.page_pool:
+            async with self.page_pool.pages(count) as pages:
+                yield pages
+            return
 
-        # Launch browser
         browser = await launch({"headless": self.headless})
-        page = await browser.newPage()
-        
         try:
-            # Set viewport
-            await page.setViewport({"width": 1280, "height": 800})
-            
-            # Navigate to target URL
-            await page.goto(self.target_url, {"waitUntil": "networkidle0"})
-
-            # Handle authentication if provided
-            if self.credentials:
-                await page.type('#username, [name="username"], [type="email"]', self.credentials.get("username", ""))
-                await page.type('#password, [name="password"]', self.credentials.get("password", ""))
-                await page.click('[type="submit"], .login-button, .submit-button')
-                await page.waitForNavigation({"waitUntil": "networkidle0"})
-
-            # Execute test steps
-            steps = self.parse_instructions(self.instructions)
-            for step in steps:
-                if error := await self.execute_step(page, step):
-                    issues.append(error)
-
-                if self.use_vision:
-                    # Take screenshot after each step for visual verification
-                    screenshot = await page.screenshot({"encoding": "base64"})
-                    # Here you could send the screenshot to GPT-4V for analysis
-                    pass
+            contexts = [await browser.createIncognitoBrowserContext() for _ in range(count)]
+            yield [await context.newPage() for context in contexts]
+        finally:
+            await browser.close()
 
+    async def run_steps(
+        self,
+        page,
+        device: DeviceProfile,
+        steps: List[TestStep],
+        issues: List[str],
+        urls: List[str],
+        screenshots: ScreenshotPipeline
+    ):
+        await apply_pyppeteer_device(page, device)
+        await apply_pyppeteer_network(page, NetworkPolicy(self.config.network))
+
+        # Navigate to target URL
+        with self.profiler.span("navigate", url=self.target_url, device=device.name):
+            await self.waits.navigate(page, self.target_url)
+
+        # Handle authentication if provided. Devices take turns, so the first one logs in
+        # and the others restore the session it cached instead of logging in again.
+        if self.credentials:
+            async with self._login_lock:
+                with self.profiler.span("login", device=device.name):
+                    await self.authenticate(page)
+        urls.append(page.url)
+
+        for index, step in enumerate(steps):
+            if self.budget.max_steps is not None and index >= self.budget.max_steps:
+                issues.append(str(BudgetExceeded("max_steps", index, self.budget.max_steps)))
+                break
+
+            next_step = steps[index + 1] if index + 1 < len(steps) else None
+            error = await self.execute_step(page, step, next_step)
+            if page.url not in urls:
+                urls.append(page.url)
+            if error:
+                issues.append(error)
+                # Keep what the page looked like for the failure report
+                await self.capture_screenshot(screenshots, page, f"step_{index}_failed")
+
+                # Later steps act on the page this step didn't reach; running them only adds
+                # cascading errors. Failed assertions don't change the page, so checking continues.
+                remaining = len(steps) - index - 1
+                if self.budget.fail_fast and step.type != "assert" and remaining:
+                    issues.append(f"Skipped {remaining} remaining steps after the failed {step.type} step")
+                    break
+
+            elif self.use_vision and step.type == "assert":
+                # Keep what the page looked like when it was checked
+                await self.capture_screenshot(screenshots, page, f"step_{index}_assert")
+
+    async def run_device(self, page, device: DeviceProfile, steps: List[TestStep]) -> DeviceResult:
+        start_time = datetime.now()
+        issues = []
+        urls = []
+        screenshots = ScreenshotPipeline(self.artifacts, prefix=f"{device.name}_")
+        try:
+            # The time budget covers the whole run, login included
+            await BudgetGuard(self.budget).run(self.run_steps(page, device, steps, issues, urls, screenshots))
+        except BudgetExceeded as e:
+            issues.append(str(e))
         except Exception as e:
             issues.append(f"Execution error: {str(e)}")
         finally:
-            await browser.close()
+            paths = await screenshots.flush()
+
+        return DeviceResult(
+            status="passed" if not issues else "failed",
+            issues=issues,
+            execution_time=(datetime.now() - start_time).total_seconds(),
+            screenshots=paths,
+            urls=urls
+        )
+
+    async def run(self) -> TestResult:
+        start_time = datetime.now()
+        # Compiled once, from the precompiled plan when we have one, and shared by every device
+        steps = self.plan if self.plan is not None else compile_plan(self.instructions, self.target_url)
+
+        async with self.open_pages(len(self.devices)) as pages:
+            try:
+                results = await asyncio.gather(*(
+                    self.run_device(page, device, steps) for page, device in zip(pages, self.devices)
+                ))
+            finally:
+                self.waits.timeouts.save()
+        devices = {device.name: result for device, result in zip(self.devices, results)}
+
+        # Issues are tagged with their device once there is more than one
+        tagged = len(devices) > 1
+        issues = [f"[{name}] {issue}" if tagged else issue for name, result in devices.items() for issue in result.issues]
+        status = "passed" if not issues else "failed"
 
         # Calculate execution time
         execution_time = (datetime.now() - start_time).total_seconds()
+        self.profiler.record("test", execution_time * 1000, status=status, devices=list(devices))
+        if self.save_logs:
+            self.profiler.save()
 
-        # Save logs if enabled
+        # Save logs if enabled, next to the run's screenshots
         if self.save_logs:
-            log_file = os.path.join(self.logs_dir, f"test_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-            with open(log_file, "w") as f:
-                json.dump({
-                    "instructions": self.instructions,
-                    "target_url": self.target_url,
-                    "execution_time": execution_time,
-                    "issues": issues,
-                    "status": "passed" if not issues else "failed",
-                    "timestamp": datetime.now().isoformat()
-                }, f, indent=2)
+            self.artifacts.write_json("test_run.json", {
+                "instructions": self.instructions,
+                "target_url": self.target_url,
+                "execution_time": execution_time,
+                "issues": issues,
+                "status": status,
+                "devices": {name: result.status for name, result in devices.items()},
+                "timestamp": datetime.now().isoformat()
+            })
+            await self.artifacts.flush()
 
         return TestResult(
-            status="passed" if not issues else "failed",
+            status=status,
             issues=issues,
             execution_time=execution_time,
-            timestamp=datetime.now().isoformat()
-        ) 
\ No newline at end of file
+            timestamp=datetime.now().isoformat(),
+            screenshots=[path for result in devices.values() for path in result.screenshots],
+            urls=list(dict.fromkeys(url for result in devices.values() for url in result.urls)),
+            devices=devices
+        )
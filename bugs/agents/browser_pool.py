@@ -0,0 +1,232 @@
+import sys
+import asyncio
+import psutil
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional, Set
+from browser_use import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from pyppeteer import launch
+
+def _chromium_pids() -> Set[int]:
+    pids = set()
+    for process in psutil.Process().children(recursive=True):
+        try:
+            name = process.name().lower()
+        except psutil.Error:
+            continue
+        if "chrom" in name or "headless_shell" in name:
+            pids.add(process.pid)
+    return pids
+
+def _parent_pid(pid: int) -> Optional[int]:
+    try:
+        return psutil.Process(pid).ppid()
+    except psutil.Error:
+        return None
+
+def _memory_mb(pid: Optional[int]) -> float:
+    """Resident memory of a browser process and everything it spawned (renderers, GPU, ...)."""
+    if pid is None:
+        return 0.0
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0.0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / 1024 / 1024
+
+class PooledBrowser:
+    """A launched browser plus what the pool needs to decide when to replace it."""
+
+    def __init__(self, browser: Any, pid: Optional[int]):
+        self.browser = browser
+        self.pid = pid
+        self.uses = 0
+
+class _Pool(ABC):
+    """
+    Keeps `size` browsers launched and lends them out one test at a time.
+
+    A browser is replaced after `max_uses` tests, when it grows past `max_memory_mb`, or when
+    it is found dead on checkout. Replacements after a test happen in the background, so the
+    test that returned the browser doesn't wait for the relaunch.
+    """
+
+    def __init__(self, size: int = 4, headless: bool = True, max_uses: int = 50, max_memory_mb: Optional[int] = 1500):
+        if size < 1:
+            # Checkouts would wait forever on an empty pool
+            raise ValueError(f"Pool size must be at least 1, got {size}")
+        self.size = size
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.launches = 0
+        self.recycled = 0
+        self.crashed = 0
+        self._slots: List[PooledBrowser] = []
+        self._available: asyncio.Queue = asyncio.Queue()
+        self._replacing: Set[asyncio.Task] = set()
+
+    async def start(self):
+        # Launch every browser up front so the first tests don't pay for startup
+        for _ in range(self.size):
+            slot = await self._launch_slot()
+            self._slots.append(slot)
+            self._available.put_nowait(slot)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "available": self._available.qsize(),
+            "launches": self.launches,
+            "recycled": self.recycled,
+            "crashed": self.crashed
+        }
+
+    async def close(self):
+        if self._replacing:
+            await asyncio.gather(*self._replacing, return_exceptions=True)
+        for slot in self._slots:
+            await self._close_browser(slot.browser)
+        self._slots = []
+        self._available = asyncio.Queue()
+
+    async def _checkout(self) -> PooledBrowser:
+        slot = await self._available.get()
+        if not self._is_alive(slot.browser):
+            self.crashed += 1
+            slot = await self._replace(slot)
+        slot.uses += 1
+        return slot
+
+    def _checkin(self, slot: PooledBrowser):
+        worn_out = slot.uses >= self.max_uses
+        bloated = self.max_memory_mb is not None and _memory_mb(slot.pid) > self.max_memory_mb
+        if worn_out or bloated or not self._is_alive(slot.browser):
+            self.recycled += 1
+            task = asyncio.create_task(self._replace_and_return(slot))
+            self._replacing.add(task)
+            task.add_done_callback(self._replacing.discard)
+        else:
+            self._available.put_nowait(slot)
+
+    async def _replace_and_return(self, slot: PooledBrowser):
+        try:
+            slot = await self._replace(slot)
+        finally:
+            self._available.put_nowait(slot)
+
+    async def _replace(self, slot: PooledBrowser) -> PooledBrowser:
+        await self._close_browser(slot.browser)
+        try:
+            fresh = await self._launch_slot()
+        except Exception as e:
+            # Hand the dead slot back; the next checkout tries the relaunch again
+            print(f"Could not relaunch browser: {str(e)}", file=sys.stderr)
+            return slot
+        self._slots[self._slots.index(slot)] = fresh
+        return fresh
+
+    async def _launch_slot(self) -> PooledBrowser:
+        browser, pid = await self._launch()
+        self.launches += 1
+        return PooledBrowser(browser, pid)
+
+    async def _close_browser(self, browser: Any):
+        try:
+            await browser.close()
+        except Exception:
+            # Already crashed or disconnected; nothing left to clean up
+            pass
+
+    @abstractmethod
+    async def _launch(self):
+        """Start a browser. Returns it and its process id, or None if that can't be told."""
+
+    @abstractmethod
+    def _is_alive(self, browser: Any) -> bool:
+        ...
+
+class BrowserPool(_Pool):
+    """Pool of browser-use (Playwright) browsers, handing out a fresh, isolated context per test."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Launches are serialised so the new browser's process can be told apart from the others
+        self._launch_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def context(self, config: Optional[BrowserContextConfig] = None):
+        """Borrow a browser and yield a fresh, isolated context on it."""
+        async with self.contexts([config or BrowserContextConfig()]) as contexts:
+            yield contexts[0]
+
+    @asynccontextmanager
+    async def contexts(self, configs: List[BrowserContextConfig]):
+        """Sibling isolated contexts of one pooled browser, one per config, e.g. one per device."""
+        slot = await self._checkout()
+        contexts: List[BrowserContext] = []
+        try:
+            for config in configs:
+                contexts.append(await slot.browser.new_context(config))
+            yield contexts
+        finally:
+            for browser_context in contexts:
+                try:
+                    await browser_context.close()
+                except Exception as e:
+                    print(f"Could not close browser context: {str(e)}", file=sys.stderr)
+            self._checkin(slot)
+
+    async def _launch(self):
+        async with self._launch_lock:
+            before = _chromium_pids()
+            browser = Browser(config=BrowserConfig(headless=self.headless))
+            await browser.get_playwright_browser()
+            running = _chromium_pids()
+        # The browser process is the new chromium process not started by another chromium process
+        roots = [pid for pid in running - before if _parent_pid(pid) not in running]
+        return browser, roots[0] if len(roots) == 1 else None
+
+    def _is_alive(self, browser: Browser) -> bool:
+        return browser.playwright_browser is not None and browser.playwright_browser.is_connected()
+
+class PagePool(_Pool):
+    """Pool of pyppeteer browsers for BrowserAgent, handing out a page in a fresh incognito context per test."""
+
+    @asynccontextmanager
+    async def page(self):
+        async with self.pages(1) as pages:
+            yield pages[0]
+
+    @asynccontextmanager
+    async def pages(self, count: int):
+        """Pages in `count` sibling incognito contexts of one pooled browser, e.g. one per device."""
+        slot = await self._checkout()
+        contexts = []
+        try:
+            for _ in range(count):
+                contexts.append(await slot.browser.createIncognitoBrowserContext())
+            yield [await context.newPage() for context in contexts]
+        finally:
+            for context in contexts:
+                try:
+                    await context.close()
+                except Exception as e:
+                    print(f"Could not close incognito context: {str(e)}", file=sys.stderr)
+            self._checkin(slot)
+
+    async def _launch(self):
+        browser = await launch({"headless": self.headless})
+        return browser, browser.process.pid if browser.process else None
+
+    def _is_alive(self, browser) -> bool:
+        # pyppeteer has no public connection check; _connected drops when the websocket closes
+        return browser.process is not None and browser.process.poll() is None and browser._connection._connected
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Optional
+from config_handler import TestBudget
+from hooks import LLMCall, LLMUsageHandler
+
+class BudgetExceeded(Exception):
+    """A run went over one of its limits and was stopped."""
+
+    def __init__(self, limit: str, used: Any, allowed: Any):
+        super().__init__(f"Stopped after {used} {limit.replace('max_', '')}: the {limit} budget is {allowed}")
+        self.limit = limit
+        self.used = used
+        self.allowed = allowed
+
+class BudgetGuard:
+    """
+    Enforces a run's time and token limits by cancelling it.
+
+    run() awaits the run for at most `max_seconds`. Token usage is reported through handler(),
+    and the run is cancelled as soon as it passes `max_tokens` rather than at the next step.
+    Either way the caller gets a BudgetExceeded instead of a CancelledError.
+    """
+
+    def __init__(self, budget: TestBudget):
+        self.budget = budget
+        self.tokens = 0
+        self.exceeded: Optional[BudgetExceeded] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def handler(self) -> LLMUsageHandler:
+        return BudgetLLMHandler(self)
+
+    def add_tokens(self, tokens: int):
+        self.tokens += tokens
+        if self.budget.max_tokens is not None and self.tokens > self.budget.max_tokens and not self.exceeded:
+            self.exceeded = BudgetExceeded("max_tokens", self.tokens, self.budget.max_tokens)
+            if self._task:
+                self._task.cancel()
+
+    async def run(self, run: Awaitable) -> Any:
+        self._task = asyncio.ensure_future(run)
+        try:
+            return await asyncio.wait_for(self._task, self.budget.max_seconds)
+        except asyncio.TimeoutError:
+            raise BudgetExceeded("max_seconds", self.budget.max_seconds, self.budget.max_seconds)
+        except asyncio.CancelledError:
+            # Our own cancellation for going over tokens; anything else came from outside
+            if self.exceeded and not self._cancelled_from_outside():
+                raise self.exceeded
+            raise
+
+    def _cancelled_from_outside(self) -> bool:
+        task = asyncio.current_task()
+        return task is not None and task.cancelling() > 0
+
+class BudgetLLMHandler(LLMUsageHandler):
+    """Counts each model call's tokens against a BudgetGuard."""
+
+    def __init__(self, guard: BudgetGuard):
+        super().__init__()
+        self.guard = guard
+
+    def on_call(self, call: LLMCall):
+        if not call.error:
+            self.guard.add_tokens(call.total_tokens)
@@ -0,0 +1,193 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import yaml
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from dotenv import load_dotenv
+from files import atomic_write
+from llm import create_llm
+from browser_pool import BrowserPool
+from config_handler import ConfigHandler
+from create_test import validate_test
+from test_manager import TestFlow, TestManager
+
+# Load environment variables
+load_dotenv()
+
+# Fields a spec may set; everything else (IDs, status, plans, ...) belongs to the store
+SPEC_FIELDS = ("name", "instructions", "credentials", "budget", "devices")
+
+def read_specs(path: str) -> List[Dict[str, Any]]:
+    """
+    Read test specs from JSONL (one object per line), YAML or JSON.
+
+    A YAML or JSON file holds a list of specs, or an object with a "tests" list.
+    """
+    with open(path, 'r') as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        data = yaml.safe_load(f) if path.endswith((".yaml", ".yml")) else json.load(f)
+    if isinstance(data, dict):
+        data = data.get("tests")
+    if not isinstance(data, list):
+        raise ValueError(f"{path} must hold a list of tests or an object with a \"tests\" list")
+    return data
+
+def write_specs(path: str, tests: List[TestFlow], include_credentials: bool = False):
+    """
+    Write tests as specs that import_tests can read back, in the format given by the extension.
+
+    Credentials are left out unless `include_credentials` is set, and then the file is
+    readable by its owner only.
+    """
+    fields = set(SPEC_FIELDS) if include_credentials else set(SPEC_FIELDS) - {"credentials"}
+    specs = [test.model_dump(include=fields, exclude_none=True) for test in tests]
+    if path.endswith((".jsonl", ".ndjson")):
+        data = "".join(json.dumps(spec) + "\n" for spec in specs)
+    elif path.endswith((".yaml", ".yml")):
+        data = yaml.safe_dump(specs, sort_keys=False, allow_unicode=True)
+    else:
+        data = json.dumps(specs, indent=2)
+    atomic_write(path, data, private=include_credentials)
+
+def import_tests(path: str, test_manager: Optional[TestManager] = None) -> List[TestFlow]:
+    """
+    Create every test in a spec file with one storage write, without validating them.
+
+    Every spec is checked first; if any is invalid nothing is written and the error lists them all.
+    """
+    test_manager = test_manager or TestManager()
+    specs, errors = [], []
+    for number, spec in enumerate(read_specs(path), start=1):
+        if not isinstance(spec, dict) or not spec.get("name") or not spec.get("instructions"):
+            errors.append(f"test {number}: name and instructions are required")
+            continue
+        spec = {field: spec[field] for field in SPEC_FIELDS if spec.get(field) is not None}
+        try:
+            TestFlow(id="", created_at="", **spec)
+        except ValidationError as e:
+            errors.append(f"test {number}: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+            continue
+        specs.append(spec)
+    if errors:
+        raise ValueError("Nothing was imported:\n" + "\n".join(errors))
+    return test_manager.create_tests(specs)
+
+class RateLimiter:
+    """Spaces out starts so no more than `per_minute` happen in any minute."""
+
+    def __init__(self, per_minute: float):
+        if per_minute <= 0:
+            raise ValueError(f"per_minute must be positive, got {per_minute}")
+        self.interval = 60 / per_minute
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = time.monotonic() + self.interval
+
+async def validate_tests(
+    test_ids: Optional[List[str]] = None,
+    concurrency: int = 4,
+    per_minute: float = 30
+) -> Dict[str, Any]:
+    """
+    Validate tests with the agent as a background job, several at a time.
+
+    Args:
+        test_ids: Tests to validate; by default every test that hasn't been validated yet
+        concurrency: Browsers kept open, and so validations running at a time
+        per_minute: Most validations started per minute, to stay within API rate limits
+
+    Returns:
+        Dict containing the number of validated tests and each one's analysis
+    """
+    test_manager = TestManager()
+    config = ConfigHandler().load_config()
+    if not config.target_url:
+        raise ValueError("Target URL not configured. Please set the target URL in the settings page.")
+
+    if test_ids:
+        tests = [test for test in (test_manager.get_test(test_id) for test_id in test_ids) if test]
+    else:
+        tests = [test for test in test_manager.get_all_tests() if test.validation is None]
+    if not tests:
+        return {"validated": 0, "warnings": 0, "results": {}}
+
+    # One client for every validation, so they share its connection pool and response cache
+    llm = create_llm()
+    limiter = RateLimiter(per_minute)
+    browser_pool = BrowserPool(size=min(concurrency, len(tests)))
+    await browser_pool.start()
+
+    async def validate(test: TestFlow) -> Dict[str, Any]:
+        # Wait for a rate slot before borrowing a browser, so waiting doesn't hold one
+        await limiter.wait()
+        async with browser_pool.context() as browser_context:
+            analysis = await validate_test(test, config, llm, browser_context)
+        test_manager.update_test(test.id, {"validation": analysis}, touch=False)
+        return analysis
+
+    try:
+        results = await asyncio.gather(*(validate(test) for test in tests))
+    finally:
+        await browser_pool.close()
+
+    return {
+        "validated": len(tests),
+        "warnings": sum(1 for analysis in results if "warning" in analysis),
+        "results": {test.id: analysis for test, analysis in zip(tests, results)}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import, export and validate tests in bulk")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Create tests from a JSONL, YAML or JSON file of specs")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--validate", action="store_true", help="Validate the imported tests right after importing")
+
+    export_parser = commands.add_parser("export", help="Write tests to a JSONL, YAML or JSON file of specs")
+    export_parser.add_argument("path")
+    export_parser.add_argument("test_ids", nargs="*", metavar="TEST_ID", help="Tests to export (default: all)")
+    export_parser.add_argument("--include-credentials", action="store_true", help="Export the tests' credentials too")
+
+    validate_parser = commands.add_parser("validate", help="Validate tests with the agent")
+    validate_parser.add_argument("test_ids", nargs="*", metavar="TEST_ID", help="Tests to validate (default: not yet validated)")
+
+    for command in (import_parser, validate_parser):
+        command.add_argument("--concurrency", type=int, default=4, help="Validations running at a time")
+        command.add_argument("--per-minute", type=float, default=30, help="Most validations started per minute")
+
+    args = parser.parse_args()
+    if args.command != "export":
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        if args.per_minute <= 0:
+            parser.error("--per-minute must be positive")
+    try:
+        if args.command == "import":
+            tests = import_tests(args.path)
+            report = {"imported": len(tests), "ids": [test.id for test in tests]}
+            if args.validate:
+                report["validation"] = asyncio.run(validate_tests(
+                    [test.id for test in tests], concurrency=args.concurrency, per_minute=args.per_minute
+                ))
+        elif args.command == "export":
+            test_manager = TestManager()
+            tests = [test_manager.get_test(test_id) for test_id in args.test_ids] if args.test_ids else test_manager.get_all_tests()
+            write_specs(args.path, [test for test in tests if test], include_credentials=args.include_credentials)
+            report = {"exported": len([test for test in tests if test]), "path": args.path}
+        else:
+            report = asyncio.run(validate_tests(args.test_ids, concurrency=args.concurrency, per_minute=args.per_minute))
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,64 @@
+import os
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_caches: Dict[str, "VersionedCache"] = {}
+
+class VersionedCache:
+    """
+    Process-level cache whose entries are only valid for one version of their source.
+
+    A version is any comparable token that changes when the source changes, e.g. file_version()
+    for a file. Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, Tuple[Any, Any]] = {}
+        _caches[name] = self
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if version is not None and entry and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, version: Any, value: Any):
+        if version is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = (version, value)
+
+    def update(self, key: Hashable, before: Any, after: Any, apply: Callable[[Any], Any]):
+        """
+        Move an entry across a write we made ourselves, without reloading the source.
+
+        Only applies when the entry was current right before the write; otherwise someone else
+        changed the source in between and the entry is dropped so the next read reloads it.
+        """
+        entry = self._entries.get(key)
+        if entry and before is not None and entry[0] == before:
+            self.put(key, after, apply(entry[1]))
+        else:
+            self._entries.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+def file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identity of a file's current contents: inode, mtime and size. None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counts for every cache in this process."""
+    return {name: cache.stats() for name, cache in _caches.items()}
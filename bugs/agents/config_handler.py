@@ -1,16 +1,89 @@
 import json
 import os
-from typing import Optional, Dict
-from pydantic import BaseModel
+from typing import Optional, Dict, List
+from pydantic import BaseModel, Field
+from cache import VersionedCache, file_version
+
+class NetworkProfile(BaseModel):
+    # Resource types as reported by the browser: image, font, media, stylesheet, script, ...
+    block_resource_types: List[str] = []
+    # Glob patterns matched against the full URL, e.g. "*google-analytics.com/*"
+    block_url_patterns: List[str] = []
+    # Hosts (and their subdomains) answered with an empty 200 instead of being fetched
+    stub_hosts: List[str] = []
+    # Serve static assets from agents/asset_cache, shared across runs
+    cache_assets: bool = False
+    cache_ttl_seconds: int = 86400
+    cache_max_mb: int = 500
+
+class ResultRule(BaseModel):
+    # Regexes matched case-insensitively against the agent's final answer and last-step errors
+    patterns: List[str]
+    subtype: str
+    description: str
+    type: str = "frontend_issue"
+
+class TestBudget(BaseModel):
+    # On a test, None inherits the config's value; in the config, None means no limit
+    max_steps: Optional[int] = None
+    max_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+    # Skip the remaining steps once a step other than an assertion fails
+    fail_fast: Optional[bool] = None
+
+    def merged(self, override: Optional["TestBudget"]) -> "TestBudget":
+        """This budget with the values `override` sets."""
+        if override is None:
+            return self.model_copy()
+        return TestBudget(**{**self.model_dump(), **override.model_dump(exclude_none=True)})
+
+class DeviceProfile(BaseModel):
+    name: str
+    width: int
+    height: int
+    device_scale_factor: float = 1
+    is_mobile: bool = False
+    has_touch: bool = False
+    user_agent: Optional[str] = None
+
+class FlakyPolicy(BaseModel):
+    # Extra attempts for a failed run, only for tests whose history marks them as flaky
+    retries: int = 1
+    # Runs per test the rolling statistics look back over
+    window: int = 20
+    # Pass/fail flips within the window that make a test flaky
+    min_flips: int = 2
+
+class ArtifactSettings(BaseModel):
+    # Gzip conversations and logs, and store screenshots as lossless WebP
+    compress: bool = True
+    # Animated GIF of each agent run's screenshots
+    save_gif: bool = True
+    # The oldest runs in logs/runs are deleted past either limit; None turns a limit off
+    max_mb: Optional[int] = 2000
+    max_age_days: Optional[int] = 14
 
 class Config(BaseModel):
     target_url: Optional[str] = None
     auto_run: bool = False
+    network: NetworkProfile = Field(default_factory=NetworkProfile)
+    # Checked before the built-in rules when classifying a run's result
+    result_rules: List[ResultRule] = []
+    artifacts: ArtifactSettings = Field(default_factory=ArtifactSettings)
+    # Devices every test runs on, by name: the built-in desktop/tablet/mobile or a device_profiles entry
+    devices: List[str] = ["desktop"]
+    device_profiles: List[DeviceProfile] = []
+    flaky: FlakyPolicy = Field(default_factory=FlakyPolicy)
+    # Limits for every test, overridden per test by TestFlow.budget; none unless configured
+    budget: TestBudget = Field(default_factory=TestBudget)
+
+# Parsed configs per file, shared by every ConfigHandler in the process
+_config_cache = VersionedCache("config")
 
 class ConfigHandler:
     def __init__(self):
-        # Use absolute path to config.json in the agents directory
-        self.config_file = os.path.join(os.path.dirname(__file__), "config.json")
+        # Use absolute path to config.json in the agents directory, unless AGENTS_CONFIG points elsewhere
+        self.config_file = os.getenv("AGENTS_CONFIG", os.path.join(os.path.dirname(__file__), "config.json"))
         self._ensure_config_exists()
 
     def _ensure_config_exists(self):
@@ -20,12 +93,19 @@ class ConfigHandler:
             ))
 
     def load_config(self) -> Config:
-        with open(self.config_file, 'r') as f:
-            return Config(**json.load(f))
+        # The settings page writes config.json directly, so key the cache on the file itself
+        version = file_version(self.config_file)
+        config = _config_cache.get(self.config_file, version)
+        if config is None:
+            with open(self.config_file, 'r') as f:
+                config = Config(**json.load(f))
+            _config_cache.put(self.config_file, version, config)
+        return config
 
     def save_config(self, config: Config):
         with open(self.config_file, 'w') as f:
             json.dump(config.model_dump(), f, indent=2)
+        _config_cache.put(self.config_file, file_version(self.config_file), config)
 
     def update_config(self, updates: Dict) -> Config:
         config = self.load_config()
@@ -0,0 +1,2 @@
+# Modules whose names look like tests but are part of the app
+collect_ignore = ["test_manager.py"]
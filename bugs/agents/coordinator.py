@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from job_queue import Job, JobQueue
+from browser_pool import BrowserPool
+from test_manager import TestManager
+from config_handler import ConfigHandler
+from run_history import RunHistory
+from run_test import run_test
+
+# Load environment variables
+load_dotenv()
+
+async def _run_job(queue: JobQueue, job: Job, worker: str, browser_pool: BrowserPool, lease_seconds: float, replay: bool):
+    """Run one leased test, heartbeating until it finishes. Gives up if the lease is lost."""
+    start = time.perf_counter()
+    run = asyncio.ensure_future(run_test(job.test_id, browser_pool=browser_pool, verbose=False, replay=replay))
+    try:
+        while True:
+            done, _ = await asyncio.wait({run}, timeout=lease_seconds / 3)
+            if done:
+                break
+            if not queue.heartbeat(job, worker, lease_seconds):
+                # Someone else has the job now; their result is the one that counts
+                print(f"Lost the lease on {job.test_id}, stopping it", file=sys.stderr)
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+                return
+    except asyncio.CancelledError:
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        queue.release(job, worker)
+        raise
+
+    analysis = run.result()
+    queue.complete(job, worker, "error" not in analysis, analysis, (time.perf_counter() - start) * 1000)
+
+async def work(
+    batch_id: int,
+    shard: Optional[int] = None,
+    concurrency: int = 2,
+    queue_path: Optional[str] = None,
+    lease_seconds: float = 60,
+    replay: bool = True
+):
+    """
+    Work through a batch: `concurrency` lanes each lease a job, run it on the shared browser
+    pool, and lease the next. Lanes keep polling while other workers still hold leases, so
+    jobs from a worker that dies are picked up once its leases expire.
+    """
+    queue = JobQueue(queue_path)
+    browser_pool = BrowserPool(size=concurrency)
+    await browser_pool.start()
+
+    async def lane(number: int):
+        worker = f"{socket.gethostname()}:{os.getpid()}/{number}"
+        while True:
+            job = queue.lease(batch_id, worker, shard, lease_seconds)
+            if job:
+                await _run_job(queue, job, worker, browser_pool, lease_seconds, replay)
+            elif queue.progress(batch_id)["leased"]:
+                await asyncio.sleep(lease_seconds / 4)
+            else:
+                return
+
+    try:
+        await asyncio.gather(*(lane(number) for number in range(concurrency)))
+    finally:
+        await browser_pool.close()
+        queue.close()
+
+def aggregate(queue: JobQueue, batch_id: int, test_manager: TestManager) -> Dict[str, Any]:
+    """Fold a batch's results back into the test store and summarise them like run_suite."""
+    jobs = queue.results(batch_id)
+    for job in jobs:
+        # Workers already set the status of the tests they finished; this covers lost workers
+        outcome = "passed" if job["status"] == "passed" else "failed"
+        test = test_manager.get_test(job["test_id"])
+        if test and test.status != outcome:
+            test_manager.update_test_status(job["test_id"], outcome)
+
+    shard_ms: Dict[int, float] = {}
+    for job in jobs:
+        shard_ms[job["shard"]] = shard_ms.get(job["shard"], 0) + (job["duration_ms"] or 0)
+    failed = sum(1 for job in jobs if job["status"] != "passed")
+    return {
+        "batch": batch_id,
+        "total": len(jobs),
+        "passed": len(jobs) - failed,
+        "failed": failed,
+        "shard_seconds": {shard: round(ms / 1000, 1) for shard, ms in sorted(shard_ms.items())},
+        "results": {job["test_id"]: job["result"] for job in jobs}
+    }
+
+def _spawn_worker(batch_id: int, shard: Optional[int], concurrency: int, queue_path: str, lease_seconds: float, replay: bool) -> subprocess.Popen:
+    command = [
+        sys.executable, os.path.abspath(__file__), "worker", str(batch_id),
+        "--concurrency", str(concurrency), "--queue", queue_path, "--lease", str(lease_seconds)
+    ]
+    if shard is not None:
+        command += ["--shard", str(shard)]
+    if not replay:
+        command.append("--no-replay")
+    return subprocess.Popen(command)
+
+async def coordinate(
+    test_ids: List[str],
+    shards: int = 2,
+    concurrency: int = 2,
+    queue_path: Optional[str] = None,
+    lease_seconds: float = 60,
+    replay: bool = True,
+    spawn: bool = True
+) -> Dict[str, Any]:
+    """
+    Shard tests across worker processes and wait for the batch to finish.
+
+    With `spawn`, one local worker process is started per shard and crashed ones are replaced.
+    Without it, the batch waits for workers started separately (`coordinator.py worker <batch>`
+    on this machine; the queue is SQLite and can't be shared over a network filesystem).
+    """
+    test_manager = TestManager()
+    if test_ids == ["all"]:
+        test_ids = [test.id for test in test_manager.get_all_tests()]
+
+    # Flaky tests are expected to take their retries too, which moves them to the front of the queue
+    policy = ConfigHandler().load_config().flaky
+    history = RunHistory(window=policy.window, min_flips=policy.min_flips)
+    weights = {test_id: history.expected_attempts(test_id, policy.retries) for test_id in test_ids}
+    history.close()
+
+    queue = JobQueue(queue_path)
+    batch_id = queue.submit(test_ids, shards, weights)
+    print(f"Batch {batch_id}: {len(test_ids)} tests in {shards} shards", file=sys.stderr)
+
+    processes = {shard: _spawn_worker(batch_id, shard, concurrency, queue.path, lease_seconds, replay) for shard in range(shards)} if spawn else {}
+    respawns = shards * queue.max_attempts
+    try:
+        while True:
+            progress = queue.progress(batch_id)
+            if not progress["queued"] and not progress["leased"]:
+                break
+            for shard, process in list(processes.items()):
+                if process.poll() is not None and process.returncode != 0 and respawns > 0:
+                    print(f"Worker for shard {shard} exited with {process.returncode}, restarting it", file=sys.stderr)
+                    respawns -= 1
+                    processes[shard] = _spawn_worker(batch_id, shard, concurrency, queue.path, lease_seconds, replay)
+            if spawn and all(process.poll() is not None for process in processes.values()) and not respawns:
+                print("No workers left; unfinished tests are reported as failed", file=sys.stderr)
+                break
+            await asyncio.sleep(1)
+    finally:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+                process.wait()
+
+    summary = aggregate(queue, batch_id, test_manager)
+    queue.close()
+    print(json.dumps(summary, indent=2))
+    return summary
+
+async def _cancel_on_sigterm(coro):
+    # Stopping a worker hands its leased jobs straight back instead of waiting for the leases to expire
+    task = asyncio.ensure_future(coro)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    # Options shared by both commands, accepted after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--queue", help="Job queue database, shared by every worker (default: jobs.db in the data directory)")
+    common.add_argument("--lease", type=float, default=60, help="Seconds a worker may go without a heartbeat")
+    common.add_argument("--concurrency", type=int, default=2, help="Browsers, and so tests at a time, per worker")
+    common.add_argument("--no-replay", action="store_true", help="Always run the LLM agent, ignoring recorded traces")
+
+    parser = argparse.ArgumentParser(description="Run tests sharded across worker processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", parents=[common], help="Shard tests over workers and wait for the results")
+    run_parser.add_argument("test_ids", nargs="+", metavar="TEST_ID", help='Test IDs, or "all"')
+    run_parser.add_argument("--shards", type=int, default=2)
+    run_parser.add_argument("--no-spawn", action="store_true", help="Don't start local workers; wait for external ones")
+
+    worker_parser = commands.add_parser("worker", parents=[common], help="Work on a submitted batch")
+    worker_parser.add_argument("batch_id", type=int)
+    worker_parser.add_argument("--shard", type=int, help="Shard to take jobs from first")
+
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.command == "run" and args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.command == "run":
+        asyncio.run(coordinate(
+            args.test_ids,
+            shards=args.shards,
+            concurrency=args.concurrency,
+            queue_path=args.queue,
+            lease_seconds=args.lease,
+            replay=not args.no_replay,
+            spawn=not args.no_spawn
+        ))
+    else:
+        asyncio.run(_cancel_on_sigterm(work(
+            args.batch_id,
+            shard=args.shard,
+            concurrency=args.concurrency,
+            queue_path=args.queue,
+            lease_seconds=args.lease,
+            replay=not args.no_replay
+        )))
@@ -1,67 +1,90 @@
 from browser_use import Agent
-from langchain_openai import ChatOpenAI
+from llm import create_llm
 import json
 import sys
+import uuid
 import asyncio
-from test_manager import TestManager
-from config_handler import ConfigHandler
-from typing import Dict, Any
-import os
-from pydantic import SecretStr
-import re
+from browser_use.browser.context import BrowserContext
+from langchain_core.language_models import BaseChatModel
+from test_manager import TestFlow, TestManager
+from config_handler import Config, ConfigHandler, ResultRule
+from result_classifier import classify
+from artifacts import ArtifactWriter, capture_conversation
+from typing import Dict, Any, List, Optional
 
-def analyze_result(result: str) -> Dict[str, Any]:
+def analyze_result(result: Any, rules: Optional[List[ResultRule]] = None) -> Dict[str, Any]:
     """Analyze the agent's result for various types of issues."""
-    result_lower = str(result).lower()
-    
-    # Basic error keywords
-    error_keywords = ['error', 'failed', 'could not', 'unable to', '404', '500', 'not found']
-    
-    # Patterns indicating repeated attempts or inconsistent behavior
-    repeated_patterns = [
-        r'attempt.*(?:unsuccessful|failed)',
-        r'tried .*(?:times|attempts)',
-        r'repeated(?:ly)?.*(?:attempt|try)',
-        r'multiple.*(?:attempt|try)',
-        r'not (?:redirecting|redirected)',
-        r'inconsistent',
-        r'unexpected.*behavior'
-    ]
-    
-    # Check for basic errors
-    has_error = any(keyword in result_lower for keyword in error_keywords)
-    
-    # Check for repeated attempts or inconsistent behavior
-    has_repeated_issues = any(re.search(pattern, result_lower) for pattern in repeated_patterns)
-    
-    if has_repeated_issues:
-        return {
-            "warning": "Validation detected potential issues",
-            "details": str(result),
-            "type": "frontend_issue",
-            "subtype": "inconsistent_behavior",
-            "description": "The application showed inconsistent behavior or required multiple attempts to perform actions"
-        }
-    elif has_error:
-        return {
-            "warning": "Validation detected potential issues",
-            "details": str(result),
-            "type": "frontend_issue",
-            "subtype": "error_response",
-            "description": "The application returned an error or failed to complete the requested action"
-        }
-    else:
+    classification = classify(result, rules)
+    if classification.passed:
         return {
             "status": "validated",
-            "details": str(result)
+            "details": classification.details
+        }
+    return {
+        "warning": "Validation detected potential issues",
+        "details": classification.details,
+        "type": classification.type,
+        "subtype": classification.subtype,
+        "description": classification.description
+    }
+
+async def validate_test(
+    test: TestFlow,
+    config: Config,
+    llm: BaseChatModel,
+    browser_context: Optional[BrowserContext] = None
+) -> Dict[str, Any]:
+    """
+    Run the agent through a test's instructions once and analyze the outcome.
+
+    Args:
+        test: The test to validate
+        config: Loaded config, for the target URL, result rules and artifact settings
+        llm: Chat model to drive the agent
+        browser_context: Optional context to run in (e.g. from a BrowserPool) instead of a browser of the agent's own
+
+    Returns:
+        Dict containing the validation analysis
+    """
+    # Keep the agent's conversation in a directory of its own
+    artifacts = ArtifactWriter(uuid.uuid4().hex, config.artifacts)
+    agent = Agent(
+        task=f"On the website {config.target_url}, {test.instructions}",
+        llm=llm,
+        browser_context=browser_context,
+        use_vision=True,
+        generate_gif=False
+    )
+    capture_conversation(agent, artifacts)
+
+    try:
+        # Run a quick validation
+        validation_result = await agent.run()
+        validation_analysis = analyze_result(validation_result, config.result_rules)
+        artifacts.write_gif(agent)
+
+        if "warning" in validation_analysis:
+            print(json.dumps(validation_analysis, indent=2), file=sys.stderr)
+
+    except Exception as e:
+        validation_analysis = {
+            "warning": "Validation failed",
+            "details": str(e),
+            "type": "validation_error",
+            "subtype": "execution_error",
+            "description": "Failed to complete validation"
         }
+        print(json.dumps(validation_analysis, indent=2), file=sys.stderr)
+    await artifacts.flush()
+    return validation_analysis
 
 async def create_test(input_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Create a test case and demonstrate browser automation.
     
     Args:
-        input_data: Dictionary containing test name, instructions and credentials
+        input_data: Dictionary containing test name, instructions and credentials, and
+            optionally "validate": false to skip the agent validation run
         
     Returns:
         Dict containing test details and results
@@ -86,45 +109,11 @@ async def create_test(input_data: Dict[str, Any]) -> Dict[str, Any]:
             credentials=input_data.get('credentials', {})
         )
         
-        # Initialize LLM
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-            
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=SecretStr(api_key),
-            base_url="https://api.openai.com/v1",
-            max_tokens=4096
-        )
-        
-        # Initialize agent to validate test
-        agent = Agent(
-            task=f"On the website {config.target_url}, {input_data['instructions']}",
-            llm=llm,
-            use_vision=True,
-            save_conversation_path="logs/test_creation.json"
-        )
-        
-        validation_result = None
+        # Validate with the agent now, unless asked to leave it for a later `bulk.py validate`
         validation_analysis = None
-        try:
-            # Run a quick validation
-            validation_result = await agent.run()
-            validation_analysis = analyze_result(str(validation_result))
-            
-            if "warning" in validation_analysis:
-                print(json.dumps(validation_analysis, indent=2), file=sys.stderr)
-                
-        except Exception as e:
-            validation_analysis = {
-                "warning": "Validation failed",
-                "details": str(e),
-                "type": "validation_error",
-                "subtype": "execution_error",
-                "description": "Failed to complete validation"
-            }
-            print(json.dumps(validation_analysis, indent=2), file=sys.stderr)
+        if input_data.get('validate', True):
+            validation_analysis = await validate_test(test, config, create_llm())
+            test = test_manager.update_test(test.id, {"validation": validation_analysis}, touch=False) or test
         
         # Add browser info to test data
         test_data = test.model_dump()
@@ -0,0 +1,26 @@
+import sqlite3
+from contextlib import contextmanager
+
+def sqlite_connect(path: str, threads: bool = False) -> sqlite3.Connection:
+    """
+    Open a SQLite database that several processes on this machine can share.
+
+    WAL lets readers carry on while one process writes, and the busy timeout makes writers
+    queue for the lock instead of failing. Transactions are explicit, see transaction().
+    With `threads`, the connection may also be used from worker threads (asyncio.to_thread).
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=not threads)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    # IMMEDIATE takes the write lock up front, so concurrent writers queue instead of failing mid-update
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,51 @@
+from typing import Dict, List, Sequence
+from browser_use.browser.context import BrowserContextConfig
+from config_handler import DeviceProfile
+
+IPHONE_USER_AGENT = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+IPAD_USER_AGENT = (
+    "Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+
+DEVICE_PRESETS: Dict[str, DeviceProfile] = {
+    "desktop": DeviceProfile(name="desktop", width=1280, height=800),
+    "tablet": DeviceProfile(
+        name="tablet", width=820, height=1180, device_scale_factor=2,
+        is_mobile=True, has_touch=True, user_agent=IPAD_USER_AGENT
+    ),
+    "mobile": DeviceProfile(
+        name="mobile", width=390, height=844, device_scale_factor=3,
+        is_mobile=True, has_touch=True, user_agent=IPHONE_USER_AGENT
+    ),
+}
+
+def resolve_devices(names: Sequence[str], profiles: Sequence[DeviceProfile] = ()) -> List[DeviceProfile]:
+    """Look up device names in the config's profiles, then the presets."""
+    known = {**DEVICE_PRESETS, **{profile.name: profile for profile in profiles}}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown devices: {', '.join(unknown)}. Known devices: {', '.join(sorted(known))}")
+    return [known[name] for name in dict.fromkeys(names)] or [DEVICE_PRESETS["desktop"]]
+
+def playwright_context_config(device: DeviceProfile) -> BrowserContextConfig:
+    # browser-use only passes the viewport and user agent on to Playwright, so the scale
+    # factor and mobile/touch flags apply to BrowserAgent's pyppeteer runs only
+    return BrowserContextConfig(
+        browser_window_size={"width": device.width, "height": device.height},
+        user_agent=device.user_agent
+    )
+
+async def apply_pyppeteer_device(page, device: DeviceProfile):
+    await page.setViewport({
+        "width": device.width,
+        "height": device.height,
+        "deviceScaleFactor": device.device_scale_factor,
+        "isMobile": device.is_mobile,
+        "hasTouch": device.has_touch
+    })
+    if device.user_agent:
+        await page.setUserAgent(device.user_agent)
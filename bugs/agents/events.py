@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+from typing import Any, Callable, Dict, Optional
+from artifacts import ArtifactWriter
+from hooks import LLMCall, LLMUsageHandler, add_step_hook
+
+class EventEmitter:
+    """
+    Structured progress events for one test run, sent to `sink` as they happen.
+
+    Every event carries its name, the test and run IDs and a timestamp. Without a sink
+    events are dropped, so callers can emit unconditionally.
+    """
+
+    def __init__(self, test_id: str, sink: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.test_id = test_id
+        self.run_id = uuid.uuid4().hex
+        self.sink = sink
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    def emit(self, event: str, **fields):
+        if self.sink:
+            self.sink({"event": event, "test_id": self.test_id, "run_id": self.run_id, "ts": time.time(), **fields})
+
+def stdout_sink() -> Callable[[Dict[str, Any]], None]:
+    """
+    Take stdout over for events: each is written as one JSON line, flushed so readers see it immediately.
+
+    Everything else written to stdout from then on, including browser-use's logging and prints,
+    goes to stderr instead, so a reader of stdout only ever gets events.
+    """
+    sys.stdout.flush()
+    events_out = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def sink(event: Dict[str, Any]):
+        events_out.write(json.dumps(event) + "\n")
+        events_out.flush()
+
+    return sink
+
+def save_screenshot(artifacts: ArtifactWriter, step: int, screenshot: Optional[str], prefix: str = "") -> Optional[str]:
+    """Queue a step's base64 screenshot for writing in the background and return its path."""
+    if not screenshot:
+        return None
+    return artifacts.write_image(f"{prefix}step_{step:03d}", base64.b64decode(screenshot))
+
+def instrument_agent(agent, events: EventEmitter, artifacts: ArtifactWriter, prefix: str = ""):
+    """Emit step_start/action/step_end events around each step of a browser-use agent."""
+
+    def on_action(state, model_output, step: int):
+        events.emit(
+            "action",
+            step=step,
+            url=state.url,
+            goal=model_output.current_state.next_goal,
+            actions=[action.model_dump(exclude_none=True) for action in model_output.action]
+        )
+
+    def on_start(number: int):
+        events.emit("step_start", step=number)
+
+    def on_end(number: int, item, duration_ms: float):
+        events.emit(
+            "step_end",
+            step=number,
+            duration_ms=round(duration_ms),
+            url=item.state.url if item else None,
+            errors=[result.error for result in item.result if result.error] if item else [],
+            done=agent.history.is_done(),
+            screenshot=save_screenshot(artifacts, number, item.state.screenshot, prefix) if item else None
+        )
+
+    agent.register_new_step_callback = on_action
+    add_step_hook(agent, on_start, on_end)
+
+class LLMEventHandler(LLMUsageHandler):
+    """Emits an llm_call event with latency and token usage for every model call, or llm_error when it fails."""
+
+    def __init__(self, events: EventEmitter):
+        super().__init__()
+        self.events = events
+
+    def on_call(self, call: LLMCall):
+        latency_ms = round(call.latency_ms) if call.latency_ms is not None else None
+        if call.error:
+            self.events.emit("llm_error", latency_ms=latency_ms, error=call.error)
+        else:
+            self.events.emit(
+                "llm_call",
+                latency_ms=latency_ms,
+                model=call.model,
+                input_tokens=call.input_tokens,
+                output_tokens=call.output_tokens
+            )
@@ -0,0 +1,32 @@
+import os
+import uuid
+from typing import Union
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def data_path(name: str) -> str:
+    """
+    Where a data file or directory lives: in AGENTS_DATA_DIR when that is set, otherwise next
+    to the code. Read on every call, so a process can point its runs somewhere else.
+    """
+    return os.path.join(os.getenv("AGENTS_DATA_DIR", AGENTS_DIR), name)
+
+def atomic_write(path: str, data: Union[str, bytes], private: bool = False):
+    """
+    Replace a file's contents in one step, so readers never see a half-written file.
+
+    Every write goes through its own temp file, so concurrent writers of the same path don't
+    clobber each other's. Private files (sessions, traces) are readable by their owner only.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600 if private else 0o666)
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,79 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, NamedTuple, Optional
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+def add_step_hook(
+    agent,
+    on_start: Optional[Callable[[int], None]] = None,
+    on_end: Optional[Callable[[int, Optional[object], float], None]] = None
+):
+    """
+    Call on_start(step) before and on_end(step, item, duration_ms) after each step of a browser-use agent.
+
+    `item` is the step's history item, or None when the step failed before acting. Every hook
+    added to an agent shares one wrapper around agent.step, so a step is timed once.
+    """
+    hooks = getattr(agent, "_step_hooks", None)
+    if hooks is None:
+        hooks = agent._step_hooks = []
+        run_step = agent.step
+
+        async def step(step_info=None):
+            number = agent.n_steps
+            recorded = len(agent.history.history)
+            for start_hook, _ in hooks:
+                if start_hook:
+                    start_hook(number)
+            start = time.perf_counter()
+            await run_step(step_info)
+            duration_ms = (time.perf_counter() - start) * 1000
+            # A step that failed before acting leaves no history item of its own
+            item = agent.history.history[-1] if len(agent.history.history) > recorded else None
+            for _, end_hook in hooks:
+                if end_hook:
+                    end_hook(number, item, duration_ms)
+
+        agent.step = step
+    hooks.append((on_start, on_end))
+
+class LLMCall(NamedTuple):
+    latency_ms: Optional[float]
+    model: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    total_tokens: int = 0
+    error: Optional[str] = None
+
+class LLMUsageHandler(AsyncCallbackHandler, ABC):
+    """LangChain callback that times every model call, reads its token usage and hands both to on_call()."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    @abstractmethod
+    def on_call(self, call: LLMCall):
+        """A model call finished, or failed if call.error is set."""
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        self.on_call(LLMCall(
+            latency_ms=self._latency(run_id),
+            model=llm_output.get("model_name"),
+            input_tokens=usage.get("prompt_tokens"),
+            output_tokens=usage.get("completion_tokens"),
+            total_tokens=usage.get("total_tokens") or (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        ))
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self.on_call(LLMCall(latency_ms=self._latency(run_id), error=str(error)))
+
+    def _latency(self, run_id: UUID) -> Optional[float]:
+        start = self._started.pop(run_id, None)
+        return (time.perf_counter() - start) * 1000 if start else None
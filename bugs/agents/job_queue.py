@@ -0,0 +1,174 @@
+import json
+import time
+import heapq
+import statistics
+from typing import Any, Dict, List, NamedTuple, Optional
+from db import sqlite_connect, transaction
+from files import data_path
+
+
+# Estimate for tests that have never finished a run
+DEFAULT_DURATION_MS = 60000
+
+class Job(NamedTuple):
+    id: int
+    batch_id: int
+    test_id: str
+    shard: int
+    attempts: int
+
+class JobQueue:
+    """
+    SQLite job queue for running a batch of tests across worker processes on one machine.
+
+    Tests are assigned to shards by their previous durations, longest first, so shards finish
+    together. Workers lease jobs, preferring their own shard and taking from others once it is
+    empty, and keep the lease alive with heartbeats. A lease that expires (the worker crashed
+    or hung) puts the job back in the queue until it has been tried `max_attempts` times.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: int = 2):
+        self.path = path or data_path("jobs.db")
+        self.max_attempts = max_attempts
+        self.conn = sqlite_connect(self.path)
+        with transaction(self.conn):
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, shards INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id INTEGER NOT NULL, test_id TEXT NOT NULL, "
+                "shard INTEGER NOT NULL, estimated_ms REAL NOT NULL, status TEXT NOT NULL DEFAULT 'queued', "
+                "worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, duration_ms REAL, finished_at REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch_status ON jobs (batch_id, status)")
+            # Smoothed run time per test, fed back from every finished job
+            self.conn.execute("CREATE TABLE IF NOT EXISTS durations (test_id TEXT PRIMARY KEY, duration_ms REAL NOT NULL)")
+
+    def estimates(self, test_ids: List[str]) -> Dict[str, float]:
+        known = dict(self.conn.execute("SELECT test_id, duration_ms FROM durations").fetchall())
+        fallback = statistics.median(known.values()) if known else DEFAULT_DURATION_MS
+        return {test_id: known.get(test_id, fallback) for test_id in test_ids}
+
+    def submit(self, test_ids: List[str], shards: int, weights: Optional[Dict[str, float]] = None) -> int:
+        """
+        Queue a batch, spreading tests over shards so each gets about the same total run time.
+
+        `weights` scale a test's estimate, e.g. by the attempts a flaky test is expected to take.
+        """
+        if shards < 1:
+            raise ValueError(f"shards must be at least 1, got {shards}")
+        estimates = {
+            test_id: estimate * (weights or {}).get(test_id, 1.0)
+            for test_id, estimate in self.estimates(test_ids).items()
+        }
+        loads = [(0.0, shard) for shard in range(shards)]
+        with transaction(self.conn):
+            batch_id = self.conn.execute(
+                "INSERT INTO batches (shards, created_at) VALUES (?, ?)", (shards, time.time())
+            ).lastrowid
+            for test_id in sorted(test_ids, key=lambda test_id: estimates[test_id], reverse=True):
+                load, shard = heapq.heappop(loads)
+                self.conn.execute(
+                    "INSERT INTO jobs (batch_id, test_id, shard, estimated_ms) VALUES (?, ?, ?, ?)",
+                    (batch_id, test_id, shard, estimates[test_id])
+                )
+                heapq.heappush(loads, (load + estimates[test_id], shard))
+        return batch_id
+
+    def lease(self, batch_id: int, worker: str, shard: Optional[int] = None, lease_seconds: float = 60) -> Optional[Job]:
+        """Take the next job, from `shard` first. Returns None when nothing is left to take."""
+        # The write lock is taken before the select, so two workers can't lease the same job
+        with transaction(self.conn):
+            self._expire_leases(batch_id)
+            row = self.conn.execute(
+                "SELECT id, batch_id, test_id, shard, attempts FROM jobs WHERE batch_id = ? AND status = 'queued' "
+                "ORDER BY shard = ? DESC, estimated_ms DESC LIMIT 1",
+                (batch_id, shard if shard is not None else -1)
+            ).fetchone()
+            if not row:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, time.time() + lease_seconds, row[0])
+            )
+        job = Job(*row)
+        return job._replace(attempts=job.attempts + 1)
+
+    def heartbeat(self, job: Job, worker: str, lease_seconds: float = 60) -> bool:
+        """Extend a lease. Returns False if the job was handed to someone else in the meantime."""
+        updated = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job.id, worker)
+        ).rowcount
+        return updated == 1
+
+    def complete(self, job: Job, worker: str, passed: bool, result: Dict[str, Any], duration_ms: float) -> bool:
+        """Record a finished job and learn from its duration. Ignored if the lease was lost."""
+        with transaction(self.conn):
+            updated = self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, duration_ms = ?, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                ("passed" if passed else "failed", json.dumps(result), duration_ms, time.time(), job.id, worker)
+            ).rowcount
+            if updated:
+                self.conn.execute(
+                    "INSERT INTO durations (test_id, duration_ms) VALUES (?, ?) "
+                    "ON CONFLICT(test_id) DO UPDATE SET duration_ms = 0.7 * duration_ms + 0.3 * excluded.duration_ms",
+                    (job.test_id, duration_ms)
+                )
+        return updated == 1
+
+    def release(self, job: Job, worker: str):
+        """Give a job back without counting the attempt, e.g. when a worker shuts down."""
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, attempts = attempts - 1 "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (job.id, worker)
+        )
+
+    def progress(self, batch_id: int) -> Dict[str, int]:
+        with transaction(self.conn):
+            self._expire_leases(batch_id)
+        counts = dict(self.conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ).fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "leased", "passed", "failed")}
+
+    def results(self, batch_id: int) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT test_id, shard, status, worker, attempts, result, duration_ms FROM jobs WHERE batch_id = ? ORDER BY id",
+            (batch_id,)
+        ).fetchall()
+        return [
+            {
+                "test_id": test_id,
+                "shard": shard,
+                "status": status,
+                "worker": worker,
+                "attempts": attempts,
+                "result": json.loads(result) if result else None,
+                "duration_ms": duration_ms
+            }
+            for test_id, shard, status, worker, attempts, result, duration_ms in rows
+        ]
+
+    def close(self):
+        self.conn.close()
+
+    def _expire_leases(self, batch_id: int):
+        now = time.time()
+        # Out of attempts: record the failure instead of handing the test to yet another worker
+        self.conn.execute(
+            "UPDATE jobs SET status = 'failed', lease_expires = NULL, finished_at = ?, result = ? "
+            "WHERE batch_id = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, json.dumps({"error": "Worker lease expired", "type": "execution_error", "subtype": "worker_lost"}),
+             batch_id, now, self.max_attempts)
+        )
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL "
+            "WHERE batch_id = ? AND status = 'leased' AND lease_expires < ?",
+            (batch_id, now)
+        )
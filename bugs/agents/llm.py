@@ -0,0 +1,30 @@
+import os
+from typing import Optional
+from langchain_openai import ChatOpenAI
+from pydantic import SecretStr
+from llm_cache import LLMCache
+
+# One cache connection per process, shared by every client it creates
+_llm_cache: Optional[LLMCache] = None
+
+def get_llm_cache() -> LLMCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+def create_llm(use_cache: Optional[bool] = None) -> ChatOpenAI:
+    """Build the chat model shared by the test runner and test creation. LLM_CACHE=off disables the response cache."""
+    if use_cache is None:
+        use_cache = os.getenv('LLM_CACHE', 'on') != 'off'
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    return ChatOpenAI(
+        model="gpt-4o",
+        api_key=SecretStr(api_key),
+        base_url="https://api.openai.com/v1",
+        max_tokens=4096,
+        cache=get_llm_cache() if use_cache else None
+    )
@@ -0,0 +1,210 @@
+import os
+import re
+import asyncio
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+import warnings
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from db import sqlite_connect
+from files import data_path
+from screenshots import perceptual_hash
+
+
+# Screenshots embedded in prompts; they never repeat byte for byte, so they are keyed by a perceptual hash
+IMAGE_DATA = re.compile(r"data:image/[a-z]+;base64,([A-Za-z0-9+/=]+)")
+# browser-use stamps every state message with the current time
+TIMESTAMP = re.compile(r"Current date and time: \d{4}-\d{2}-\d{2} \d{2}:\d{2}")
+
+def _image_fingerprint(match: re.Match) -> str:
+    try:
+        return f"image:{perceptual_hash(base64.b64decode(match.group(1))):016x}"
+    except Exception:
+        # Not something PIL can read; fall back to the exact bytes
+        return f"image:{hashlib.sha256(match.group(1).encode()).hexdigest()}"
+
+def fingerprint(prompt: str) -> str:
+    """The prompt with the parts that change between identical page states normalised away."""
+    return TIMESTAMP.sub("", IMAGE_DATA.sub(_image_fingerprint, prompt))
+
+class LLMCache(BaseCache):
+    """
+    Content-addressed LLM responses on disk, keyed by model settings + prompt + page state.
+
+    Entries are stored in SQLite and the least recently used ones are evicted once the
+    stored responses exceed `max_bytes`. Hit counts and the tokens each response cost are
+    kept so `python llm_cache.py` can report what the cache saved.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path or data_path("llm_cache.db")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Async lookups run in worker threads, see alookup(); they share the connection one at a time
+        self.conn = sqlite_connect(self.path, threads=True)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+
+    def key(self, prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{fingerprint(prompt)}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self.lookup_key(self.key(prompt, llm_string))
+
+    def lookup_key(self, key: str) -> Optional[Sequence[Generation]]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE responses SET hits = hits + 1, last_used = ? WHERE key = ?",
+                (time.time(), key)
+            )
+        with warnings.catch_warnings():
+            # loads() is marked beta, but it is what LangChain's own caches use
+            warnings.simplefilter("ignore")
+            return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        self.update_key(self.key(prompt, llm_string), _model_name(llm_string), return_val)
+
+    def update_key(self, key: str, model: Optional[str], return_val: Sequence[Generation]):
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, tokens, hits, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                (key, model, value, len(value), _tokens(return_val), now, now)
+            )
+            self._evict()
+
+    def discard(self, keys: List[str]):
+        with self._lock:
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self, **kwargs: Any):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+
+    # Keying a prompt hashes its screenshots, and SQLite blocks on disk and on other writers,
+    # so async callers do both off the event loop
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any):
+        await asyncio.to_thread(self.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size, hits, saved = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * tokens), 0) "
+                "FROM responses"
+            ).fetchone()
+            by_model = {
+                model: {"entries": count, "hits": model_hits}
+                for model, count, model_hits in self.conn.execute(
+                    "SELECT model, COUNT(*), SUM(hits) FROM responses GROUP BY model ORDER BY COUNT(*) DESC"
+                )
+            }
+        return {
+            "entries": entries,
+            "size_mb": round(size / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "hits": hits,
+            "tokens_saved": saved,
+            "session": {"hits": self.hits, "misses": self.misses},
+            "models": by_model
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _evict(self):
+        # Keep the most recently used responses that fit in max_bytes
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total FROM responses) "
+            "WHERE total > ?)",
+            (self.max_bytes,)
+        )
+
+class RunLLMCache(BaseCache):
+    """
+    One run's view of a shared LLMCache that remembers which entries the run wrote.
+
+    A failed run calls discard(), so a response it got from the model isn't replayed on the
+    next attempt. Entries it only read were written by other runs and stay.
+    """
+
+    def __init__(self, cache: LLMCache):
+        self.cache = cache
+        self.keys: List[str] = []
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self.cache.lookup_key(self.cache.key(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        key = self.cache.key(prompt, llm_string)
+        self.keys.append(key)
+        self.cache.update_key(key, _model_name(llm_string), return_val)
+
+    def clear(self, **kwargs: Any):
+        self.discard()
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any):
+        await asyncio.to_thread(self.clear)
+
+    def discard(self):
+        self.cache.discard(self.keys)
+        self.keys = []
+
+def _model_name(llm_string: str) -> Optional[str]:
+    match = re.search(r"\('model_name', '([^']+)'\)|\"model_name\": \"([^\"]+)\"", llm_string)
+    return next((group for group in match.groups() if group), None) if match else None
+
+def _tokens(generations: Sequence[Generation]) -> int:
+    total = 0
+    for generation in generations:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        total += usage.get("total_tokens", 0)
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached response")
+    args = parser.parse_args()
+
+    if not os.path.exists(data_path("llm_cache.db")):
+        print("No LLM cache yet", file=sys.stderr)
+        sys.exit(0)
+    cache = LLMCache()
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,250 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import fnmatch
+import hashlib
+from collections import Counter
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlparse
+from config_handler import NetworkProfile
+from files import data_path
+
+
+# Static resources that are safe to serve from the local cache
+CACHEABLE_TYPES = {"stylesheet", "script", "image", "font"}
+
+# Response headers worth keeping; bodies are stored decoded, so encoding and length are dropped
+CACHED_HEADERS = ("content-type", "access-control-allow-origin")
+
+# Content types for stubbed responses, so an empty script or stylesheet still parses
+STUB_CONTENT_TYPES = {"script": "application/javascript", "stylesheet": "text/css"}
+
+class CachedAsset(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+class AssetCache:
+    """
+    Static assets kept on disk across runs, keyed by URL.
+
+    Each entry is one file: a JSON header line followed by the body. Entries expire after
+    `ttl_seconds` and the least recently used ones are evicted beyond `max_bytes`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl_seconds: int = 86400, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory or data_path("asset_cache")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._puts = 0
+
+    def get(self, url: str) -> Optional[CachedAsset]:
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+        expired = time.time() - meta["saved_at"] > self.ttl_seconds
+        try:
+            if expired:
+                os.remove(path)
+            else:
+                # Mark as recently used for eviction
+                os.utime(path)
+        except FileNotFoundError:
+            # Another run expired or evicted it first
+            pass
+        return None if expired else CachedAsset(meta["status"], meta["headers"], body)
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        if status != 200 or "no-store" in headers.get("cache-control", ""):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {k: headers[k] for k in CACHED_HEADERS if k in headers},
+            "saved_at": time.time()
+        }
+        path = self._path(url)
+        # Several runs can fetch the same asset at once, so every writer gets its own temp file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+
+        self._puts += 1
+        if self._puts % 50 == 0:
+            self._evict()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                entries.append((os.stat(os.path.join(self.directory, name)), name))
+            except FileNotFoundError:
+                continue
+        entries.sort(key=lambda entry: entry[0].st_mtime, reverse=True)
+
+        total = 0
+        for stat, name in entries:
+            total += stat.st_size
+            if total > self.max_bytes:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+class NetworkPolicy:
+    """Decides what happens to each request of a run: block, stub, serve from cache or let through."""
+
+    def __init__(self, profile: NetworkProfile, cache: Optional[AssetCache] = None):
+        self.blocked_types = set(profile.block_resource_types)
+        self.blocked_urls = re.compile("|".join(fnmatch.translate(pattern) for pattern in profile.block_url_patterns)) \
+            if profile.block_url_patterns else None
+        self.stub_hosts = tuple(host.lower() for host in profile.stub_hosts)
+        if cache is None and profile.cache_assets:
+            cache = AssetCache(ttl_seconds=profile.cache_ttl_seconds, max_bytes=profile.cache_max_mb * 1024 * 1024)
+        self.cache = cache
+        self.stats = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.blocked_types or self.blocked_urls or self.stub_hosts or self.cache)
+
+    def decide(self, url: str, resource_type: str, method: str = "GET") -> str:
+        if resource_type in self.blocked_types or (self.blocked_urls and self.blocked_urls.match(url)):
+            return "block"
+        host = (urlparse(url).hostname or "").lower()
+        if any(host == stub or host.endswith(f".{stub}") for stub in self.stub_hosts):
+            return "stub"
+        if self.cache and method == "GET" and resource_type in CACHEABLE_TYPES:
+            return "cache"
+        return "continue"
+
+async def _store_asset(policy: NetworkPolicy, url: str, status: int, headers: Dict[str, str], body: bytes):
+    try:
+        await asyncio.to_thread(policy.cache.put, url, status, headers, body)
+    except OSError as e:
+        # A full or read-only disk only costs the cache entry
+        print(f"Could not cache {url}: {str(e)}", file=sys.stderr)
+
+async def apply_pyppeteer_network(page, policy: NetworkPolicy):
+    """Intercept a pyppeteer page's requests according to the policy."""
+    if not policy.enabled:
+        return
+    await page.setRequestInterception(True)
+    # Cached responses we answered ourselves, so they aren't written back
+    served = set()
+
+    async def handle(request):
+        decision = policy.decide(request.url, request.resourceType, request.method)
+        handled = False
+        try:
+            if decision == "block":
+                await request.abort("blockedbyclient")
+            elif decision == "stub":
+                await request.respond({
+                    "status": 200,
+                    "contentType": STUB_CONTENT_TYPES.get(request.resourceType, "text/plain"),
+                    "body": ""
+                })
+            elif decision == "cache" and (asset := await asyncio.to_thread(policy.cache.get, request.url)):
+                served.add(request.url)
+                decision = "cache_hit"
+                await request.respond({"status": asset.status, "headers": asset.headers, "body": asset.body})
+            else:
+                await request.continue_()
+            handled = True
+        except Exception as e:
+            print(f"Request interception failed for {request.url}: {str(e)}", file=sys.stderr)
+        if not handled:
+            # An intercepted request that is never answered stalls the page until its navigation times out
+            try:
+                await request.continue_()
+            except Exception:
+                # The page closed or navigated away
+                pass
+        policy.stats[decision] += 1
+
+    async def store(response):
+        request = response.request
+        if request.url in served or policy.decide(request.url, request.resourceType, request.method) != "cache":
+            return
+        try:
+            body = await response.buffer()
+        except Exception:
+            # Redirects and aborted responses have no body to keep
+            return
+        await _store_asset(policy, request.url, response.status, response.headers, body)
+
+    page.on("request", lambda request: asyncio.ensure_future(handle(request)))
+    if policy.cache:
+        page.on("response", lambda response: asyncio.ensure_future(store(response)))
+
+async def apply_playwright_network(browser_context, policy: NetworkPolicy):
+    """Route every request of a browser-use context according to the policy."""
+    if not policy.enabled:
+        return
+
+    async def handle(route):
+        request = route.request
+        decision = policy.decide(request.url, request.resource_type, request.method)
+        handled = False
+        fetched = None
+        try:
+            if decision == "block":
+                await route.abort("blockedbyclient")
+            elif decision == "stub":
+                await route.fulfill(
+                    status=200,
+                    content_type=STUB_CONTENT_TYPES.get(request.resource_type, "text/plain"),
+                    body=""
+                )
+            elif decision == "cache":
+                asset = await asyncio.to_thread(policy.cache.get, request.url)
+                if asset:
+                    decision = "cache_hit"
+                    await route.fulfill(status=asset.status, headers=asset.headers, body=asset.body)
+                else:
+                    try:
+                        response = await route.fetch()
+                        body = await response.body()
+                    except Exception:
+                        # Let the browser fetch it itself and report the failure as usual
+                        await route.continue_()
+                    else:
+                        await route.fulfill(response=response, body=body)
+                        fetched = (response.status, response.headers, body)
+            else:
+                await route.continue_()
+            handled = True
+        except Exception as e:
+            print(f"Request interception failed for {request.url}: {str(e)}", file=sys.stderr)
+        if not handled:
+            # A routed request that is never answered stalls the page until its navigation times out
+            try:
+                await route.continue_()
+            except Exception:
+                # The page closed or navigated away
+                pass
+        policy.stats[decision] += 1
+        # Stored after answering, so the page isn't kept waiting on the disk
+        if fetched:
+            await _store_asset(policy, request.url, *fetched)
+
+    session = await browser_context.get_session()
+    await session.context.route("**/*", handle)
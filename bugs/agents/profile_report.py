@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import glob
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List
+from profiler import PROFILES_DIR
+
+def load_spans(directory: str = PROFILES_DIR, last: int = 20) -> List[Dict[str, Any]]:
+    """Spans from the last N saved runs, oldest first."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.jsonl")))[-last:]
+    spans = []
+    for path in paths:
+        with open(path, "r") as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+def build_report(spans: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """Where the time went: totals per span kind, token usage, and the slowest steps and tests."""
+    by_kind: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+    for span in spans:
+        by_kind[span["kind"]]["count"] += 1
+        by_kind[span["kind"]]["total_ms"] += span["duration_ms"]
+
+    llm_spans = [span for span in spans if span["kind"] == "llm"]
+    slowest = lambda kind: sorted(
+        (span for span in spans if span["kind"] == kind),
+        key=lambda span: span["duration_ms"],
+        reverse=True
+    )[:top]
+
+    return {
+        "runs": len({span["run_id"] for span in spans}),
+        "by_kind": {kind: {**totals, "total_ms": round(totals["total_ms"], 1)} for kind, totals in by_kind.items()},
+        "llm": {
+            "calls": len(llm_spans),
+            "input_tokens": sum(span.get("input_tokens") or 0 for span in llm_spans),
+            "output_tokens": sum(span.get("output_tokens") or 0 for span in llm_spans)
+        },
+        "slowest_steps": slowest("step"),
+        "slowest_tests": slowest("test")
+    }
+
+def print_report(report: Dict[str, Any]):
+    print(f"Runs: {report['runs']}")
+    print("\nTime by kind (steps include their LLM calls):")
+    for kind, totals in sorted(report["by_kind"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"  {kind:<12} {totals['count']:>6} spans {totals['total_ms'] / 1000:>10.1f}s")
+    llm = report["llm"]
+    print(f"\nLLM: {llm['calls']} calls, {llm['input_tokens']} input / {llm['output_tokens']} output tokens")
+    print("\nSlowest steps:")
+    for span in report["slowest_steps"]:
+        detail = span.get("url") or span.get("target") or ""
+        print(f"  {span['duration_ms'] / 1000:>8.2f}s  test {span.get('test_id')}  step {span.get('step', span.get('type'))}  {detail}")
+    print("\nSlowest tests:")
+    for span in report["slowest_tests"]:
+        print(f"  {span['duration_ms'] / 1000:>8.2f}s  test {span.get('test_id')}  {span.get('status')}  {span.get('mode') or ''}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise the slowest steps and tests across recent runs")
+    parser.add_argument("--last", type=int, default=20, help="Number of most recent runs to include")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest steps/tests to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(last=args.last)
+    if not spans:
+        print(f"No profiles found in {PROFILES_DIR}")
+        sys.exit(1)
+
+    report = build_report(spans, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from hooks import LLMCall, LLMUsageHandler, add_step_hook
+
+PROFILES_DIR = os.path.join("logs", "profiles")
+
+class Profiler:
+    """
+    Timed spans for one test run: steps, navigations, screenshots and LLM calls.
+
+    Spans are saved as one JSON line each to logs/profiles/<time>_<run_id>.jsonl, so runs can
+    be aggregated later with profile_report.py.
+    """
+
+    def __init__(self, test_id: Optional[str] = None, directory: str = PROFILES_DIR):
+        self.test_id = test_id
+        self.run_id = uuid.uuid4().hex
+        self.directory = directory
+        self.started_at = datetime.now()
+        self.spans: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, kind: str, **fields):
+        """Time the enclosed block. Fields added to the yielded dict are saved with the span."""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except Exception as e:
+            fields["error"] = str(e)
+            raise
+        finally:
+            self.record(kind, (time.perf_counter() - start) * 1000, **fields)
+
+    def record(self, kind: str, duration_ms: float, **fields):
+        self.spans.append({
+            "run_id": self.run_id,
+            "test_id": self.test_id,
+            "kind": kind,
+            "duration_ms": round(duration_ms, 1),
+            "ts": time.time(),
+            **fields
+        })
+
+    def save(self) -> Optional[str]:
+        if not self.spans:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.started_at.strftime('%Y%m%d_%H%M%S')}_{self.run_id}.jsonl")
+        with open(path, "w") as f:
+            for span in self.spans:
+                f.write(json.dumps(span) + "\n")
+        return path
+
+class ProfilerLLMHandler(LLMUsageHandler):
+    """Records an llm span with model and tokens for every model call."""
+
+    def __init__(self, profiler: Profiler):
+        super().__init__()
+        self.profiler = profiler
+
+    def on_call(self, call: LLMCall):
+        fields = {"error": call.error} if call.error else {
+            "model": call.model,
+            "input_tokens": call.input_tokens,
+            "output_tokens": call.output_tokens
+        }
+        self.profiler.record("llm", call.latency_ms or 0, **fields)
+
+def profile_agent(agent, profiler: Profiler):
+    """Record a step span for each step of a browser-use agent."""
+
+    def on_end(number: int, item, duration_ms: float):
+        profiler.record(
+            "step",
+            duration_ms,
+            step=number,
+            url=item.state.url if item else None,
+            actions=[next(iter(action.model_dump(exclude_none=True)), None) for action in item.model_output.action]
+                if item and item.model_output else [],
+            errors=len([result for result in item.result if result.error]) if item else 1
+        )
+
+    add_step_hook(agent, on_end=on_end)
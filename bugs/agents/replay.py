@@ -0,0 +1,106 @@
+import os
+import re
+import sys
+import glob
+import json
+from typing import Any, Callable, Dict, List, Optional, Type
+from browser_use import Agent, AgentHistoryList, ActionResult
+from browser_use.agent.views import AgentOutput
+from files import atomic_write, data_path
+from step_plan import plan_hash
+
+# Same placeholder format browser-use uses for its sensitive_data
+PLACEHOLDER = re.compile(r"<secret>([^<]+)</secret>")
+
+def trace_path(test_id: str, instructions: str, target_url: str, device: str = "desktop") -> str:
+    """
+    Trace file for a test; changing the instructions or target URL points at a new file.
+
+    Devices other than desktop get traces of their own, since the page lays out differently.
+    """
+    name = test_id if device == "desktop" else f"{test_id}_{device}"
+    return os.path.join(data_path("traces"), f"{name}_{plan_hash(instructions, target_url)[:16]}.json")
+
+def _secrets(credentials: Optional[dict]) -> Dict[str, str]:
+    return {key: value for key, value in (credentials or {}).items() if isinstance(value, str) and value}
+
+def _map_strings(data: Any, apply: Callable[[str], str]) -> Any:
+    if isinstance(data, str):
+        return apply(data)
+    if isinstance(data, list):
+        return [_map_strings(item, apply) for item in data]
+    if isinstance(data, dict):
+        return {key: _map_strings(value, apply) for key, value in data.items()}
+    return data
+
+def redact(data: Any, credentials: Optional[dict]) -> Any:
+    """Replace every credential value in `data` with a <secret>key</secret> placeholder."""
+    secrets = _secrets(credentials)
+    if not secrets:
+        return data
+    keys = {}
+    for key, value in secrets.items():
+        keys.setdefault(value, key)
+    # One pass, longest values first, so a short value never matches inside a placeholder or a longer value
+    pattern = re.compile("|".join(re.escape(value) for value in sorted(keys, key=len, reverse=True)))
+    return _map_strings(data, lambda text: pattern.sub(lambda match: f"<secret>{keys[match.group(0)]}</secret>", text))
+
+def reveal(data: Any, credentials: Optional[dict]) -> Any:
+    """Put the credential values back in place of their placeholders. Raises KeyError for a missing one."""
+    secrets = _secrets(credentials)
+    return _map_strings(data, lambda text: PLACEHOLDER.sub(lambda match: secrets[match.group(1)], text))
+
+def record_trace(path: str, history: AgentHistoryList, credentials: Optional[dict] = None):
+    """
+    Save the resolved actions of a successful agent run, dropping steps that errored or had no action.
+
+    Credential values (typed passwords, and anywhere they were echoed) are stored as placeholders
+    and the file is readable by its owner only.
+    """
+    resolved = AgentHistoryList(history=[
+        item for item in history.history
+        if item.model_output and not any(result.error for result in item.result)
+    ])
+    # Older traces of the same test and device; other devices keep theirs
+    prefix = os.path.basename(path).rsplit("_", 1)[0]
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"{prefix}_{'[0-9a-f]' * 16}.json")):
+        os.remove(stale)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    atomic_write(path, json.dumps(redact(resolved.model_dump(), credentials), indent=2), private=True)
+
+def load_trace(path: str, output_model: Type[AgentOutput], credentials: Optional[dict] = None) -> AgentHistoryList:
+    """Load a recorded trace with the credential values put back into its actions, in memory only."""
+    history = AgentHistoryList.load_from_file(path, output_model)
+    for item in history.history:
+        if item.model_output:
+            item.model_output.action = [
+                type(action).model_validate(reveal(action.model_dump(), credentials))
+                for action in item.model_output.action
+            ]
+    return history
+
+def discard_traces(test_id: str):
+    for path in glob.glob(os.path.join(data_path("traces"), f"{test_id}_*.json")):
+        os.remove(path)
+
+async def replay_trace(agent: Agent, path: str, credentials: Optional[dict] = None) -> Optional[List[ActionResult]]:
+    """
+    Replay a recorded trace through the agent's browser without calling the LLM.
+
+    Elements are matched against the live DOM, so moved elements still replay. Returns None
+    when any step can't be replayed, so the caller can fall back to a normal agent run.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        history = load_trace(path, agent.AgentOutput, credentials)
+        results = await agent.rerun_history(history, max_retries=2, skip_failures=False, delay_between_actions=0.5)
+    except KeyError as e:
+        print(f"Trace needs credential {str(e)} the test no longer has, falling back to the agent", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Replay failed, falling back to the agent: {str(e)}", file=sys.stderr)
+        return None
+    if not results or not results[-1].is_done or any(result.error for result in results):
+        return None
+    return results
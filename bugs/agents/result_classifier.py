@@ -0,0 +1,164 @@
+import re
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from browser_use import ActionResult, AgentHistoryList
+from config_handler import ResultRule
+from files import data_path
+
+# Checked in order; the first rule that matches decides the subtype
+DEFAULT_RULES = [
+    ResultRule(
+        subtype="inconsistent_behavior",
+        description="The application showed inconsistent behavior or required multiple attempts to perform actions",
+        patterns=[
+            r"attempt.*(?:unsuccessful|failed)",
+            r"tried .*(?:times|attempts)",
+            r"repeated(?:ly)?.*(?:attempt|try)",
+            r"multiple.*(?:attempt|try)",
+            r"not (?:redirecting|redirected)",
+            r"inconsistent",
+            r"unexpected.*behavior"
+        ]
+    ),
+    ResultRule(
+        subtype="error_response",
+        description="The application returned an error or failed to complete the requested action",
+        patterns=[r"\berror", r"\bfailed\b", r"could not", r"unable to", r"\b404\b", r"\b500\b", r"not found"]
+    )
+]
+
+# "No errors found" and the like are the agent reporting success, not a failure
+NEGATED = re.compile(r"\b(?:no|without|zero|0)\s+(?:\w+\s+)?(?:errors?|failures?|issues?|problems?)\b", re.IGNORECASE)
+
+class Classification(NamedTuple):
+    passed: bool
+    details: str
+    type: Optional[str] = None
+    subtype: Optional[str] = None
+    description: Optional[str] = None
+    step_errors: int = 0
+    # Index of the step the run failed on: the last one with an error, else the last one
+    failing_step: Optional[int] = None
+
+class _CompiledRule(NamedTuple):
+    rule: ResultRule
+    pattern: re.Pattern
+
+# Compiled rule sets keyed by their content, so config rules are compiled once per process
+_compiled: Dict[Tuple, List[_CompiledRule]] = {}
+
+def compile_rules(rules: Sequence[ResultRule]) -> List[_CompiledRule]:
+    """One combined, case-insensitive pattern per rule."""
+    key = tuple((rule.type, rule.subtype, rule.description, tuple(rule.patterns)) for rule in rules)
+    if key not in _compiled:
+        _compiled[key] = [
+            _CompiledRule(rule, re.compile("|".join(f"(?:{pattern})" for pattern in rule.patterns), re.IGNORECASE))
+            for rule in rules if rule.patterns
+        ]
+    return _compiled[key]
+
+def _steps(result: Any) -> List[List[ActionResult]]:
+    """Action results grouped by step, for agent histories and replayed traces alike."""
+    if isinstance(result, AgentHistoryList):
+        return [item.result for item in result.history]
+    if isinstance(result, list) and all(isinstance(item, ActionResult) for item in result):
+        return [[item] for item in result]
+    return []
+
+def classify(result: Any, rules: Optional[Sequence[ResultRule]] = None) -> Classification:
+    """
+    Classify a run from its outcome rather than its whole transcript.
+
+    Only the agent's final answer and the errors of its last step are matched, so errors the
+    agent recovered from along the way don't fail the test. `rules` are checked before the
+    defaults. Plain strings (e.g. older callers passing str(result)) are matched as a whole.
+    """
+    steps = _steps(result)
+    if steps:
+        last = steps[-1]
+        done = bool(last) and last[-1].is_done
+        final = (last[-1].extracted_content if last else None) or ""
+        last_errors = [action.error for action in last if action.error]
+        step_errors = sum(1 for step in steps for action in step if action.error)
+        failing_step = next((index for index in reversed(range(len(steps))) if any(action.error for action in steps[index])), len(steps) - 1)
+        details = "\n".join([final] + last_errors).strip()
+    else:
+        done, final, last_errors, step_errors, failing_step = True, str(result), [], 0, None
+        details = final
+
+    if not done:
+        return Classification(
+            passed=False,
+            details=details or f"Stopped after {len(steps)} steps",
+            type="execution_error",
+            subtype="incomplete",
+            description="The agent stopped before completing the test",
+            step_errors=step_errors,
+            failing_step=failing_step
+        )
+
+    text = NEGATED.sub("", details)
+    for compiled in compile_rules(list(rules or []) + DEFAULT_RULES):
+        if compiled.pattern.search(text):
+            return Classification(
+                passed=False,
+                details=details,
+                type=compiled.rule.type,
+                subtype=compiled.rule.subtype,
+                description=compiled.rule.description,
+                step_errors=step_errors,
+                failing_step=failing_step
+            )
+    return Classification(passed=True, details=details, step_errors=step_errors)
+
+def _legacy_classify(result: str) -> bool:
+    """The previous whole-transcript scan, kept for the benchmark."""
+    result_lower = str(result).lower()
+    keywords = ['error', 'failed', 'could not', 'unable to', '404', '500', 'not found']
+    has_error = any(keyword in result_lower for keyword in keywords)
+    return has_error or any(re.search(pattern, result_lower) for pattern in DEFAULT_RULES[0].patterns)
+
+def _load_history(path: str, scale: int) -> Tuple[str, List[ActionResult]]:
+    """A recorded history as transcript text and as its action results, repeated `scale` times."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    history = data.get("history", []) * scale
+    results = [ActionResult(**action) for item in history for action in item.get("result", [])]
+    return json.dumps({"history": history}), results
+
+def _time(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the result classifier against the old transcript scan")
+    parser.add_argument("histories", nargs="*", help="Recorded agent histories (default: agents/traces/*.json)")
+    parser.add_argument("--scale", type=int, default=100, help="Repeat each history this many times to simulate long runs")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = args.histories or sorted(glob.glob(os.path.join(data_path("traces"), "*.json")))
+    if not paths:
+        print("No recorded histories found; pass history files or run some tests first", file=sys.stderr)
+        sys.exit(1)
+
+    for path in paths:
+        transcript, results = _load_history(path, args.scale)
+        legacy_ms = _time(lambda: _legacy_classify(transcript), args.iterations)
+        classify_ms = _time(lambda: classify(results), args.iterations)
+        print(json.dumps({
+            "history": os.path.basename(path),
+            "transcript_mb": round(len(transcript) / 1024 / 1024, 2),
+            "actions": len(results),
+            "legacy_ms": round(legacy_ms, 3),
+            "classify_ms": round(classify_ms, 3),
+            "legacy_failed": _legacy_classify(transcript),
+            "classify_failed": not classify(results).passed
+        }))
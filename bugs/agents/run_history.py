@@ -0,0 +1,133 @@
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, NamedTuple, Optional
+from db import sqlite_connect
+from files import data_path
+from config_handler import ConfigHandler
+
+
+class TestStats(NamedTuple):
+    runs: int
+    pass_rate: Optional[float]
+    # Pass/fail changes between consecutive runs; a regression has one, a flaky test keeps flipping
+    flips: int
+    flaky: bool
+    mean_duration_ms: Optional[float]
+    last_status: Optional[str]
+
+class RunHistory:
+    """
+    Every run of every test, with rolling statistics over each test's last `window` runs.
+
+    A test counts as flaky when its outcome flipped between passed and failed at least
+    `min_flips` times in the window. A test that started failing and kept failing flipped
+    once, so it reads as a regression rather than as flaky. Statistics use each run's first
+    attempt only: a failure followed by a passing retry would otherwise count as a flip.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = 20, min_flips: int = 2):
+        self.path = path or data_path("run_history.db")
+        self.window = window
+        self.min_flips = min_flips
+        self.conn = sqlite_connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, test_id TEXT NOT NULL, run_id TEXT, started_at REAL NOT NULL, "
+            "status TEXT NOT NULL, duration_ms REAL, mode TEXT, attempt INTEGER NOT NULL DEFAULT 1, "
+            "failing_step INTEGER, error_type TEXT, error_subtype TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_test ON runs (test_id, id)")
+
+    def record(
+        self,
+        test_id: str,
+        status: str,
+        duration_ms: float,
+        run_id: Optional[str] = None,
+        mode: Optional[str] = None,
+        attempt: int = 1,
+        failing_step: Optional[int] = None,
+        error_type: Optional[str] = None,
+        error_subtype: Optional[str] = None
+    ):
+        self.conn.execute(
+            "INSERT INTO runs (test_id, run_id, started_at, status, duration_ms, mode, attempt, failing_step, error_type, error_subtype) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (test_id, run_id, time.time() - duration_ms / 1000, status, duration_ms, mode, attempt, failing_step, error_type, error_subtype)
+        )
+
+    def recent(self, test_id: str, limit: Optional[int] = None, first_attempts: bool = False) -> List[Dict]:
+        """The test's last runs, newest first. With `first_attempts`, retries are left out."""
+        cursor = self.conn.execute(
+            "SELECT run_id, started_at, status, duration_ms, mode, attempt, failing_step, error_type, error_subtype "
+            f"FROM runs WHERE test_id = ? {'AND attempt = 1 ' if first_attempts else ''}ORDER BY id DESC LIMIT ?",
+            (test_id, limit or self.window)
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def stats(self, test_id: str) -> TestStats:
+        runs = self.recent(test_id, first_attempts=True)
+        if not runs:
+            return TestStats(0, None, 0, False, None, None)
+        statuses = [run["status"] for run in runs]
+        flips = sum(1 for newer, older in zip(statuses, statuses[1:]) if newer != older)
+        durations = [run["duration_ms"] for run in runs if run["duration_ms"] is not None]
+        return TestStats(
+            runs=len(runs),
+            pass_rate=statuses.count("passed") / len(runs),
+            flips=flips,
+            flaky=flips >= self.min_flips,
+            mean_duration_ms=sum(durations) / len(durations) if durations else None,
+            last_status=statuses[0]
+        )
+
+    def is_flaky(self, test_id: str) -> bool:
+        return self.stats(test_id).flaky
+
+    def expected_attempts(self, test_id: str, retries: int) -> float:
+        """Runs a test is expected to take, counting the retries a flaky test's failures get."""
+        stats = self.stats(test_id)
+        if not stats.flaky:
+            return 1.0
+        return sum((1 - stats.pass_rate) ** attempt for attempt in range(retries + 1))
+
+    def schedule(self, test_ids: List[str]) -> List[str]:
+        """
+        Order tests so flaky ones start first, then longest first.
+
+        A flaky test's retries then overlap with the rest of the suite instead of running
+        alone at the end of it.
+        """
+        stats = {test_id: self.stats(test_id) for test_id in test_ids}
+        return sorted(test_ids, key=lambda test_id: (not stats[test_id].flaky, -(stats[test_id].mean_duration_ms or 0)))
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show pass rates and flakiness from the run history")
+    parser.add_argument("test_ids", nargs="*", metavar="TEST_ID", help="Tests to show (default: every test with runs)")
+    parser.add_argument("--flaky", action="store_true", help="Only show flaky tests")
+    parser.add_argument("--runs", action="store_true", help="Include the individual runs in the window")
+    args = parser.parse_args()
+
+    policy = ConfigHandler().load_config().flaky
+    history = RunHistory(window=policy.window, min_flips=policy.min_flips)
+    test_ids = args.test_ids or [row[0] for row in history.conn.execute("SELECT DISTINCT test_id FROM runs").fetchall()]
+    if not test_ids:
+        print("No runs recorded yet", file=sys.stderr)
+        sys.exit(1)
+
+    report = {}
+    for test_id in test_ids:
+        stats = history.stats(test_id)
+        if args.flaky and not stats.flaky:
+            continue
+        report[test_id] = stats._asdict()
+        if args.runs:
+            report[test_id]["runs_in_window"] = history.recent(test_id)
+    history.close()
+    print(json.dumps(report, indent=2))
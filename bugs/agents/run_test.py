@@ -1,66 +1,149 @@
 import os
 from dotenv import load_dotenv
-from browser_use import Agent
+from browser_use import Agent, AgentHistoryList
+from browser_use.browser.context import BrowserContext
 from langchain_openai import ChatOpenAI
+from llm import create_llm
+from llm_cache import LLMCache, RunLLMCache
 from test_manager import TestManager
-from config_handler import ConfigHandler
+from config_handler import ConfigHandler, NetworkProfile, ResultRule, TestBudget
+from result_classifier import classify
+from browser_pool import BrowserPool
+from devices import playwright_context_config, resolve_devices
+from replay import discard_traces, record_trace, replay_trace, trace_path
+from session_cache import SessionCache, capture_playwright_session, restore_playwright_session
+from events import EventEmitter, LLMEventHandler, instrument_agent, stdout_sink
+from profiler import Profiler, ProfilerLLMHandler, profile_agent
+from network import NetworkPolicy, apply_playwright_network
+from artifacts import ArtifactWriter, capture_conversation
+from screenshots import limit_vision_screenshots
+from budget import BudgetExceeded, BudgetGuard
+from run_history import RunHistory
+from step_plan import record_routes
 import sys
+import time
+import uuid
+import signal
 import asyncio
-from pydantic import SecretStr
+import argparse
 import json
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Iterable, List, Optional, Tuple
 
 # Load environment variables
 load_dotenv()
 
-def analyze_result(result: str) -> Dict[str, Any]:
+def analyze_result(result: Any, rules: Optional[List[ResultRule]] = None) -> Dict[str, Any]:
     """Analyze the agent's result for various types of issues."""
-    result_lower = str(result).lower()
-    
-    # Basic error keywords
-    error_keywords = ['error', 'failed', 'could not', 'unable to', '404', '500', 'not found']
-    
-    # Patterns indicating repeated attempts or inconsistent behavior
-    repeated_patterns = [
-        r'attempt.*(?:unsuccessful|failed)',
-        r'tried .*(?:times|attempts)',
-        r'repeated(?:ly)?.*(?:attempt|try)',
-        r'multiple.*(?:attempt|try)',
-        r'not (?:redirecting|redirected)',
-        r'inconsistent',
-        r'unexpected.*behavior'
-    ]
-    
-    # Check for basic errors
-    has_error = any(keyword in result_lower for keyword in error_keywords)
-    
-    # Check for repeated attempts or inconsistent behavior
-    has_repeated_issues = any(re.search(pattern, result_lower) for pattern in repeated_patterns)
-    
-    if has_repeated_issues:
-        return {
-            "error": "Test execution failed",
-            "details": str(result),
-            "type": "frontend_issue",
-            "subtype": "inconsistent_behavior",
-            "description": "The application showed inconsistent behavior or required multiple attempts to perform actions"
-        }
-    elif has_error:
-        return {
-            "error": "Test execution failed",
-            "details": str(result),
-            "type": "frontend_issue",
-            "subtype": "error_response",
-            "description": "The application returned an error or failed to complete the requested action"
-        }
-    else:
+    classification = classify(result, rules)
+    if classification.passed:
         return {
             "status": "passed",
-            "details": str(result)
+            "details": classification.details
         }
+    return {
+        "error": "Test execution failed",
+        "details": classification.details,
+        "type": classification.type,
+        "subtype": classification.subtype,
+        "description": classification.description,
+        "failing_step": classification.failing_step
+    }
+
+def _analyze_device(result: Any, mode: str, budget: TestBudget, rules: List[ResultRule]) -> Dict[str, Any]:
+    analysis = analyze_result(result, rules)
+    analysis["mode"] = mode
+    out_of_steps = isinstance(result, AgentHistoryList) and budget.max_steps and len(result.history) >= budget.max_steps
+    if analysis.get("subtype") == "incomplete" and out_of_steps:
+        analysis.update(_budget_error(BudgetExceeded("max_steps", len(result.history), budget.max_steps)))
+    return analysis
+
+def combine_devices(analyses: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    One analysis for a run on several devices: it fails if any device failed, with the first
+    failing device's classification and every device's details tagged with its name.
+    """
+    if len(analyses) == 1:
+        return next(iter(analyses.values()))
+    failed = [analysis for analysis in analyses.values() if "error" in analysis]
+    reported = {name: analysis for name, analysis in analyses.items() if "error" in analysis} if failed else analyses
+    return {
+        **(failed[0] if failed else {"status": "passed"}),
+        "details": "\n".join(f"[{name}] {analysis['details']}" for name, analysis in reported.items()),
+        "mode": "replay" if all(analysis["mode"] == "replay" for analysis in analyses.values()) else "agent",
+        "devices": analyses
+    }
+
+async def _gather(runs: Iterable[Awaitable]) -> List[Any]:
+    # A task rather than gather's bare future, so a cancelled run doesn't log an unretrieved exception
+    return await asyncio.gather(*runs)
+
+def _budget_error(e: BudgetExceeded) -> Dict[str, Any]:
+    return {
+        "error": "Test exceeded its budget",
+        "details": str(e),
+        "type": "execution_error",
+        "subtype": "budget_exceeded",
+        "description": f"The run was stopped by its {e.limit} limit"
+    }
+
+async def run_test(
+    test_id: str,
+    browser_pool: Optional[BrowserPool] = None,
+    llm: Optional[ChatOpenAI] = None,
+    verbose: bool = True,
+    replay: bool = True,
+    events: Optional[EventEmitter] = None
+) -> Dict[str, Any]:
+    """
+    Run a single test with the browser agent.
+
+    A failed run is retried, up to `flaky.retries` times, only when the test's run history
+    shows it as flaky; a test that fails consistently fails on its first run.
+
+    Args:
+        test_id: ID of the test to run
+        browser_pool: Optional pool to borrow a browser context from instead of launching a browser
+        llm: Optional chat model to reuse instead of building a new client
+        verbose: Print the analysis to stdout
+        replay: Replay the trace of the last successful run instead of calling the LLM when possible
+        events: Optional emitter for step-level progress events
+
+    Returns:
+        Dict containing the analysis of the run
+    """
+    events = events or EventEmitter(test_id)
+    policy = ConfigHandler().load_config().flaky
+    history = RunHistory(window=policy.window, min_flips=policy.min_flips)
+    try:
+        attempt = 1
+        while True:
+            analysis = await _run_once(test_id, browser_pool, llm, replay, events, history, attempt)
+            if "error" not in analysis or attempt > policy.retries or not history.is_flaky(test_id):
+                break
+            attempt += 1
+            events.emit("retry", attempt=attempt)
+    finally:
+        history.close()
+
+    if attempt > 1:
+        analysis["attempts"] = attempt
+    if verbose:
+        print(json.dumps(analysis, indent=2))
+    return analysis
+
+async def _run_once(
+    test_id: str,
+    browser_pool: Optional[BrowserPool],
+    llm: Optional[ChatOpenAI],
+    replay: bool,
+    events: EventEmitter,
+    history: RunHistory,
+    attempt: int
+) -> Dict[str, Any]:
+    """One attempt at a test, recorded in the run history unless it was cancelled."""
+    profiler = Profiler(test_id)
+    start_time = time.perf_counter()
 
-async def run_test(test_id: str):
     # Initialize managers
     test_manager = TestManager()
     config_handler = ConfigHandler()
@@ -69,55 +152,118 @@ async def run_test(test_id: str):
     test = test_manager.get_test(test_id)
     if not test:
         print(f"Test {test_id} not found")
-        return
+        return {"error": f"Test {test_id} not found"}
     
     config = config_handler.load_config()
     if not config.target_url:
         print("Error: Target URL not configured. Please set the target URL in the settings page.")
         test_manager.update_test_status(test_id, "failed")
-        return
+        return {"error": "Target URL not configured"}
 
     # Update test status to running
     test_manager.update_test_status(test_id, "running")
+    events.emit("run_start", name=test.name)
+    artifacts = ArtifactWriter(profiler.run_id, config.artifacts)
+    budget = config.budget.merged(test.budget)
+    devices = resolve_devices(test.devices or config.devices, config.device_profiles)
 
+    llm_cache: Optional[RunLLMCache] = None
     try:
         # Initialize LLM
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-            
-        llm = ChatOpenAI(
-            model="gpt-4o",
-            api_key=SecretStr(api_key),
-            base_url="https://api.openai.com/v1",
-            max_tokens=4096
-        )
-        
-        # Initialize agent with test instructions
-        agent = Agent(
-            task=f"On the website {config.target_url}, {test.instructions}",
-            llm=llm,
-            use_vision=True,
-            save_conversation_path="logs/test_run.json"
-        )
+        if llm is None:
+            llm = create_llm()
+        # Track this run's cache entries so a failure doesn't get replayed from the cache
+        llm_cache = RunLLMCache(llm.cache) if isinstance(llm.cache, LLMCache) else None
+        if llm_cache:
+            llm = llm.model_copy(update={"cache": llm_cache})
         
-        # Run the test
-        result = await agent.run()
+        task = f"On the website {config.target_url}, {test.instructions}"
+        trace_files = {device.name: trace_path(test_id, test.instructions, config.target_url, device.name) for device in devices}
+
+        run_options = {
+            "target_url": config.target_url,
+            "credentials": test.credentials,
+            "network": config.network,
+            "artifacts": artifacts,
+            "max_steps": budget.max_steps,
+            "events": events,
+            "profiler": profiler
+        }
+
+        # A one-off run gets a pool of its own, so every run borrows its context the same way.
+        # Its browser stays visible, as it was before runs were pooled; pooled runs are headless
+        pool = browser_pool or BrowserPool(size=1, headless=False)
+        if not browser_pool:
+            await pool.start()
+        # Time and token limits cancel the run; the step limit is the agent's own
+        guard = BudgetGuard(budget)
+        llm = llm.model_copy(update={"callbacks": [*(llm.callbacks or []), guard.handler()]})
+        try:
+            # Every device runs at once, each in its own context of the same browser
+            async with pool.contexts([playwright_context_config(device) for device in devices]) as contexts:
+                outcomes = await guard.run(_gather(
+                    _run_agent(
+                        task, llm, browser_context,
+                        trace_file=trace_files[device.name] if replay else None,
+                        artifact_prefix=f"{device.name}_" if len(devices) > 1 else "",
+                        **run_options
+                    )
+                    for device, browser_context in zip(devices, contexts)
+                ))
+        finally:
+            if not browser_pool:
+                await pool.close()
+        results = {device.name: result for device, (result, _) in zip(devices, outcomes)}
         
         # Analyze the result
-        analysis = analyze_result(str(result))
+        analysis = combine_devices({
+            device.name: _analyze_device(result, mode, budget, config.result_rules)
+            for device, (result, mode) in zip(devices, outcomes)
+        })
+        analysis["artifacts"] = artifacts.path
+
+        # Remember which pages the test touched, so later runs can skip it when they didn't change
+        histories = [result for result in results.values() if isinstance(result, AgentHistoryList)]
+        visited = list(dict.fromkeys(url for result in histories for url in result.urls())) if histories else None
+        record_routes(test_manager, test, config.target_url, visited)
         
         if "error" in analysis:
             # Found an issue, mark as failed
             test_manager.update_test_status(test_id, "failed")
-            print(json.dumps(analysis, indent=2))
+            discard_traces(test_id)
+            if llm_cache:
+                llm_cache.discard()
         else:
-            # Test passed successfully
+            # Test passed successfully, keep its actions so the next run can skip the LLM
             test_manager.update_test_status(test_id, "passed")
-            print(json.dumps(analysis, indent=2))
+            for name, result in results.items():
+                if isinstance(result, AgentHistoryList):
+                    record_trace(trace_files[name], result, test.credentials)
+
+        status = "failed" if "error" in analysis else "passed"
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        profiler.record("test", duration_ms, status=status, mode=analysis["mode"], devices=list(results))
+        profiler.save()
+        history.record(
+            test_id, status, duration_ms,
+            run_id=profiler.run_id,
+            mode=analysis["mode"],
+            attempt=attempt,
+            failing_step=analysis.get("failing_step"),
+            error_type=analysis.get("type"),
+            error_subtype=analysis.get("subtype")
+        )
+        events.emit("result", status=status, duration_ms=round(duration_ms), analysis=analysis)
+        return analysis
+
+    except asyncio.CancelledError:
+        # Cancelled from outside (client went away), so this run says nothing about the test
+        test_manager.update_test(test_id, {"status": "not_run"})
+        events.emit("cancelled", duration_ms=round((time.perf_counter() - start_time) * 1000))
+        raise
             
     except Exception as e:
-        error_details = {
+        error_details = _budget_error(e) if isinstance(e, BudgetExceeded) else {
             "error": "Test execution error",
             "details": str(e),
             "type": "execution_error",
@@ -126,11 +272,176 @@ async def run_test(test_id: str):
         }
         print(json.dumps(error_details, indent=2), file=sys.stderr)
         test_manager.update_test_status(test_id, "failed")
+        if llm_cache:
+            llm_cache.discard()
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        profiler.record("test", duration_ms, status="failed", error=str(e))
+        profiler.save()
+        history.record(
+            test_id, "failed", duration_ms,
+            run_id=profiler.run_id,
+            attempt=attempt,
+            error_type=error_details["type"],
+            error_subtype=error_details["subtype"]
+        )
+        events.emit("result", status="failed", duration_ms=round(duration_ms), analysis=error_details)
+        return error_details
+
+    finally:
+        await artifacts.flush()
+
+async def _run_agent(
+    task: str,
+    llm: ChatOpenAI,
+    browser_context: BrowserContext,
+    trace_file: Optional[str] = None,
+    target_url: Optional[str] = None,
+    credentials: Optional[dict] = None,
+    network: Optional[NetworkProfile] = None,
+    artifacts: Optional[ArtifactWriter] = None,
+    max_steps: Optional[int] = None,
+    events: Optional[EventEmitter] = None,
+    profiler: Optional[Profiler] = None,
+    artifact_prefix: str = ""
+) -> Tuple[Any, str]:
+    """
+    Run the task, replaying a recorded trace first if there is one. Returns the result and "replay" or "agent".
+
+    Tests with credentials start from the cached session for that account when it is still logged in,
+    and refresh the cache after a completed run. The context comes from the caller's pool rather than
+    the agent, so a replay and its fallback share one page.
+    """
+    if network:
+        await apply_playwright_network(browser_context, NetworkPolicy(network))
+
+    session_cache = SessionCache() if credentials else None
+    if session_cache:
+        state = session_cache.load(target_url, credentials)
+        if state and not await restore_playwright_session(browser_context, state):
+            session_cache.invalidate(target_url, credentials)
+
+    # Report LLM latency on a per-run copy so a shared client isn't modified
+    callbacks = list(llm.callbacks or [])
+    if events and events.enabled:
+        callbacks.append(LLMEventHandler(events))
+    if profiler:
+        callbacks.append(ProfilerLLMHandler(profiler))
+    if callbacks:
+        llm = llm.model_copy(update={"callbacks": callbacks})
+
+    # Initialize agent with test instructions; its conversation and GIF go in the run's own directory
+    artifacts = artifacts or ArtifactWriter(profiler.run_id if profiler else uuid.uuid4().hex)
+    agent = Agent(
+        task=task,
+        llm=llm,
+        browser_context=browser_context,
+        use_vision=True,
+        generate_gif=False
+    )
+    capture_conversation(agent, artifacts, artifact_prefix)
+    limit_vision_screenshots(agent)
+    if events and events.enabled:
+        instrument_agent(agent, events, artifacts, artifact_prefix)
+    if profiler:
+        profile_agent(agent, profiler)
+
+    result, mode = None, "agent"
+    if trace_file:
+        if events:
+            events.emit("replay_start")
+        replay_start = time.perf_counter()
+        result = await replay_trace(agent, trace_file, credentials)
+        if profiler:
+            profiler.record("replay", (time.perf_counter() - replay_start) * 1000, replayed=result is not None)
+        mode = "replay" if result is not None else mode
+        if events:
+            events.emit("replay_end", replayed=result is not None)
+    if result is None:
+        result = await (agent.run(max_steps=max_steps) if max_steps else agent.run())
+        artifacts.write_gif(agent, artifact_prefix)
+
+    if session_cache and (mode == "replay" or result.is_done()):
+        try:
+            session = await capture_playwright_session(browser_context)
+            session_cache.save(target_url, credentials, session["cookies"], session["local_storage"])
+        except Exception as e:
+            # A stale session cache only costs a login next time, it shouldn't fail the test
+            print(f"Could not cache session: {str(e)}", file=sys.stderr)
+    return result, mode
+
+async def run_suite(test_ids: List[str], concurrency: int = 4, replay: bool = True) -> Dict[str, Any]:
+    """
+    Run many tests at once on one event loop, sharing a bounded pool of browsers.
+
+    Args:
+        test_ids: IDs of the tests to run, or ["all"] for every stored test
+        concurrency: Number of browsers kept open, and so the number of tests running at a time
+        replay: Replay recorded traces instead of calling the LLM when possible
+
+    Returns:
+        Dict containing pass/fail counts and the analysis of every run
+    """
+    if test_ids == ["all"]:
+        test_ids = [test.id for test in TestManager().get_all_tests()]
+    if not test_ids:
+        summary = {"total": 0, "passed": 0, "failed": 0, "results": {}}
+        print(json.dumps(summary, indent=2))
+        return summary
+
+    # Browsers are handed out in order, so flaky tests start first and their retries overlap with the rest
+    policy = ConfigHandler().load_config().flaky
+    history = RunHistory(window=policy.window, min_flips=policy.min_flips)
+    order = history.schedule(test_ids)
+    history.close()
+
+    browser_pool = BrowserPool(size=min(concurrency, len(test_ids)))
+    await browser_pool.start()
+    try:
+        # The pool hands out one browser per test, so at most `concurrency` run together
+        results = await asyncio.gather(*(
+            run_test(test_id, browser_pool=browser_pool, verbose=False, replay=replay)
+            for test_id in order
+        ))
+    finally:
+        await browser_pool.close()
+
+    failed = sum(1 for analysis in results if "error" in analysis)
+    summary = {
+        "total": len(test_ids),
+        "passed": len(test_ids) - failed,
+        "failed": failed,
+        "results": dict(zip(order, results))
+    }
+    print(json.dumps(summary, indent=2))
+    return summary
+
+async def _cancel_on_sigterm(coro):
+    # Let a streaming caller stop the run early and still close the browser and reset the status
+    task = asyncio.ensure_future(coro)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python run_test.py <test_id>")
+    parser = argparse.ArgumentParser(usage="python run_test.py <test_id> | --suite <test_id>... | --suite all")
+    parser.add_argument("test_id", nargs="?")
+    parser.add_argument("--suite", nargs="+", metavar="TEST_ID", help='Test IDs to run together, or "all"')
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of browsers to keep open in suite mode")
+    parser.add_argument("--no-replay", action="store_true", help="Always run the LLM agent, ignoring recorded traces")
+    parser.add_argument("--events", action="store_true", help="Stream progress as JSON-lines events on stdout")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    if args.suite:
+        asyncio.run(run_suite(args.suite, concurrency=args.concurrency, replay=not args.no_replay))
+    elif args.test_id and args.events:
+        events = EventEmitter(args.test_id, stdout_sink())
+        asyncio.run(_cancel_on_sigterm(run_test(args.test_id, verbose=False, replay=not args.no_replay, events=events)))
+    elif args.test_id:
+        asyncio.run(run_test(args.test_id, replay=not args.no_replay))
+    else:
+        parser.print_usage()
         sys.exit(1)
-        
-    test_id = sys.argv[1]
-    asyncio.run(run_test(test_id)) 
\ No newline at end of file
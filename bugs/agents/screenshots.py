@@ -0,0 +1,103 @@
+import io
+import base64
+import asyncio
+import hashlib
+from typing import List
+from PIL import Image
+from artifacts import ArtifactWriter
+
+class Frame:
+    """One captured screenshot, kept as raw PNG bytes until something needs another form."""
+
+    def __init__(self, label: str, data: bytes, digest: str, phash: int, path: str):
+        self.label = label
+        self.data = data
+        self.digest = digest
+        self.phash = phash
+        self.path = path
+
+# browser-use labels every screenshot it sends as image/png, so downscaled ones stay PNG
+PNG_DATA_URL = "data:image/png;base64,"
+
+def for_vision(data: bytes, max_width: int = 1024) -> bytes:
+    """The PNG scaled down to at most `max_width` pixels wide, for sending to a vision model."""
+    image = Image.open(io.BytesIO(data))
+    if image.width <= max_width:
+        return data
+    image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def _downscale_images(messages, max_width: int):
+    for message in messages:
+        if not isinstance(message.content, list):
+            continue
+        for part in message.content:
+            url = part.get("image_url", {}).get("url", "") if isinstance(part, dict) else ""
+            if url.startswith(PNG_DATA_URL):
+                png = for_vision(base64.b64decode(url[len(PNG_DATA_URL):]), max_width)
+                part["image_url"]["url"] = PNG_DATA_URL + base64.b64encode(png).decode()
+
+def limit_vision_screenshots(agent, max_width: int = 1024):
+    """
+    Downscale the screenshots a browser-use agent sends to the model.
+
+    Only the messages are changed: the agent's history, GIF and events keep full-size frames.
+    Elements are picked by index rather than by coordinates, so the model loses nothing it acts on.
+    """
+    get_next_action = agent.get_next_action
+
+    async def downscaled(input_messages):
+        await asyncio.to_thread(_downscale_images, input_messages, max_width)
+        return await get_next_action(input_messages)
+
+    agent.get_next_action = downscaled
+
+def perceptual_hash(data: bytes) -> int:
+    """64-bit difference hash: near-identical frames differ in only a few bits."""
+    image = Image.open(io.BytesIO(data))
+    image.draft("L", (18, 16))
+    pixels = list(image.convert("L").resize((9, 8)).tobytes())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+class ScreenshotPipeline:
+    """
+    On-demand screenshots for one run.
+
+    Frames are only captured when a consumer asks for one (a failure report, an assertion, a
+    vision check). A frame that looks the same as the previous one is not stored again, and
+    frames are written to disk in the background instead of blocking the step loop.
+    """
+
+    def __init__(self, artifacts: ArtifactWriter, max_distance: int = 2, prefix: str = ""):
+        self.artifacts = artifacts
+        self.prefix = prefix
+        self.max_distance = max_distance
+        self.frames: List[Frame] = []
+
+    async def capture(self, page, label: str) -> Frame:
+        data = await page.screenshot()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        last = self.frames[-1] if self.frames else None
+
+        # Byte-identical frames are free to spot; otherwise compare perceptual hashes
+        if last and last.digest == digest:
+            return last
+        phash = await asyncio.to_thread(perceptual_hash, data)
+        if last and bin(last.phash ^ phash).count("1") <= self.max_distance:
+            return last
+
+        path = self.artifacts.write_image(f"{self.prefix}{len(self.frames):03d}_{label}", data)
+        frame = Frame(label, data, digest, phash, path)
+        self.frames.append(frame)
+        return frame
+
+    async def flush(self) -> List[str]:
+        """Wait for pending disk writes and return the paths of every stored frame."""
+        await self.artifacts.flush()
+        return [frame.path for frame in self.frames]
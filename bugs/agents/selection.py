@@ -0,0 +1,125 @@
+import re
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import urllib.request
+from fnmatch import fnmatch
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+from test_manager import TestFlow, TestManager
+from config_handler import ConfigHandler
+from files import atomic_write, data_path
+from step_plan import route_of
+from run_test import run_suite
+
+# Parts of a page that change on every request without the page itself changing
+VOLATILE = re.compile(r'((?:nonce|csrf[\w-]*|authenticity_token)["\']?\s*(?:=|:|value=|content=)\s*)["\'][^"\']*["\']', re.IGNORECASE)
+
+# Statuses whose tests are always rerun: the last run failed, there is no run to go on,
+# or one was cut short while running
+ALWAYS_RUN = ("failed", "not_run", "running")
+
+def select_tests(tests: List[TestFlow], changed: List[str], target_url: str) -> Dict[str, str]:
+    """
+    Tests affected by a change, mapped to why they were picked.
+
+    `changed` holds paths, URLs or glob patterns ("/admin/*"). Tests that failed last time,
+    never ran, or have no routes recorded against `target_url` are always picked.
+    """
+    patterns = [route_of(route, target_url) or route for route in changed]
+    selected = {}
+    for test in tests:
+        if test.status in ALWAYS_RUN:
+            selected[test.id] = test.status
+        elif test.routes is None:
+            selected[test.id] = "no_routes"
+        elif test.target_url != target_url:
+            selected[test.id] = "target_url"
+        else:
+            hit = next((route for route in test.routes if any(fnmatch(route, pattern) for pattern in patterns)), None)
+            if hit:
+                selected[test.id] = f"route {hit}"
+    return selected
+
+def page_hash(body: bytes) -> str:
+    text = VOLATILE.sub(r"\1''", body.decode("utf-8", errors="replace"))
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+def _fetch_hash(url: str, timeout: float) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return page_hash(response.read())
+    except Exception as e:
+        print(f"Could not fetch {url}: {str(e)}", file=sys.stderr)
+        return None
+
+async def changed_pages(
+    routes: Iterable[str],
+    target_url: str,
+    snapshot_file: Optional[str] = None,
+    concurrency: int = 8,
+    timeout: float = 10
+) -> List[str]:
+    """
+    Fetch each route's HTML and return those whose content hash differs from the last snapshot.
+
+    Routes that are new or can't be fetched count as changed. The snapshot is updated with the
+    new hashes, so the next call diffs against this deploy.
+    """
+    snapshot_file = snapshot_file or data_path("page_hashes.json")
+    try:
+        with open(snapshot_file, 'r') as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        snapshot = {}
+    previous = snapshot.get(target_url, {})
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(route: str) -> Optional[str]:
+        async with semaphore:
+            return await asyncio.to_thread(_fetch_hash, urljoin(target_url, route), timeout)
+
+    routes = sorted(set(routes))
+    hashes = dict(zip(routes, await asyncio.gather(*(fetch(route) for route in routes))))
+    changed = [route for route in routes if hashes[route] is None or hashes[route] != previous.get(route)]
+
+    snapshot[target_url] = {**previous, **{route: digest for route, digest in hashes.items() if digest}}
+    atomic_write(snapshot_file, json.dumps(snapshot, indent=2))
+    return changed
+
+async def main(args) -> Dict:
+    config = ConfigHandler().load_config()
+    if not config.target_url:
+        print("Error: Target URL not configured. Please set the target URL in the settings page.")
+        sys.exit(1)
+
+    tests = TestManager().get_all_tests()
+    changed = list(args.changed or [])
+    if args.content:
+        routes = {route for test in tests for route in (test.routes or [])}
+        changed += await changed_pages(routes, config.target_url, concurrency=args.concurrency)
+
+    selected = select_tests(tests, changed, config.target_url)
+    report = {"total": len(tests), "selected": len(selected), "changed": changed, "tests": selected}
+    if not args.run:
+        print(json.dumps(report, indent=2))
+        return report
+    print(json.dumps(report, indent=2), file=sys.stderr)
+    return await run_suite(list(selected), concurrency=args.concurrency, replay=not args.no_replay)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select the tests affected by changed routes or page content")
+    parser.add_argument("--changed", nargs="+", metavar="ROUTE", help='Changed paths, URLs or globs, e.g. /login "/admin/*"')
+    parser.add_argument("--content", action="store_true", help="Fetch every recorded route and treat pages whose HTML changed as changed")
+    parser.add_argument("--run", action="store_true", help="Run the selected tests as a suite instead of listing them")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages fetched, or browsers kept open with --run")
+    parser.add_argument("--no-replay", action="store_true", help="Always run the LLM agent, ignoring recorded traces")
+    args = parser.parse_args()
+    if not args.changed and not args.content:
+        parser.error("pass --changed, --content or both")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    asyncio.run(main(args))
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+from typing import List, Optional
+from files import atomic_write, data_path
+from waits import wait_for_dom_stable
+
+
+# Fields both Puppeteer and Playwright accept when restoring a cookie
+COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")
+
+# Any of these on the page after restoring a session means we were logged out
+LOGIN_FORM_SELECTOR = '#password, [name="password"], [type="password"]'
+
+READ_LOCAL_STORAGE = "() => Object.assign({}, window.localStorage)"
+WRITE_LOCAL_STORAGE = "(items) => { for (const [k, v] of Object.entries(items)) window.localStorage.setItem(k, v); }"
+
+class SessionCache:
+    """
+    Logged-in browser state (cookies + localStorage) shared by tests that use the same account.
+
+    Entries are keyed by target URL and a hash of the credentials, expire after `ttl_seconds`,
+    and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl_seconds: int = 3600, max_entries: int = 50):
+        self.directory = directory or data_path("sessions")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def key(self, target_url: str, credentials: dict) -> str:
+        return hashlib.sha256(f"{target_url}\n{json.dumps(credentials, sort_keys=True)}".encode()).hexdigest()
+
+    def load(self, target_url: str, credentials: dict) -> Optional[dict]:
+        path = self._path(self.key(target_url, credentials))
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        expired = time.time() - state.get("saved_at", 0) > self.ttl_seconds
+        try:
+            if expired:
+                os.remove(path)
+            else:
+                # Mark as recently used for eviction
+                os.utime(path)
+        except FileNotFoundError:
+            # Another worker expired or evicted it first
+            pass
+        return None if expired else state
+
+    def save(self, target_url: str, credentials: dict, cookies: List[dict], local_storage: dict):
+        # Sessions are as good as passwords, so only their owner can read them
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        state = {
+            "target_url": target_url,
+            "cookies": [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies],
+            "local_storage": local_storage,
+            "saved_at": time.time()
+        }
+        path = self._path(self.key(target_url, credentials))
+        atomic_write(path, json.dumps(state), private=True)
+        self._evict()
+
+    def invalidate(self, target_url: str, credentials: dict):
+        try:
+            os.remove(self._path(self.key(target_url, credentials)))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _evict(self):
+        # Other workers evict concurrently, so any entry may be gone by the time we get to it
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+async def restore_pyppeteer_session(page, state: dict) -> bool:
+    """Apply a cached session to a pyppeteer page already on the target site. Returns False if we turn out to be logged out."""
+    if state["cookies"]:
+        await page.setCookie(*state["cookies"])
+    if state["local_storage"]:
+        await page.evaluate(WRITE_LOCAL_STORAGE, state["local_storage"])
+    await page.reload({"waitUntil": "domcontentloaded"})
+    await wait_for_dom_stable(page)
+    return await page.querySelector(LOGIN_FORM_SELECTOR) is None
+
+async def capture_pyppeteer_session(page) -> dict:
+    return {
+        "cookies": await page.cookies(),
+        "local_storage": await page.evaluate(READ_LOCAL_STORAGE)
+    }
+
+async def restore_playwright_session(browser_context, state: dict) -> bool:
+    """Apply a cached session to a browser-use context. Returns False if we turn out to be logged out."""
+    session = await browser_context.get_session()
+    if state["cookies"]:
+        await session.context.add_cookies(state["cookies"])
+    page = await browser_context.get_current_page()
+    await page.goto(state["target_url"])
+    if state["local_storage"]:
+        await page.evaluate(WRITE_LOCAL_STORAGE, state["local_storage"])
+        await page.reload()
+    return await page.query_selector(LOGIN_FORM_SELECTOR) is None
+
+async def capture_playwright_session(browser_context) -> dict:
+    session = await browser_context.get_session()
+    page = await browser_context.get_current_page()
+    return {
+        "cookies": await session.context.cookies(),
+        "local_storage": await page.evaluate(READ_LOCAL_STORAGE)
+    }
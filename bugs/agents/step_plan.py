@@ -0,0 +1,133 @@
+import re
+import sys
+import json
+import hashlib
+from typing import Iterable, List, Optional
+from urllib.parse import urljoin, urlparse
+from test_manager import TestFlow, TestManager, TestStep
+from config_handler import ConfigHandler
+
+# Bump when compile_plan changes its output, so stored plans are recompiled
+PLAN_VERSION = 3
+
+# "wait 2000", "wait 2000ms", "wait for 3 seconds": a fixed delay rather than a condition
+WAIT_DURATION = re.compile(r"^wait\s+(?:for\s+)?(\d+)\s*(ms|milliseconds?|s|secs?|seconds?)?$")
+
+def plan_hash(instructions: str, target_url: str) -> str:
+    """Key a compiled plan on everything it depends on."""
+    return hashlib.sha256(f"{PLAN_VERSION}\n{target_url}\n{instructions}".encode()).hexdigest()
+
+def compile_plan(instructions: str, target_url: str) -> List[TestStep]:
+    """Turn natural-language instructions into typed steps, one per recognised line."""
+    steps = []
+    lines = [line.strip().lower() for line in instructions.split('\n') if line.strip()]
+
+    for line in lines:
+        if 'go to' in line or 'navigate to' in line:
+            # If the step mentions a specific page/route, append it to the target URL
+            route = line.split('go to')[-1].strip() if 'go to' in line else line.split('navigate to')[-1].strip()
+            if route.startswith('http'):
+                target = route  # Use full URL if provided
+            else:
+                # Remove leading slash if present and append to target URL
+                route = route.lstrip('/')
+                target = f"{target_url.rstrip('/')}/{route}"
+            steps.append(TestStep(type="navigate", target=target))
+
+        elif 'click' in line:
+            target = line.split('click')[-1].strip()
+            steps.append(TestStep(type="click", target=target))
+
+        elif 'type' in line or 'enter' in line:
+            parts = line.split(' into ')
+            if len(parts) == 2:
+                value = parts[0].split('"')[1] if '"' in parts[0] else parts[0].split("'")[1]
+                target = parts[1].strip()
+                steps.append(TestStep(type="type", target=target, value=value))
+
+        elif 'wait' in line:
+            duration = WAIT_DURATION.match(line)
+            if duration:
+                seconds = duration.group(2) and not duration.group(2).startswith('m')
+                steps.append(TestStep(type="wait", timeout=int(duration.group(1)) * (1000 if seconds else 1)))
+            elif 'response' in line:
+                # "wait for response /api/login" waits for a matching network response
+                target = line.split('response')[-1].strip()
+                steps.append(TestStep(type="wait", target=target, value="response"))
+            elif 'wait for' in line:
+                target = line.split('wait for')[-1].strip()
+                steps.append(TestStep(type="wait", target=target))
+
+        elif any(word in line for word in ['verify', 'check', 'assert']):
+            for word in ['verify', 'check', 'assert']:
+                if word in line:
+                    target = line.split(word)[-1].strip()
+                    steps.append(TestStep(type="assert", target=target))
+                    break
+
+    return steps
+
+def get_plan(test_manager: TestManager, test: TestFlow, target_url: str) -> List[TestStep]:
+    """Return the test's stored plan, recompiling and saving it only if the instructions or target URL changed."""
+    key = plan_hash(test.instructions, target_url)
+    if test.plan is not None and test.plan_hash == key:
+        return test.plan
+
+    plan = compile_plan(test.instructions, target_url)
+    test_manager.update_test(test.id, {
+        "plan": [step.model_dump() for step in plan],
+        "plan_hash": key
+    }, touch=False)
+    return plan
+
+def route_of(url: str, target_url: str) -> Optional[str]:
+    """Path of a URL on the target site, without query or fragment. None for other sites."""
+    parsed = urlparse(urljoin(target_url, url))
+    if parsed.scheme not in ("http", "https") or parsed.netloc != urlparse(target_url).netloc:
+        return None
+    return parsed.path.rstrip("/") or "/"
+
+def plan_routes(instructions: str, target_url: str) -> List[str]:
+    """Routes the test is known to visit before it runs: the start page and its navigate steps."""
+    urls = [target_url] + [step.target for step in compile_plan(instructions, target_url) if step.type == "navigate"]
+    return sorted({route for route in (route_of(url, target_url) for url in urls) if route})
+
+def record_routes(test_manager: TestManager, test: TestFlow, target_url: str, visited: Optional[Iterable[str]] = None):
+    """
+    Store the routes a run touched on the test, and the target URL they belong to.
+
+    `visited` are the URLs seen during an agent run and replace what was stored. Without them
+    (e.g. a replayed run) the stored routes are kept and only the planned ones are added.
+    """
+    routes = set(plan_routes(test.instructions, target_url))
+    if visited is None:
+        if test.target_url == target_url:
+            routes.update(test.routes or [])
+    else:
+        routes.update(route for route in (route_of(url, target_url) for url in visited if url) if route)
+    if sorted(routes) != test.routes or test.target_url != target_url:
+        test_manager.update_test(test.id, {"routes": sorted(routes), "target_url": target_url}, touch=False)
+
+def compile_all(test_manager: TestManager, target_url: str) -> dict:
+    """Compile (or reuse) the plan of every test without launching a browser, reporting problems."""
+    report = {"compiled": 0, "empty": [], "errors": {}}
+    for test in test_manager.get_all_tests():
+        try:
+            plan = get_plan(test_manager, test, target_url)
+        except Exception as e:
+            report["errors"][test.id] = str(e)
+            continue
+        report["compiled"] += 1
+        if not plan:
+            report["empty"].append(test.id)
+    return report
+
+if __name__ == "__main__":
+    config = ConfigHandler().load_config()
+    if not config.target_url:
+        print("Error: Target URL not configured. Please set the target URL in the settings page.")
+        sys.exit(1)
+
+    report = compile_all(TestManager(), config.target_url)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["errors"] else 0)
@@ -0,0 +1,206 @@
+import os
+import json
+import fcntl
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, List, NamedTuple, Optional
+from cache import file_version
+from db import sqlite_connect, transaction
+
+class StoreWrite(NamedTuple):
+    """A committed write: the stored record and the store version just before and after it."""
+    record: Optional[dict]
+    before: Any
+    after: Any
+
+class TestStorage(ABC):
+    """Where test flows are persisted. Records are plain dicts; TestManager validates them."""
+
+    @abstractmethod
+    def version(self) -> Any:
+        """Token that changes whenever the store's contents change."""
+
+    @abstractmethod
+    def load_all(self) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def get(self, test_id: str) -> Optional[dict]:
+        ...
+
+    def get_by_status(self, status: str) -> List[dict]:
+        return [record for record in self.load_all() if record.get("status") == status]
+
+    @abstractmethod
+    def insert(self, record: dict) -> StoreWrite:
+        ...
+
+    @abstractmethod
+    def insert_many(self, records: List[dict]) -> StoreWrite:
+        """Insert several records in one write. The returned StoreWrite has no record."""
+
+    @abstractmethod
+    def update(self, test_id: str, apply: Callable[[dict], dict]) -> StoreWrite:
+        """Atomically replace a record with apply(record). The record is None if the test doesn't exist."""
+
+class JsonStorage(TestStorage):
+    """The whole store in one JSON file, rewritten on each change. Fine for small setups."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        if not os.path.exists(self.path):
+            with self._locked():
+                if not os.path.exists(self.path):
+                    self._write([])
+
+    def version(self) -> Any:
+        return file_version(self.path)
+
+    def load_all(self) -> List[dict]:
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def get(self, test_id: str) -> Optional[dict]:
+        return next((record for record in self.load_all() if record["id"] == test_id), None)
+
+    def insert(self, record: dict) -> StoreWrite:
+        with self._locked():
+            before = self.version()
+            records = self.load_all()
+            records.append(record)
+            self._write(records)
+            return StoreWrite(record, before, self.version())
+
+    def insert_many(self, records: List[dict]) -> StoreWrite:
+        with self._locked():
+            before = self.version()
+            self._write(self.load_all() + records)
+            return StoreWrite(None, before, self.version())
+
+    def update(self, test_id: str, apply: Callable[[dict], dict]) -> StoreWrite:
+        # Read-modify-write under an exclusive lock so concurrent runners don't drop each other's updates
+        with self._locked():
+            before = self.version()
+            records = self.load_all()
+            index = next((i for i, record in enumerate(records) if record["id"] == test_id), -1)
+            if index == -1:
+                return StoreWrite(None, before, before)
+            records[index] = apply(records[index])
+            self._write(records)
+            return StoreWrite(records[index], before, self.version())
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, records: List[dict]):
+        # Write to a temp file and swap it in so readers never see a half-written store
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class SqliteStorage(TestStorage):
+    """
+    SQLite store indexed by id and status, with row-level updates.
+
+    Uses WAL mode and IMMEDIATE transactions so several runner processes can write safely.
+    If the database is empty and `migrate_from` names an existing JSON store, it is imported once.
+    """
+
+    def __init__(self, path: str, migrate_from: Optional[str] = None):
+        self.path = path
+        self.conn = sqlite_connect(path)
+        with transaction(self.conn):
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tests ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tests_status ON tests (status)")
+            # Bumped by every write so readers can tell cheaply whether anything changed
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0)")
+            empty = self.conn.execute("SELECT COUNT(*) FROM tests").fetchone()[0] == 0
+            if empty and migrate_from and os.path.exists(migrate_from):
+                with open(migrate_from, 'r') as f:
+                    for record in json.load(f):
+                        self._insert_row(record)
+                    self._bump_revision()
+
+    def version(self) -> Any:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def load_all(self) -> List[dict]:
+        rows = self.conn.execute("SELECT data FROM tests ORDER BY rowid").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, test_id: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT data FROM tests WHERE id = ?", (test_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_by_status(self, status: str) -> List[dict]:
+        rows = self.conn.execute("SELECT data FROM tests WHERE status = ? ORDER BY rowid", (status,)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def insert(self, record: dict) -> StoreWrite:
+        with transaction(self.conn):
+            before = self.version()
+            self._insert_row(record)
+            return StoreWrite(record, before, self._bump_revision())
+
+    def insert_many(self, records: List[dict]) -> StoreWrite:
+        with transaction(self.conn):
+            before = self.version()
+            for record in records:
+                self._insert_row(record)
+            return StoreWrite(None, before, self._bump_revision())
+
+    def update(self, test_id: str, apply: Callable[[dict], dict]) -> StoreWrite:
+        with transaction(self.conn):
+            before = self.version()
+            row = self.conn.execute("SELECT data FROM tests WHERE id = ?", (test_id,)).fetchone()
+            if not row:
+                return StoreWrite(None, before, before)
+            record = apply(json.loads(row[0]))
+            self.conn.execute(
+                "UPDATE tests SET status = ?, data = ? WHERE id = ?",
+                (record.get("status", "not_run"), json.dumps(record), test_id)
+            )
+            return StoreWrite(record, before, self._bump_revision())
+
+    def close(self):
+        self.conn.close()
+
+    def _insert_row(self, record: dict):
+        self.conn.execute(
+            "INSERT INTO tests (id, status, data) VALUES (?, ?, ?)",
+            (record["id"], record.get("status", "not_run"), json.dumps(record))
+        )
+
+    def _bump_revision(self) -> int:
+        self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return self.version()
+
+def create_storage(storage_file: str, backend: Optional[str] = None) -> TestStorage:
+    """
+    Pick a storage backend for the given file.
+
+    The backend comes from `backend`, then the TEST_STORAGE env var ("json" or "sqlite"),
+    then the file extension. A SQLite store sitting next to a JSON file migrates it on first use.
+    """
+    root, ext = os.path.splitext(storage_file)
+    backend = backend or os.getenv("TEST_STORAGE") or ("sqlite" if ext in (".db", ".sqlite") else "json")
+
+    if backend == "json":
+        return JsonStorage(storage_file)
+    if backend == "sqlite":
+        if ext in (".db", ".sqlite"):
+            return SqliteStorage(storage_file, migrate_from=f"{root}.json")
+        return SqliteStorage(f"{root}.db", migrate_from=storage_file)
+    raise ValueError(f"Unknown test storage backend: {backend}")
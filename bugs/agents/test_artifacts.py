@@ -0,0 +1,36 @@
+import os
+import time
+from artifacts import prune
+
+def _run(directory, name, size, age_seconds):
+    path = directory / name
+    (path / "steps").mkdir(parents=True)
+    (path / "steps" / "conversation_001.txt.gz").write_bytes(b"x" * size)
+    then = time.time() - age_seconds
+    for child in [path / "steps" / "conversation_001.txt.gz", path / "steps", path]:
+        os.utime(child, (then, then))
+    return path
+
+def test_prune_removes_oldest_runs_until_under_the_size_limit(tmp_path):
+    oldest = _run(tmp_path, "1_old", 600 * 1024, 3 * 86400)
+    older = _run(tmp_path, "2_older", 600 * 1024, 2 * 86400)
+    newer = _run(tmp_path, "3_newer", 600 * 1024, 86400)
+
+    assert prune(str(tmp_path), max_mb=1) == 2
+    assert not oldest.exists() and not older.exists() and newer.exists()
+
+def test_prune_removes_runs_past_the_age_limit(tmp_path):
+    old = _run(tmp_path, "1_old", 10, 20 * 86400)
+    recent = _run(tmp_path, "2_recent", 10, 2 * 86400)
+
+    assert prune(str(tmp_path), max_age_days=14) == 1
+    assert not old.exists() and recent.exists()
+
+def test_prune_leaves_kept_and_recently_written_runs(tmp_path):
+    kept = _run(tmp_path, "1_kept", 600 * 1024, 3 * 86400)
+    active = _run(tmp_path, "2_active", 600 * 1024, 2 * 86400)
+    # Another process is still writing this run's files
+    (active / "steps" / "conversation_002.txt.gz").write_bytes(b"y")
+
+    assert prune(str(tmp_path), max_mb=0, keep=str(kept)) == 0
+    assert kept.exists() and active.exists()
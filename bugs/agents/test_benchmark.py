@@ -0,0 +1,32 @@
+import os
+import pytest
+import replay
+import run_history
+from benchmark import isolated
+
+def test_isolated_points_data_files_at_the_workdir(tmp_path):
+    with isolated(str(tmp_path)):
+        assert os.getcwd() == str(tmp_path)
+        assert os.environ["AGENTS_CONFIG"] == str(tmp_path / "config.json")
+        assert os.path.dirname(replay.trace_path("t1", "Go to /", "http://localhost")) == str(tmp_path / "traces")
+        history = run_history.RunHistory()
+        assert history.path == str(tmp_path / "run_history.db")
+        history.conn.close()
+
+def test_isolated_restores_everything_after_an_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTS_CONFIG", "/real/config.json")
+    monkeypatch.setenv("AGENTS_DATA_DIR", "/real/data")
+    cwd = os.getcwd()
+    with pytest.raises(RuntimeError):
+        with isolated(str(tmp_path)):
+            raise RuntimeError("run failed")
+    assert os.getcwd() == cwd
+    assert os.environ["AGENTS_CONFIG"] == "/real/config.json"
+    assert os.environ["AGENTS_DATA_DIR"] == "/real/data"
+
+def test_isolated_unsets_variables_that_were_not_set(tmp_path, monkeypatch):
+    monkeypatch.delenv("AGENTS_CONFIG", raising=False)
+    monkeypatch.delenv("AGENTS_DATA_DIR", raising=False)
+    with isolated(str(tmp_path)):
+        pass
+    assert "AGENTS_CONFIG" not in os.environ and "AGENTS_DATA_DIR" not in os.environ
@@ -0,0 +1,27 @@
+import asyncio
+from types import SimpleNamespace
+from browser_agent import BrowserAgent
+from test_manager import TestStep
+
+class TimingOutWaiter:
+    def timeout(self, kind, default_ms):
+        return default_ms
+
+    async def selector(self, page, kind, selector, default_ms, visible=True):
+        return False
+
+    async def response(self, page, url_pattern, default_ms):
+        return False
+
+def wait(step, next_step=None):
+    agent = SimpleNamespace(waits=TimingOutWaiter())
+    return asyncio.run(BrowserAgent.wait(agent, None, step, next_step))
+
+def test_explicit_waits_that_time_out_fail():
+    assert wait(TestStep(type="wait", target="#step2-form")) == "Wait failed: #step2-form - not found within 10000 ms"
+    assert wait(TestStep(type="wait", target="/api/login", value="response", timeout=2000)) == (
+        "Wait failed: no response matching /api/login within 2000 ms"
+    )
+
+def test_implicit_wait_for_the_next_step_leaves_failing_to_that_step():
+    assert wait(TestStep(type="wait", timeout=2000), TestStep(type="click", target="#submit")) is None
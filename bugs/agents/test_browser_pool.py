@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from browser_pool import BrowserPool, PagePool, _Pool
+
+@pytest.mark.parametrize("pool_class", [BrowserPool, PagePool])
+@pytest.mark.parametrize("size", [0, -1])
+def test_pool_rejects_sizes_below_one(pool_class, size):
+    with pytest.raises(ValueError):
+        pool_class(size=size)
+
+def test_pool_keeps_its_size():
+    assert BrowserPool(size=3).stats()["size"] == 3
+
+def test_base_pool_is_abstract():
+    with pytest.raises(TypeError):
+        _Pool(size=1)
+
+class FakeContext:
+    def __init__(self, config):
+        self.config = config
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, config):
+        self.contexts.append(FakeContext(config))
+        return self.contexts[-1]
+
+    async def close(self):
+        pass
+
+class FakeBrowserPool(BrowserPool):
+    async def _launch(self):
+        return FakeBrowser(), None
+
+    def _is_alive(self, browser):
+        return True
+
+def test_contexts_share_one_browser_and_are_closed():
+    async def main():
+        pool = FakeBrowserPool(size=2)
+        await pool.start()
+        async with pool.contexts(["desktop", "mobile"]) as contexts:
+            assert [context.config for context in contexts] == ["desktop", "mobile"]
+            assert pool.stats()["available"] == 1
+        assert all(context.closed for context in contexts)
+        assert pool.stats()["available"] == 2
+        return pool
+
+    pool = asyncio.run(main())
+    assert [len(slot.browser.contexts) for slot in pool._slots] == [2, 0]
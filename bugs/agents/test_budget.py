@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from budget import BudgetExceeded, BudgetGuard
+from config_handler import Config, TestBudget
+from hooks import LLMCall
+
+def test_merged_takes_only_the_values_the_override_sets():
+    defaults = TestBudget(max_steps=50, max_seconds=600, fail_fast=True)
+    merged = defaults.merged(TestBudget(max_steps=10, fail_fast=False))
+    assert merged == TestBudget(max_steps=10, max_seconds=600, fail_fast=False)
+
+def test_merged_without_override_is_an_unchanged_copy():
+    defaults = TestBudget(max_steps=50)
+    merged = defaults.merged(None)
+    assert merged == defaults and merged is not defaults
+    merged.max_steps = 10
+    assert defaults.max_steps == 50
+
+def test_config_has_no_limits_by_default():
+    assert Config().budget == TestBudget()
+
+def test_guard_returns_the_result_within_budget():
+    guard = BudgetGuard(TestBudget(max_seconds=1))
+    assert asyncio.run(guard.run(asyncio.sleep(0, result="done"))) == "done"
+
+def test_guard_stops_runs_past_max_seconds():
+    guard = BudgetGuard(TestBudget(max_seconds=0.05))
+    with pytest.raises(BudgetExceeded) as exceeded:
+        asyncio.run(guard.run(asyncio.sleep(5)))
+    assert exceeded.value.limit == "max_seconds"
+
+def test_guard_cancels_runs_past_max_tokens():
+    guard = BudgetGuard(TestBudget(max_tokens=100))
+    handler = guard.handler()
+
+    async def run():
+        handler.on_call(LLMCall(latency_ms=10, total_tokens=60))
+        await asyncio.sleep(0)
+        handler.on_call(LLMCall(latency_ms=10, total_tokens=60))
+        await asyncio.sleep(5)
+
+    with pytest.raises(BudgetExceeded) as exceeded:
+        asyncio.run(guard.run(run()))
+    assert (exceeded.value.limit, exceeded.value.used) == ("max_tokens", 120)
+
+def test_failed_calls_do_not_count_against_tokens():
+    guard = BudgetGuard(TestBudget(max_tokens=100))
+    guard.handler().on_call(LLMCall(latency_ms=10, total_tokens=500, error="RateLimitError"))
+    assert guard.tokens == 0 and guard.exceeded is None
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import asyncio
+import pytest
+from bulk import RateLimiter, import_tests, read_specs, write_specs
+from test_manager import TestManager
+
+SPECS = [
+    {"name": "Login", "instructions": "Go to /login", "credentials": {"password": "hunter2"}},
+    {"name": "Home", "instructions": "Go to /", "devices": ["mobile"]}
+]
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_STORAGE", "json")
+    return TestManager(str(tmp_path / "test_flows.json"))
+
+@pytest.mark.parametrize("name, content", [
+    ("tests.jsonl", "\n".join(json.dumps(spec) for spec in SPECS) + "\n\n"),
+    ("tests.json", json.dumps({"tests": SPECS})),
+    ("tests.yaml", "- name: Login\n  instructions: Go to /login\n  credentials: {password: hunter2}\n"
+                   "- name: Home\n  instructions: Go to /\n  devices: [mobile]\n")
+])
+def test_read_specs_formats(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    assert read_specs(str(path)) == SPECS
+
+def test_read_specs_rejects_other_shapes(tmp_path):
+    path = tmp_path / "tests.json"
+    path.write_text(json.dumps({"name": "Login"}))
+    with pytest.raises(ValueError):
+        read_specs(str(path))
+
+def test_import_creates_every_test(tmp_path, manager):
+    path = tmp_path / "tests.json"
+    path.write_text(json.dumps(SPECS))
+    tests = import_tests(str(path), manager)
+    assert [test.name for test in manager.get_all_tests()] == ["Login", "Home"]
+    assert tests[1].devices == ["mobile"]
+
+def test_import_writes_nothing_if_any_spec_is_invalid(tmp_path, manager):
+    path = tmp_path / "tests.json"
+    path.write_text(json.dumps(SPECS + [{"name": "No instructions"}, {"instructions": "Go to /"}]))
+    with pytest.raises(ValueError, match="test 3.*\n.*test 4"):
+        import_tests(str(path), manager)
+    assert manager.get_all_tests() == []
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.yaml", "out.json"])
+def test_export_round_trips_without_credentials(tmp_path, manager, name):
+    tests = manager.create_tests(SPECS)
+    path = str(tmp_path / name)
+    write_specs(path, tests)
+    assert read_specs(path) == [{k: v for k, v in spec.items() if k != "credentials"} for spec in SPECS]
+    assert not [leftover for leftover in os.listdir(tmp_path) if leftover.endswith(".tmp")]
+
+def test_export_with_credentials_is_private(tmp_path, manager):
+    tests = manager.create_tests(SPECS)
+    path = str(tmp_path / "out.json")
+    write_specs(path, tests, include_credentials=True)
+    assert read_specs(path)[0]["credentials"] == {"password": "hunter2"}
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+@pytest.mark.parametrize("per_minute", [0, -5])
+def test_rate_limiter_rejects_non_positive_rates(per_minute):
+    with pytest.raises(ValueError):
+        RateLimiter(per_minute)
+
+def test_rate_limiter_spaces_out_starts():
+    async def starts():
+        limiter = RateLimiter(per_minute=600)
+        times = []
+
+        async def start():
+            await limiter.wait()
+            times.append(time.monotonic())
+
+        await asyncio.gather(*(start() for _ in range(3)))
+        return times
+
+    times = asyncio.run(starts())
+    assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
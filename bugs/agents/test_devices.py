@@ -0,0 +1,26 @@
+import pytest
+from config_handler import DeviceProfile
+from devices import DEVICE_PRESETS, playwright_context_config, resolve_devices
+
+def test_resolves_presets_in_order_without_duplicates():
+    devices = resolve_devices(["mobile", "desktop", "mobile"])
+    assert [device.name for device in devices] == ["mobile", "desktop"]
+
+def test_config_profiles_override_presets():
+    wide = DeviceProfile(name="desktop", width=1920, height=1080)
+    phone = DeviceProfile(name="small-phone", width=360, height=640, is_mobile=True)
+    devices = resolve_devices(["desktop", "small-phone"], [wide, phone])
+    assert devices == [wide, phone]
+
+def test_no_devices_means_desktop():
+    assert resolve_devices([]) == [DEVICE_PRESETS["desktop"]]
+
+def test_unknown_devices_are_rejected_with_the_known_names():
+    with pytest.raises(ValueError, match="Unknown devices: watch.*desktop, mobile, tablet"):
+        resolve_devices(["desktop", "watch"])
+
+def test_playwright_context_gets_viewport_and_user_agent():
+    [mobile] = resolve_devices(["mobile"], [])
+    config = playwright_context_config(mobile)
+    assert config.browser_window_size == {"width": mobile.width, "height": mobile.height}
+    assert config.user_agent == mobile.user_agent
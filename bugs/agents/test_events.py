@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import asyncio
+import subprocess
+from types import SimpleNamespace
+from events import EventEmitter, LLMEventHandler, instrument_agent
+from hooks import LLMCall
+from profiler import Profiler, profile_agent
+
+SCRIPT = """
+import logging, sys
+logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+from events import EventEmitter, stdout_sink
+events = EventEmitter("t1", stdout_sink())
+print("Test t1 not found")
+logging.getLogger("browser_use").info("step 1")
+events.emit("step_start", step=1)
+"""
+
+def test_stdout_carries_only_events():
+    run = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    )
+    lines = run.stdout.splitlines()
+    assert [json.loads(line)["event"] for line in lines] == ["step_start"]
+    assert "Test t1 not found" in run.stderr
+    assert "step 1" in run.stderr
+
+class FakeAgent:
+    """Just enough of a browser-use agent for instrument_agent."""
+
+    def __init__(self):
+        self.n_steps = 1
+        self.history = SimpleNamespace(history=[], is_done=lambda: False)
+        self.register_new_step_callback = None
+
+    async def step(self, step_info=None):
+        self.history.history.append(SimpleNamespace(
+            state=SimpleNamespace(url="http://localhost/", screenshot=None),
+            model_output=None,
+            result=[SimpleNamespace(error="Element not found")]
+        ))
+        self.n_steps += 1
+
+def test_step_events_share_the_step_wrapper_with_the_profiler(tmp_path):
+    agent = FakeAgent()
+    events = []
+    profiler = Profiler("t1", directory=str(tmp_path))
+    instrument_agent(agent, EventEmitter("t1", events.append), artifacts=None)
+    profile_agent(agent, profiler)
+
+    asyncio.run(agent.step())
+
+    start, end = events
+    assert (start["event"], end["event"]) == ("step_start", "step_end")
+    assert (end["url"], end["errors"]) == ("http://localhost/", ["Element not found"])
+    assert len(profiler.spans) == 1
+
+def test_llm_events_for_calls_and_errors():
+    events = []
+    handler = LLMEventHandler(EventEmitter("t1", events.append))
+    handler.on_call(LLMCall(latency_ms=12.4, model="gpt-4o", input_tokens=100, output_tokens=20, total_tokens=120))
+    handler.on_call(LLMCall(latency_ms=3, error="RateLimitError"))
+
+    call, error = events
+    assert (call["event"], call["latency_ms"], call["input_tokens"]) == ("llm_call", 12, 100)
+    assert (error["event"], error["error"]) == ("llm_error", "RateLimitError")
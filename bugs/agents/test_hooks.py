@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+from langchain_core.outputs import LLMResult
+from hooks import add_step_hook
+from profiler import Profiler, ProfilerLLMHandler, profile_agent
+
+class FakeAgent:
+    """Just enough of a browser-use agent for the step hooks: the second step fails before acting."""
+
+    def __init__(self):
+        self.n_steps = 1
+        self.history = SimpleNamespace(history=[], is_done=lambda: False)
+        self.register_new_step_callback = None
+
+    async def step(self, step_info=None):
+        if self.n_steps != 2:
+            self.history.history.append(SimpleNamespace(
+                state=SimpleNamespace(url=f"http://localhost/{self.n_steps}", screenshot=None),
+                model_output=None,
+                result=[SimpleNamespace(error=None)]
+            ))
+        self.n_steps += 1
+
+def test_step_hooks_share_one_wrapper():
+    agent = FakeAgent()
+    calls = []
+    add_step_hook(agent, on_start=lambda step: calls.append(("start", step)))
+    wrapped = agent.step
+    add_step_hook(agent, on_end=lambda step, item, ms: calls.append(("end", step, item.state.url if item else None)))
+    assert agent.step is wrapped
+
+    for _ in range(3):
+        asyncio.run(agent.step())
+
+    assert calls == [
+        ("start", 1), ("end", 1, "http://localhost/1"),
+        ("start", 2), ("end", 2, None),
+        ("start", 3), ("end", 3, "http://localhost/3")
+    ]
+
+def test_profile_agent_records_step_spans(tmp_path):
+    agent = FakeAgent()
+    profiler = Profiler("t1", directory=str(tmp_path))
+    profile_agent(agent, profiler)
+
+    asyncio.run(agent.step())
+
+    [span] = profiler.spans
+    assert span["kind"] == "step" and span["errors"] == 0 and "retries" not in span
+
+def llm_end(handler, usage):
+    run_id = uuid4()
+    asyncio.run(handler.on_chat_model_start({}, [], run_id=run_id))
+    asyncio.run(handler.on_llm_end(LLMResult(generations=[], llm_output={"token_usage": usage, "model_name": "gpt-4o"}), run_id=run_id))
+
+def test_profiler_handler_reads_tokens(tmp_path):
+    profiler = Profiler("t1", directory=str(tmp_path))
+    llm_end(ProfilerLLMHandler(profiler), {"prompt_tokens": 100, "completion_tokens": 20})
+
+    [span] = profiler.spans
+    assert (span["model"], span["input_tokens"], span["output_tokens"]) == ("gpt-4o", 100, 20)
@@ -0,0 +1,63 @@
+import pytest
+from job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+def _record_durations(queue, durations):
+    with queue.conn:
+        queue.conn.executemany("INSERT INTO durations (test_id, duration_ms) VALUES (?, ?)", durations.items())
+
+def test_submit_balances_shards_by_duration(queue):
+    durations = {"a": 100, "b": 60, "c": 50, "d": 40, "e": 10}
+    _record_durations(queue, durations)
+    batch_id = queue.submit(list(durations), shards=2)
+
+    shards = {}
+    for job in queue.results(batch_id):
+        shards.setdefault(job["shard"], set()).add(job["test_id"])
+    # Longest first, each onto the lightest shard so far
+    assert sorted(shards.values(), key=len) == [{"a", "d"}, {"b", "c", "e"}]
+
+def test_submit_weights_scale_estimates(queue):
+    _record_durations(queue, {"a": 100, "b": 100})
+    batch_id = queue.submit(["a", "b"], shards=1, weights={"b": 3})
+    job = queue.lease(batch_id, "worker-1")
+    assert job.test_id == "b"
+
+def test_unknown_tests_get_the_median_estimate(queue):
+    _record_durations(queue, {"a": 100, "b": 300})
+    assert queue.estimates(["new"]) == {"new": 200}
+
+@pytest.mark.parametrize("shards", [0, -1])
+def test_submit_rejects_shards_below_one(queue, shards):
+    with pytest.raises(ValueError):
+        queue.submit(["a"], shards=shards)
+
+def test_lease_prefers_own_shard_then_takes_from_others(queue):
+    _record_durations(queue, {"a": 100, "b": 50})
+    batch_id = queue.submit(["a", "b"], shards=2)
+    shards = {job["test_id"]: job["shard"] for job in queue.results(batch_id)}
+
+    first = queue.lease(batch_id, "worker-1", shard=shards["b"])
+    second = queue.lease(batch_id, "worker-1", shard=shards["b"])
+    assert (first.test_id, second.test_id) == ("b", "a")
+    assert queue.lease(batch_id, "worker-1") is None
+
+def test_expired_lease_is_retried_until_attempts_run_out(queue):
+    batch_id = queue.submit(["a"], shards=1)
+    queue.lease(batch_id, "worker-1", lease_seconds=-1)
+    retry = queue.lease(batch_id, "worker-2", lease_seconds=-1)
+    assert retry.attempts == 2
+
+    assert queue.lease(batch_id, "worker-3") is None
+    assert queue.progress(batch_id)["failed"] == 1
+
+def test_complete_is_ignored_after_losing_the_lease(queue):
+    batch_id = queue.submit(["a"], shards=1)
+    job = queue.lease(batch_id, "worker-1", lease_seconds=-1)
+    queue.lease(batch_id, "worker-2")
+    assert not queue.complete(job, "worker-1", True, {}, 1000)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+from llm_cache import LLMCache, RunLLMCache, fingerprint
+
+LLM = "[('model_name', 'gpt-4o')]"
+
+def answer(text):
+    return ChatGeneration(message=AIMessage(text))
+
+def test_fingerprint_ignores_the_timestamp():
+    assert fingerprint("Current date and time: 2025-01-01 10:00 page") == fingerprint("Current date and time: 2025-06-01 12:30 page")
+
+def test_failed_run_only_discards_what_it_wrote(tmp_path):
+    shared = LLMCache(str(tmp_path / "cache.db"))
+    shared.update("passing run's prompt", LLM, [answer("kept")])
+
+    run = RunLLMCache(shared)
+    assert run.lookup("passing run's prompt", LLM)[0].text == "kept"
+    run.update("failing run's prompt", LLM, [answer("dropped")])
+    run.discard()
+
+    assert shared.lookup("passing run's prompt", LLM)[0].text == "kept"
+    assert shared.lookup("failing run's prompt", LLM) is None
+
+def test_async_lookups_run_off_the_event_loop(tmp_path, monkeypatch):
+    shared = LLMCache(str(tmp_path / "cache.db"))
+    run = RunLLMCache(shared)
+    threads = []
+    real_key = shared.key
+    def key(prompt, llm_string):
+        threads.append(threading.current_thread())
+        return real_key(prompt, llm_string)
+    monkeypatch.setattr(shared, "key", key)
+
+    async def main():
+        await run.aupdate("prompt", LLM, [answer("answer")])
+        return await run.alookup("prompt", LLM)
+
+    assert asyncio.run(main())[0].text == "answer"
+    assert threads and threading.main_thread() not in threads
+
+def test_concurrent_async_calls_share_the_connection_safely(tmp_path):
+    shared = LLMCache(str(tmp_path / "cache.db"))
+    runs = [RunLLMCache(shared) for _ in range(8)]
+
+    async def use(run, n):
+        for i in range(20):
+            await run.aupdate(f"prompt {n} {i}", LLM, [answer(f"{n} {i}")])
+            assert (await shared.alookup(f"prompt {n} {i}", LLM))[0].text == f"{n} {i}"
+
+    async def main():
+        await asyncio.gather(*(use(run, n) for n, run in enumerate(runs)))
+
+    asyncio.run(main())
+    assert shared.stats()["entries"] == 160
+    assert shared.stats()["session"] == {"hits": 160, "misses": 0}
@@ -1,8 +1,11 @@
-import json
 import os
-from typing import List, Optional
+import secrets
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from pydantic import BaseModel
+from cache import VersionedCache
+from config_handler import TestBudget
+from storage import StoreWrite, TestStorage, create_storage
 
 class TestStep(BaseModel):
     type: str
@@ -19,29 +22,55 @@ class TestFlow(BaseModel):
     updated_at: Optional[str] = None
     last_run: Optional[str] = None
     status: str = "not_run"
+    # Steps compiled from the instructions, reused until plan_hash no longer matches
+    plan: Optional[List[TestStep]] = None
+    plan_hash: Optional[str] = None
+    # Paths on the target site the test visits, for rerunning only tests a change affects
+    routes: Optional[List[str]] = None
+    # Target URL the routes were recorded against; a different one makes them meaningless
+    target_url: Optional[str] = None
+    # Step, time and token limits for this test, on top of the config's
+    budget: Optional[TestBudget] = None
+    # Device names to run on instead of the config's
+    devices: Optional[List[str]] = None
+    # Outcome of the agent validation run when the test was created; None until it has been validated
+    validation: Optional[Dict[str, Any]] = None
+
+# Validated tests per store, shared by every TestManager in the process
+_tests_cache = VersionedCache("tests")
+
+def new_test_id() -> str:
+    """Millisecond timestamp plus a random suffix, so tests created in the same millisecond don't collide."""
+    return f"{int(datetime.now().timestamp() * 1000)}-{secrets.token_hex(6)}"
 
 class TestManager:
-    def __init__(self, storage_file: str = "test_flows.json"):
+    def __init__(self, storage_file: str = "test_flows.json", storage: Optional[TestStorage] = None):
         self.storage_file = storage_file
-        self._ensure_storage_exists()
-
-    def _ensure_storage_exists(self):
-        if not os.path.exists(self.storage_file):
-            with open(self.storage_file, 'w') as f:
-                json.dump([], f)
+        self.storage = storage or create_storage(storage_file)
+        self._cache_key = (type(self.storage).__name__, os.path.abspath(storage_file))
 
+    # Tests handed out are copies, so callers can't change the cached snapshot under other callers
     def get_all_tests(self) -> List[TestFlow]:
-        with open(self.storage_file, 'r') as f:
-            data = json.load(f)
-            return [TestFlow(**test) for test in data]
+        return [test.model_copy(deep=True) for test in self._load()[0]]
 
     def get_test(self, test_id: str) -> Optional[TestFlow]:
-        tests = self.get_all_tests()
-        return next((test for test in tests if test.id == test_id), None)
+        cached = self._cached()
+        if cached is not None:
+            test = cached[1].get(test_id)
+            return test.model_copy(deep=True) if test else None
+        # The store changed since the snapshot; read just this test rather than reloading them all
+        record = self.storage.get(test_id)
+        return TestFlow(**record) if record else None
+
+    def get_tests_by_status(self, status: str) -> List[TestFlow]:
+        cached = self._cached()
+        if cached is not None:
+            return [test.model_copy(deep=True) for test in cached[0] if test.status == status]
+        return [TestFlow(**record) for record in self.storage.get_by_status(status)]
 
     def create_test(self, name: str, instructions: str, credentials: Optional[dict] = None) -> TestFlow:
         test = TestFlow(
-            id=str(int(datetime.now().timestamp() * 1000)),
+            id=new_test_id(),
             name=name,
             instructions=instructions,
             credentials=credentials,
@@ -49,24 +78,39 @@ class TestManager:
             status="not_run"
         )
         
-        tests = self.get_all_tests()
-        tests.append(test)
-        self._save_tests(tests)
+        self._apply_write(self.storage.insert(test.model_dump()))
         return test
 
-    def update_test(self, test_id: str, updates: dict) -> Optional[TestFlow]:
-        tests = self.get_all_tests()
-        test_index = next((i for i, test in enumerate(tests) if test.id == test_id), -1)
-        
-        if test_index == -1:
-            return None
+    def create_tests(self, specs: List[dict]) -> List[TestFlow]:
+        """
+        Create many tests with a single storage write.
 
-        current_test = tests[test_index].model_dump()
-        updated_test = {**current_test, **updates, "updated_at": datetime.now().isoformat()}
-        tests[test_index] = TestFlow(**updated_test)
-        
-        self._save_tests(tests)
-        return tests[test_index]
+        Each spec holds the fields of a new test (name, instructions and optionally credentials,
+        budget, devices). Every spec is validated before anything is written.
+        """
+        created_at = datetime.now().isoformat()
+        tests = [
+            TestFlow(**{**spec, "id": new_test_id(), "created_at": created_at, "status": "not_run"})
+            for spec in specs
+        ]
+        write = self.storage.insert_many([test.model_dump() for test in tests])
+
+        def apply(cached: Tuple[List[TestFlow], Dict[str, TestFlow]]):
+            existing, by_id = cached
+            return existing + tests, {**by_id, **{test.id: test for test in tests}}
+
+        _tests_cache.update(self._cache_key, write.before, write.after, apply)
+        return [test.model_copy(deep=True) for test in tests]
+
+    def update_test(self, test_id: str, updates: dict, touch: bool = True) -> Optional[TestFlow]:
+        def apply(current_test: dict) -> dict:
+            updated_test = {**current_test, **updates}
+            if touch:
+                updated_test["updated_at"] = datetime.now().isoformat()
+            return TestFlow(**updated_test).model_dump()
+
+        write = self.storage.update(test_id, apply)
+        return self._apply_write(write)
 
     def update_test_status(self, test_id: str, status: str) -> Optional[TestFlow]:
         return self.update_test(test_id, {
@@ -74,6 +118,32 @@ class TestManager:
             "last_run": datetime.now().isoformat()
         })
 
-    def _save_tests(self, tests: List[TestFlow]):
-        with open(self.storage_file, 'w') as f:
-            json.dump([test.model_dump() for test in tests], f, indent=2) 
\ No newline at end of file
+    def _cached(self) -> Optional[Tuple[List[TestFlow], Dict[str, TestFlow]]]:
+        """The validated snapshot of the store if it is still current, without loading it."""
+        return _tests_cache.get(self._cache_key, self.storage.version())
+
+    def _load(self) -> Tuple[List[TestFlow], Dict[str, TestFlow]]:
+        # Only hit the store when its version moved since we last validated it
+        version = self.storage.version()
+        cached = _tests_cache.get(self._cache_key, version)
+        if cached is None:
+            tests = [TestFlow(**test) for test in self.storage.load_all()]
+            cached = (tests, {test.id: test for test in tests})
+            _tests_cache.put(self._cache_key, version, cached)
+        return cached
+
+    def _apply_write(self, write: StoreWrite) -> Optional[TestFlow]:
+        if write.record is None:
+            return None
+        test = TestFlow(**write.record)
+
+        def apply(cached: Tuple[List[TestFlow], Dict[str, TestFlow]]):
+            tests, by_id = cached
+            if test.id in by_id:
+                tests = [test if existing.id == test.id else existing for existing in tests]
+            else:
+                tests = tests + [test]
+            return tests, {**by_id, test.id: test}
+
+        _tests_cache.update(self._cache_key, write.before, write.after, apply)
+        return test.model_copy(deep=True)
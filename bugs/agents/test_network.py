@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+import pytest
+from config_handler import NetworkProfile
+from network import AssetCache, NetworkPolicy, apply_playwright_network
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssetCache(str(tmp_path))
+
+def test_decide(cache):
+    policy = NetworkPolicy(NetworkProfile(
+        block_resource_types=["font"],
+        block_url_patterns=["*google-analytics.com/*"],
+        stub_hosts=["intercom.io"]
+    ), cache=cache)
+    assert policy.decide("http://localhost/a.woff", "font") == "block"
+    assert policy.decide("https://www.google-analytics.com/collect", "xhr") == "block"
+    assert policy.decide("https://widget.intercom.io/x.js", "script") == "stub"
+    assert policy.decide("https://notintercom.io/x.js", "script") == "cache"
+    assert policy.decide("http://localhost/app.js", "script", "POST") == "continue"
+    assert policy.decide("http://localhost/api", "fetch") == "continue"
+
+def test_nothing_to_do_means_disabled():
+    assert not NetworkPolicy(NetworkProfile()).enabled
+
+def test_cache_round_trip(cache):
+    cache.put("http://localhost/a.css", 200, {"content-type": "text/css", "etag": "x"}, b"body{}")
+    asset = cache.get("http://localhost/a.css")
+    assert asset.body == b"body{}"
+    assert asset.headers == {"content-type": "text/css"}
+    cache.put("http://localhost/b.css", 200, {"cache-control": "no-store"}, b"")
+    assert cache.get("http://localhost/b.css") is None
+
+def test_expired_entry_removed_by_another_run(cache, monkeypatch):
+    cache.ttl_seconds = 0
+    cache.put("http://localhost/a.css", 200, {}, b"x")
+    time.sleep(0.01)
+    real_remove = os.remove
+    def remove_twice(path):
+        real_remove(path)
+        real_remove(path)
+    monkeypatch.setattr(os, "remove", remove_twice)
+    assert cache.get("http://localhost/a.css") is None
+
+class FakeRoute:
+    def __init__(self, url, resource_type="script"):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type, method="GET")
+        self.calls = []
+
+    async def continue_(self):
+        self.calls.append("continue")
+
+    async def fulfill(self, **kwargs):
+        self.calls.append("fulfill")
+
+    async def fetch(self):
+        return SimpleNamespace(status=200, headers={}, body=self._body)
+
+    async def _body(self):
+        return b"x"
+
+def route_requests(policy, routes):
+    handlers = []
+    async def get_session():
+        return SimpleNamespace(context=SimpleNamespace(route=lambda pattern, handler: _add(handlers, handler)))
+    async def run():
+        await apply_playwright_network(SimpleNamespace(get_session=get_session), policy)
+        for route in routes:
+            await handlers[0](route)
+    asyncio.run(run())
+
+async def _add(handlers, handler):
+    handlers.append(handler)
+
+def test_failing_cache_still_answers_the_request(cache, monkeypatch):
+    def broken(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(cache, "get", broken)
+    route = FakeRoute("http://localhost/app.js")
+    route_requests(NetworkPolicy(NetworkProfile(), cache=cache), [route])
+    assert route.calls == ["continue"]
+
+def test_failing_cache_write_still_serves_the_fetch(cache, monkeypatch):
+    def broken(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(cache, "put", broken)
+    route = FakeRoute("http://localhost/app.js")
+    route_requests(NetworkPolicy(NetworkProfile(), cache=cache), [route])
+    assert route.calls == ["fulfill"]
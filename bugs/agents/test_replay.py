@@ -0,0 +1,62 @@
+import os
+import stat
+import pytest
+from browser_use import ActionResult, AgentHistoryList
+from browser_use.agent.views import AgentBrain, AgentHistory, AgentOutput
+from browser_use.browser.views import BrowserStateHistory
+from browser_use.controller.service import Controller
+import replay
+from replay import load_trace, record_trace, redact, reveal
+
+CREDENTIALS = {"username": "pass", "password": "password123"}
+
+def test_redact_round_trips():
+    data = {"text": "pass then password123", "items": ["password123", 3, None]}
+    redacted = redact(data, CREDENTIALS)
+    assert "password123" not in str(redacted)
+    assert redacted["text"] == "<secret>username</secret> then <secret>password</secret>"
+    assert reveal(redacted, CREDENTIALS) == data
+
+def test_reveal_needs_every_credential():
+    with pytest.raises(KeyError):
+        reveal("<secret>password</secret>", {"username": "pass"})
+
+def test_without_credentials_nothing_changes():
+    assert redact({"text": "hello"}, None) == {"text": "hello"}
+
+def test_recorded_trace_is_private_and_redacted(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTS_DATA_DIR", str(tmp_path))
+    ActionModel = Controller().registry.create_action_model()
+    Output = AgentOutput.type_with_custom_actions(ActionModel)
+    output = Output(
+        current_state=AgentBrain(page_summary="", evaluation_previous_goal="", memory="", next_goal="Log in"),
+        action=[ActionModel(input_text={"index": 3, "text": "password123"})]
+    )
+    history = AgentHistoryList(history=[AgentHistory(
+        model_output=output,
+        result=[ActionResult(extracted_content="Input password123 into index 3")],
+        state=BrowserStateHistory(url="http://localhost/login", title="", tabs=[], interacted_element=[None])
+    )])
+    path = str(tmp_path / "t1_abc.json")
+
+    record_trace(path, history, CREDENTIALS)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path) as f:
+        assert "password123" not in f.read()
+    action = load_trace(path, Output, CREDENTIALS).history[0].model_output.action[0]
+    assert action.model_dump(exclude_none=True) == {"input_text": {"index": 3, "text": "password123"}}
+
+def test_devices_other_than_desktop_get_their_own_traces(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENTS_DATA_DIR", str(tmp_path))
+    desktop = replay.trace_path("t1", "Log in", "http://localhost")
+    mobile = replay.trace_path("t1", "Log in", "http://localhost", "mobile")
+    assert os.path.basename(desktop).startswith("t1_") and os.path.basename(mobile).startswith("t1_mobile_")
+
+    stale = replay.trace_path("t1", "Log out", "http://localhost")
+    os.makedirs(tmp_path / "traces")
+    for path in (stale, mobile):
+        open(path, "w").close()
+    record_trace(desktop, AgentHistoryList(history=[]))
+
+    assert os.path.exists(desktop) and os.path.exists(mobile) and not os.path.exists(stale)
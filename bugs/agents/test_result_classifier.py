@@ -0,0 +1,34 @@
+from browser_use import ActionResult
+from config_handler import ResultRule
+from result_classifier import classify
+
+def test_recovered_errors_do_not_fail_the_run():
+    result = [
+        ActionResult(error="Element not found"),
+        ActionResult(is_done=True, extracted_content="Logged in and saw the dashboard")
+    ]
+    classification = classify(result)
+    assert classification.passed
+    assert classification.step_errors == 1
+
+def test_final_answer_reporting_an_error_fails():
+    classification = classify([ActionResult(is_done=True, extracted_content="The page showed a 500 error")])
+    assert not classification.passed
+    assert classification.subtype == "error_response"
+
+def test_negated_errors_pass():
+    assert classify([ActionResult(is_done=True, extracted_content="Checked the form, no errors found")]).passed
+
+def test_unfinished_run_is_incomplete():
+    classification = classify([ActionResult(extracted_content="Clicked login")])
+    assert not classification.passed
+    assert (classification.type, classification.subtype) == ("execution_error", "incomplete")
+
+def test_config_rules_are_checked_before_the_defaults():
+    rules = [ResultRule(patterns=["maintenance"], subtype="maintenance", description="Down for maintenance")]
+    classification = classify([ActionResult(is_done=True, extracted_content="Error: site under maintenance")], rules)
+    assert (classification.type, classification.subtype) == ("frontend_issue", "maintenance")
+
+def test_plain_strings_are_matched_whole():
+    assert not classify("Test failed: could not log in").passed
+    assert classify("All steps completed").passed
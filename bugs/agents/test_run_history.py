@@ -0,0 +1,50 @@
+import pytest
+from run_history import RunHistory
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(str(tmp_path / "run_history.db"), window=10, min_flips=2)
+    yield history
+    history.close()
+
+def _record(history, statuses, test_id="t1"):
+    for number, status in enumerate(statuses):
+        history.record(test_id, status, 1000, run_id=f"run-{number}")
+
+def test_stable_test_is_not_flaky(history):
+    _record(history, ["passed"] * 5)
+    stats = history.stats("t1")
+    assert (stats.runs, stats.pass_rate, stats.flips, stats.flaky) == (5, 1.0, 0, False)
+
+def test_regression_flips_once_and_is_not_flaky(history):
+    _record(history, ["passed", "passed", "failed", "failed"])
+    stats = history.stats("t1")
+    assert (stats.flips, stats.flaky, stats.last_status) == (1, False, "failed")
+
+def test_alternating_outcomes_are_flaky(history):
+    _record(history, ["passed", "failed", "passed", "failed"])
+    assert history.stats("t1").flaky
+
+def test_retries_do_not_count_as_flips(history):
+    for number in range(3):
+        history.record("t1", "failed", 1000, run_id=f"run-{number}", attempt=1)
+        history.record("t1", "passed", 1000, run_id=f"run-{number}", attempt=2)
+    stats = history.stats("t1")
+    assert (stats.runs, stats.flips, stats.flaky, stats.pass_rate) == (3, 0, False, 0.0)
+
+def test_stats_only_look_at_the_window(history):
+    _record(history, ["failed", "passed"] * 5 + ["passed"] * 10)
+    assert history.stats("t1").flips == 0
+
+def test_expected_attempts(history):
+    _record(history, ["passed", "failed", "passed", "failed"])
+    # Half the attempts fail, so one retry is needed half the time
+    assert history.expected_attempts("t1", retries=1) == pytest.approx(1.5)
+    _record(history, ["passed"] * 4, test_id="t2")
+    assert history.expected_attempts("t2", retries=1) == 1.0
+
+def test_schedule_starts_flaky_then_longest_tests(history):
+    _record(history, ["passed", "failed", "passed"], test_id="flaky")
+    history.record("slow", "passed", 5000)
+    history.record("fast", "passed", 100)
+    assert history.schedule(["fast", "slow", "flaky"]) == ["flaky", "slow", "fast"]
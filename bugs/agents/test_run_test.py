@@ -0,0 +1,113 @@
+import os
+import json
+import signal
+import asyncio
+import pytest
+from langchain_openai import ChatOpenAI
+import run_test
+from browser_pool import BrowserPool
+from run_test import _cancel_on_sigterm, combine_devices, run_suite
+from test_manager import TestManager
+
+def passed(mode="agent"):
+    return {"status": "passed", "details": "ok", "mode": mode}
+
+def failed(details, mode="agent"):
+    return {"error": "Test failed", "details": details, "type": "assertion", "subtype": "element_missing", "mode": mode}
+
+def test_one_device_is_reported_as_before():
+    assert combine_devices({"desktop": failed("no button")}) == failed("no button")
+
+def test_any_failing_device_fails_the_run():
+    analyses = {"desktop": passed("replay"), "mobile": failed("menu hidden"), "tablet": failed("overlap")}
+    analysis = combine_devices(analyses)
+    assert analysis["error"] == "Test failed" and analysis["subtype"] == "element_missing"
+    assert analysis["details"] == "[mobile] menu hidden\n[tablet] overlap"
+    assert analysis["mode"] == "agent"
+    assert analysis["devices"] == analyses
+
+def test_replay_only_when_every_device_replayed():
+    analysis = combine_devices({"desktop": passed("replay"), "mobile": passed("replay")})
+    assert "error" not in analysis and analysis["mode"] == "replay"
+    assert analysis["details"] == "[desktop] ok\n[mobile] ok"
+
+class FakeBrowser:
+    async def new_context(self, config):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+class FakeContext:
+    async def close(self):
+        pass
+
+class FakeBrowserPool(BrowserPool):
+    async def _launch(self):
+        return FakeBrowser(), None
+
+    def _is_alive(self, browser):
+        return True
+
+@pytest.fixture
+def suite(tmp_path, monkeypatch):
+    """A store of three tests and a config in tmp_path, run on browsers that never launch."""
+    monkeypatch.chdir(tmp_path)
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"target_url": "http://localhost:3000", "auto_run": False}))
+    monkeypatch.setenv("AGENTS_CONFIG", str(config))
+    monkeypatch.setenv("AGENTS_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(run_test, "BrowserPool", FakeBrowserPool)
+    manager = TestManager()
+    return manager, [manager.create_test(name, f"Go to /{name}").id for name in ("a", "b", "c")]
+
+def test_suite_runs_at_most_concurrency_tests_at_once(suite, monkeypatch):
+    _, test_ids = suite
+    running, peak = set(), []
+
+    async def run_once(test_id, browser_pool, *args):
+        async with browser_pool.context():
+            running.add(test_id)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.discard(test_id)
+        return {"status": "passed"}
+
+    monkeypatch.setattr(run_test, "_run_once", run_once)
+    summary = asyncio.run(run_suite(test_ids * 2, concurrency=2))
+
+    assert max(peak) == 2 and len(peak) == 6
+    assert (summary["passed"], summary["failed"]) == (6, 0)
+
+def test_a_failing_test_does_not_stop_the_others(suite, monkeypatch):
+    _, test_ids = suite
+
+    async def run_once(test_id, *args):
+        if test_id == test_ids[0]:
+            return {"error": "Test failed", "details": "boom"}
+        await asyncio.sleep(0.01)
+        return {"status": "passed"}
+
+    monkeypatch.setattr(run_test, "_run_once", run_once)
+    summary = asyncio.run(run_suite(test_ids, concurrency=3))
+
+    assert (summary["passed"], summary["failed"]) == (2, 1)
+    assert summary["results"][test_ids[0]]["details"] == "boom"
+
+def test_sigterm_cancels_running_tests_and_marks_them_not_run(suite, monkeypatch):
+    manager, test_ids = suite
+    monkeypatch.setattr(run_test, "create_llm", lambda: ChatOpenAI(api_key="test"))
+    started = []
+
+    async def run_agent(task, llm, browser_context, **kwargs):
+        started.append(task)
+        if len(started) == len(test_ids):
+            os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(run_test, "_run_agent", run_agent)
+    with pytest.raises(SystemExit):
+        asyncio.run(_cancel_on_sigterm(run_suite(test_ids, concurrency=3)))
+
+    assert len(started) == 3
+    assert [manager.get_test(test_id).status for test_id in test_ids] == ["not_run"] * 3
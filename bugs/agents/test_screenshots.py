@@ -0,0 +1,124 @@
+import io
+import base64
+import asyncio
+from types import SimpleNamespace
+from PIL import Image
+from langchain_core.messages import HumanMessage
+from artifacts import ArtifactWriter
+from browser_agent import BrowserAgent
+from config_handler import ArtifactSettings, NetworkProfile, TestBudget
+from devices import DEVICE_PRESETS
+from profiler import Profiler
+from screenshots import PNG_DATA_URL, ScreenshotPipeline, for_vision, limit_vision_screenshots
+from test_manager import TestStep
+
+def png(width: int, height: int, color=(255, 255, 255), split: bool = False) -> bytes:
+    image = Image.new("RGB", (width, height), color)
+    if split:
+        image.paste((0, 0, 0), (width // 2, 0, width, height))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class FakePage:
+    """Serves a fixed list of screenshots, one per call."""
+
+    def __init__(self, shots):
+        self.shots = list(shots)
+        self.url = "http://localhost/"
+
+    async def screenshot(self):
+        return self.shots.pop(0)
+
+    async def setViewport(self, viewport):
+        pass
+
+def pipeline(tmp_path) -> ScreenshotPipeline:
+    return ScreenshotPipeline(ArtifactWriter("run", ArtifactSettings(compress=False), directory=str(tmp_path)))
+
+def test_same_looking_frames_are_stored_once(tmp_path):
+    screenshots = pipeline(tmp_path)
+    # The second frame is byte-identical, the third differs by one pixel, the fourth really changed
+    nearly_blank = Image.open(io.BytesIO(png(200, 100)))
+    nearly_blank.putpixel((5, 5), (250, 250, 250))
+    buffer = io.BytesIO()
+    nearly_blank.save(buffer, format="PNG")
+    page = FakePage([png(200, 100), png(200, 100), buffer.getvalue(), png(200, 100, split=True)])
+
+    async def capture():
+        return [await screenshots.capture(page, f"shot_{number}") for number in range(4)]
+
+    first, second, third, fourth = asyncio.run(capture())
+    assert second is first and third is first
+    assert fourth is not first
+    assert [frame.label for frame in screenshots.frames] == ["shot_0", "shot_3"]
+
+def test_flush_writes_every_stored_frame(tmp_path):
+    screenshots = pipeline(tmp_path)
+    page = FakePage([png(200, 100), png(200, 100, split=True)])
+
+    async def capture_and_flush():
+        await screenshots.capture(page, "before")
+        await screenshots.capture(page, "after")
+        return await screenshots.flush()
+
+    paths = asyncio.run(capture_and_flush())
+    assert [path.rsplit("/", 1)[-1] for path in paths] == ["000_before.png", "001_after.png"]
+    assert [open(path, "rb").read() for path in paths] == [png(200, 100), png(200, 100, split=True)]
+
+def test_frames_are_only_captured_for_failures_and_assertions(tmp_path):
+    captured = []
+
+    async def execute_step(page, step, next_step):
+        return "Click failed: #missing" if step.target == "#missing" else None
+
+    async def capture_screenshot(screenshots, page, label):
+        captured.append(label)
+
+    async def navigate(page, url):
+        pass
+
+    agent = SimpleNamespace(
+        config=SimpleNamespace(network=NetworkProfile()),
+        profiler=Profiler("t1", directory=str(tmp_path)),
+        waits=SimpleNamespace(navigate=navigate),
+        target_url="http://localhost/",
+        credentials=None,
+        budget=TestBudget(),
+        use_vision=True,
+        execute_step=execute_step,
+        capture_screenshot=capture_screenshot
+    )
+    steps = [
+        TestStep(type="navigate", target="/login"),
+        TestStep(type="click", target="#missing"),
+        TestStep(type="type", target="#email", value="a@example.com"),
+        TestStep(type="assert", target="#dashboard")
+    ]
+    asyncio.run(BrowserAgent.run_steps(agent, FakePage([]), DEVICE_PRESETS["desktop"], steps, [], [], None))
+    assert captured == ["step_1_failed", "step_3_assert"]
+
+def test_for_vision_downscales_wide_screenshots_only():
+    small = png(800, 600)
+    assert for_vision(small, max_width=1024) is small
+    image = Image.open(io.BytesIO(for_vision(png(2560, 1600), max_width=1024)))
+    assert (image.format, image.size) == ("PNG", (1024, 640))
+
+def test_agent_sends_downscaled_screenshots():
+    sent = []
+
+    async def get_next_action(input_messages):
+        sent.extend(input_messages)
+        return "action"
+
+    agent = SimpleNamespace(get_next_action=get_next_action)
+    limit_vision_screenshots(agent, max_width=640)
+    screenshot = base64.b64encode(png(1280, 800)).decode()
+    message = HumanMessage(content=[
+        {"type": "text", "text": "Current page"},
+        {"type": "image_url", "image_url": {"url": PNG_DATA_URL + screenshot}}
+    ])
+
+    assert asyncio.run(agent.get_next_action([HumanMessage(content="Task"), message])) == "action"
+    url = sent[1].content[1]["image_url"]["url"]
+    assert Image.open(io.BytesIO(base64.b64decode(url[len(PNG_DATA_URL):]))).size == (640, 400)
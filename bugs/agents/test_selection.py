@@ -0,0 +1,32 @@
+from datetime import datetime
+from selection import select_tests
+from step_plan import record_routes
+from test_manager import TestFlow, TestManager
+
+TARGET = "http://localhost:3000"
+
+def flow(id, status="passed", routes=None, target_url=TARGET):
+    return TestFlow(id=id, name=id, instructions="", created_at=datetime.now().isoformat(), status=status, routes=routes, target_url=target_url)
+
+def test_changed_routes_select_the_tests_that_visit_them():
+    tests = [flow("login", routes=["/", "/login"]), flow("admin", routes=["/admin/users"]), flow("home", routes=["/"])]
+    assert select_tests(tests, ["/login", f"{TARGET}/admin/*"], TARGET) == {"login": "route /login", "admin": "route /admin/users"}
+
+def test_failed_unrun_and_interrupted_tests_are_always_selected():
+    tests = [flow("a", "failed", ["/a"]), flow("b", "not_run", ["/b"]), flow("c", "running", ["/c"]), flow("d", routes=["/d"])]
+    assert select_tests(tests, [], TARGET) == {"a": "failed", "b": "not_run", "c": "running"}
+
+def test_tests_without_routes_for_this_target_are_selected():
+    tests = [flow("a"), flow("b", routes=["/b"], target_url="http://localhost:4000"), flow("c", routes=["/c"])]
+    assert select_tests(tests, [], TARGET) == {"a": "no_routes", "b": "target_url"}
+
+def test_a_new_target_url_drops_the_old_routes(tmp_path):
+    manager = TestManager(str(tmp_path / "test_flows.json"))
+    test = manager.create_test("login", "Go to /login")
+    manager.update_test_status(test.id, "passed")
+    record_routes(manager, manager.get_test(test.id), "http://localhost:4000", ["http://localhost:4000/old"])
+    record_routes(manager, manager.get_test(test.id), TARGET)
+
+    test = manager.get_test(test.id)
+    assert (test.routes, test.target_url) == (["/", "/login"], TARGET)
+    assert select_tests([test], ["/old"], TARGET) == {}
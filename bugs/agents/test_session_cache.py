@@ -0,0 +1,59 @@
+import os
+import stat
+import time
+from session_cache import SessionCache
+
+CREDENTIALS = {"username": "admin", "password": "secret"}
+
+def save(cache, url="http://localhost", credentials=CREDENTIALS):
+    cache.save(url, credentials, [{"name": "sid", "value": "1", "domain": "localhost", "extra": True}], {"token": "t"})
+
+def test_saved_sessions_are_private(tmp_path):
+    cache = SessionCache(str(tmp_path / "sessions"))
+    save(cache)
+    path = cache._path(cache.key("http://localhost", CREDENTIALS))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+    assert cache.load("http://localhost", CREDENTIALS)["cookies"] == [{"name": "sid", "value": "1", "domain": "localhost"}]
+    assert os.listdir(cache.directory) == [os.path.basename(path)]
+
+def test_expired_session_is_dropped(tmp_path):
+    cache = SessionCache(str(tmp_path), ttl_seconds=0)
+    save(cache)
+    time.sleep(0.01)
+    assert cache.load("http://localhost", CREDENTIALS) is None
+    assert os.listdir(tmp_path) == []
+
+def test_entry_removed_by_another_worker_is_tolerated(tmp_path, monkeypatch):
+    cache = SessionCache(str(tmp_path), ttl_seconds=0)
+    save(cache)
+    time.sleep(0.01)
+    # Another worker removes the file between our read and our remove
+    real_remove = os.remove
+    def remove_twice(path):
+        real_remove(path)
+        real_remove(path)
+    monkeypatch.setattr(os, "remove", remove_twice)
+    assert cache.load("http://localhost", CREDENTIALS) is None
+    cache.invalidate("http://localhost", CREDENTIALS)
+
+def test_eviction_keeps_the_most_recent(tmp_path):
+    cache = SessionCache(str(tmp_path), max_entries=2)
+    for index in range(3):
+        save(cache, credentials={"username": f"user{index}"})
+        os.utime(cache._path(cache.key("http://localhost", {"username": f"user{index}"})), (index, index))
+    save(cache, credentials={"username": "user3"})
+    assert len(os.listdir(tmp_path)) == 2
+    assert cache.load("http://localhost", {"username": "user3"}) is not None
+    assert cache.load("http://localhost", {"username": "user0"}) is None
+
+def test_eviction_tolerates_entries_vanishing(tmp_path, monkeypatch):
+    cache = SessionCache(str(tmp_path), max_entries=1)
+    save(cache)
+    real_getmtime = os.path.getmtime
+    def getmtime(path):
+        # Another worker evicts the entry as soon as we list it
+        os.unlink(path)
+        return real_getmtime(path)
+    monkeypatch.setattr(os.path, "getmtime", getmtime)
+    save(cache, credentials={"username": "other"})
@@ -0,0 +1,59 @@
+import pytest
+import step_plan
+from step_plan import compile_plan, get_plan, plan_routes, route_of
+from test_manager import TestManager, TestStep
+
+TARGET = "http://localhost:3000"
+
+def compile_one(line):
+    [step] = compile_plan(line, TARGET)
+    return step
+
+@pytest.mark.parametrize("line, step", [
+    ("Wait 2000", TestStep(type="wait", timeout=2000)),
+    ("wait 500ms", TestStep(type="wait", timeout=500)),
+    ("Wait for 3 seconds", TestStep(type="wait", timeout=3000)),
+    ("Wait for response /api/v1/login", TestStep(type="wait", target="/api/v1/login", value="response")),
+    ("Wait for #step2-form", TestStep(type="wait", target="#step2-form")),
+    ("wait for .item-1", TestStep(type="wait", target=".item-1")),
+])
+def test_waits(line, step):
+    assert compile_one(line) == step
+
+def test_steps_in_order():
+    plan = compile_plan(
+        "Go to /login\n"
+        "Type \"admin\" into #username\n"
+        "Click #submit\n"
+        "\n"
+        "Verify .dashboard",
+        TARGET
+    )
+    assert plan == [
+        TestStep(type="navigate", target=f"{TARGET}/login"),
+        TestStep(type="type", target="#username", value="admin"),
+        TestStep(type="click", target="#submit"),
+        TestStep(type="assert", target=".dashboard"),
+    ]
+
+def test_full_urls_are_kept():
+    assert compile_one("Navigate to https://example.com/a").target == "https://example.com/a"
+
+def test_routes():
+    assert route_of("/login?next=/", TARGET) == "/login"
+    assert route_of("https://other.site/login", TARGET) is None
+    assert plan_routes("Go to /login\nGo to /admin/", TARGET) == ["/", "/admin", "/login"]
+
+def test_plan_is_compiled_once_per_hash(tmp_path, monkeypatch):
+    manager = TestManager(str(tmp_path / "test_flows.json"))
+    test = manager.create_test("login", "Go to /login")
+    compiled = []
+    monkeypatch.setattr(step_plan, "compile_plan", lambda *args: compiled.append(args) or compile_plan(*args))
+
+    first = get_plan(manager, manager.get_test(test.id), TARGET)
+    again = get_plan(manager, manager.get_test(test.id), TARGET)
+    assert first == again == [TestStep(type="navigate", target=f"{TARGET}/login")]
+    assert len(compiled) == 1
+
+    get_plan(manager, manager.get_test(test.id), "http://localhost:4000")
+    assert len(compiled) == 2
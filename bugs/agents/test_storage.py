@@ -0,0 +1,63 @@
+import pytest
+from db import sqlite_connect, transaction
+from storage import JsonStorage, SqliteStorage, TestStorage, create_storage
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    return create_storage(str(tmp_path / "test_flows.json"), backend=request.param)
+
+def record(test_id, status="not_run"):
+    return {"id": test_id, "name": test_id, "instructions": "Go to /", "status": status}
+
+def test_insert_and_get(storage):
+    write = storage.insert(record("a"))
+    assert write.record["id"] == "a"
+    assert write.before != write.after
+    assert storage.get("a")["name"] == "a"
+    assert storage.get("missing") is None
+
+def test_insert_many_is_one_write(storage):
+    before = storage.version()
+    write = storage.insert_many([record("a"), record("b"), record("c")])
+    assert write.record is None
+    assert write.before == before
+    assert write.after == storage.version()
+    assert [r["id"] for r in storage.load_all()] == ["a", "b", "c"]
+
+def test_get_by_status(storage):
+    storage.insert_many([record("a", "passed"), record("b", "failed"), record("c", "passed")])
+    assert [r["id"] for r in storage.get_by_status("passed")] == ["a", "c"]
+
+def test_update_applies_to_one_record(storage):
+    storage.insert_many([record("a"), record("b")])
+    write = storage.update("b", lambda r: {**r, "status": "running"})
+    assert write.record["status"] == "running"
+    assert storage.get("a")["status"] == "not_run"
+    assert [r["id"] for r in storage.get_by_status("running")] == ["b"]
+
+def test_update_missing_test_changes_nothing(storage):
+    write = storage.update("missing", lambda r: r)
+    assert write.record is None
+    assert write.before == write.after
+
+def test_sqlite_migrates_the_json_store(tmp_path):
+    path = str(tmp_path / "test_flows.json")
+    JsonStorage(path).insert(record("a"))
+    migrated = create_storage(path, backend="sqlite")
+    assert isinstance(migrated, SqliteStorage)
+    assert migrated.get("a")["id"] == "a"
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        TestStorage()
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    conn = sqlite_connect(str(tmp_path / "db.sqlite"))
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    with pytest.raises(RuntimeError):
+        with transaction(conn):
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise RuntimeError("boom")
+    with transaction(conn):
+        conn.execute("INSERT INTO t VALUES (2)")
+    assert conn.execute("SELECT x FROM t").fetchall() == [(2,)]
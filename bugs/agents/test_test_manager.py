@@ -0,0 +1,44 @@
+import pytest
+from test_manager import TestManager, new_test_id
+
+@pytest.fixture(params=["json", "sqlite"])
+def manager(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_STORAGE", request.param)
+    return TestManager(str(tmp_path / "test_flows.json"))
+
+def test_new_test_ids_are_unique():
+    assert len({new_test_id() for _ in range(1000)}) == 1000
+
+def test_returned_tests_are_copies(manager):
+    test = manager.create_test("login", "Go to /login")
+    manager.get_test(test.id).name = "changed"
+    manager.get_all_tests()[0].status = "changed"
+    assert manager.get_test(test.id).name == "login"
+    assert manager.get_all_tests()[0].status == "not_run"
+
+def test_stale_lookups_read_only_the_requested_tests(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_STORAGE", "sqlite")
+    manager = TestManager(str(tmp_path / "test_flows.json"))
+    first, second = manager.create_tests([
+        {"name": "a", "instructions": "Go to /a"},
+        {"name": "b", "instructions": "Go to /b"}
+    ])
+    manager.get_all_tests()
+    # Another runner writes behind this manager's back
+    manager.storage.update(second.id, lambda record: {**record, "status": "passed"})
+
+    def load_all():
+        raise AssertionError("a single lookup reloaded the whole store")
+    monkeypatch.setattr(manager.storage, "load_all", load_all)
+
+    assert manager.get_test(second.id).status == "passed"
+    assert manager.get_test(first.id).status == "not_run"
+    assert [test.id for test in manager.get_tests_by_status("passed")] == [second.id]
+    assert manager.get_test("missing") is None
+
+def test_own_writes_keep_the_snapshot_current(manager):
+    test = manager.create_test("login", "Go to /login")
+    manager.get_all_tests()
+    manager.update_test_status(test.id, "failed")
+    assert [t.id for t in manager.get_tests_by_status("failed")] == [test.id]
+    assert manager.get_test(test.id).status == "failed"
@@ -0,0 +1,91 @@
+import sys
+import json
+import asyncio
+import pytest
+import worker
+import worker_client
+from worker import Worker
+from worker_client import send_request
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "worker.sock")
+
+@pytest.fixture
+def serve(socket_path, monkeypatch):
+    """Start a worker on the temporary socket whose runs go to the given stub instead of run_test."""
+    monkeypatch.setattr(worker, "create_llm", lambda: None)
+
+    async def start(run):
+        monkeypatch.setattr(worker, "run_test", run)
+        instance = Worker(socket_path=socket_path, pool_size=1)
+
+        async def no_browsers():
+            pass
+
+        instance.browser_pool.start = no_browsers
+        await instance.start()
+        return instance
+
+    return start
+
+def test_events_are_passed_through_before_the_response(serve, socket_path):
+    async def run(test_id, browser_pool, llm, verbose, events):
+        events.emit("step_start", step=1)
+        events.emit("step_end", step=1)
+        return {"status": "passed"}
+
+    async def main():
+        instance = await serve(run)
+        lines = []
+        try:
+            response = await asyncio.to_thread(send_request, {"action": "run", "test_id": "t1", "events": True}, socket_path, lines.append)
+        finally:
+            await instance.close()
+        return response, lines
+
+    response, lines = asyncio.run(main())
+    assert response == {"test_id": "t1", "result": {"status": "passed"}}
+    assert [json.loads(line)["event"] for line in lines] == ["step_start", "step_end"]
+    assert all(json.loads(line)["test_id"] == "t1" for line in lines)
+
+def test_client_disconnect_cancels_the_run(serve, socket_path):
+    async def main():
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def run(test_id, **kwargs):
+            started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        instance = await serve(run)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(b'{"action": "run", "test_id": "t1"}\n')
+            await writer.drain()
+            await asyncio.wait_for(started.wait(), 5)
+            writer.close()
+            await asyncio.wait_for(cancelled.wait(), 5)
+        finally:
+            await instance.close()
+
+    asyncio.run(main())
+
+def test_client_falls_back_to_run_test_without_a_worker(socket_path, monkeypatch):
+    calls = []
+
+    def execv(path, args):
+        calls.append(args)
+        raise SystemExit(0)
+
+    monkeypatch.setattr(worker_client, "SOCKET_PATH", socket_path)
+    monkeypatch.setattr(worker_client.os, "execv", execv)
+    monkeypatch.setattr(sys, "argv", ["worker_client.py", "t1", "--events"])
+    with pytest.raises(SystemExit):
+        worker_client.main()
+
+    [args] = calls
+    assert args[0] == sys.executable and args[1].endswith("run_test.py") and args[2:] == ["t1", "--events"]
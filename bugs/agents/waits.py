@@ -0,0 +1,114 @@
+import os
+import re
+import json
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from files import atomic_write, data_path
+
+
+# Resolves once the DOM has had no mutations for quietMs, or with false after timeoutMs
+DOM_STABLE_JS = """(quietMs, timeoutMs) => new Promise(resolve => {
+    let quiet;
+    const finish = (stable) => { observer.disconnect(); clearTimeout(quiet); clearTimeout(cap); resolve(stable); };
+    const observer = new MutationObserver(() => { clearTimeout(quiet); quiet = setTimeout(() => finish(true), quietMs); });
+    observer.observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+    quiet = setTimeout(() => finish(true), quietMs);
+    const cap = setTimeout(() => finish(false), timeoutMs);
+})"""
+
+async def wait_for_dom_stable(page, quiet_ms: int = 300, timeout_ms: int = 5000) -> bool:
+    """Wait until the page stops changing. Returns False if it was still changing at the timeout."""
+    try:
+        return await page.evaluate(DOM_STABLE_JS, quiet_ms, timeout_ms)
+    except Exception:
+        # The page navigated away mid-wait; the caller's next action waits on the new page
+        return False
+
+async def wait_for_selector_ready(page, selector: str, timeout_ms: int, visible: bool = True) -> bool:
+    """Wait until the selector matches an element (a visible one by default). Returns False on timeout."""
+    try:
+        await page.waitForSelector(selector, {"visible": visible, "timeout": timeout_ms})
+        return True
+    except Exception:
+        return False
+
+async def wait_for_response(page, url_pattern: str, timeout_ms: int) -> bool:
+    """Wait for a network response whose URL matches the regex. Returns False on timeout."""
+    pattern = re.compile(url_pattern)
+    try:
+        await page.waitForResponse(lambda response: bool(pattern.search(response.url)), {"timeout": timeout_ms})
+        return True
+    except Exception:
+        return False
+
+class LearnedTimeouts:
+    """
+    Per-site timeouts learned from how long each kind of wait took on previous runs.
+
+    Until a site has enough samples the caller's default is used. After that the timeout
+    tracks the slow end of recent durations, so fast sites stop waiting for the worst case.
+    """
+
+    def __init__(self, path: Optional[str] = None, window: int = 50, min_samples: int = 5):
+        self.path = path or data_path("wait_timings.json")
+        self.window = window
+        self.min_samples = min_samples
+        self.samples: Dict[str, List[float]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.samples = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                self.samples = {}
+
+    def timeout_for(self, host: str, kind: str, default_ms: int, min_ms: int = 1000) -> int:
+        samples = sorted(self.samples.get(f"{host} {kind}", []))
+        if len(samples) < self.min_samples:
+            return default_ms
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return int(min(max(p95 * 1.5 + 250, min_ms), default_ms * 3))
+
+    def record(self, host: str, kind: str, duration_ms: float):
+        samples = self.samples.setdefault(f"{host} {kind}", [])
+        samples.append(round(duration_ms, 1))
+        del samples[:-self.window]
+
+    def save(self):
+        atomic_write(self.path, json.dumps(self.samples))
+
+class Waiter:
+    """Condition-based waits for one site, using and feeding its learned timeouts."""
+
+    def __init__(self, target_url: str, timeouts: Optional[LearnedTimeouts] = None):
+        self.host = urlparse(target_url).netloc
+        self.timeouts = timeouts or LearnedTimeouts()
+
+    def timeout(self, kind: str, default_ms: int) -> int:
+        return self.timeouts.timeout_for(self.host, kind, default_ms)
+
+    async def navigate(self, page, url: str, timeout_ms: int = 30000):
+        # The DOM settling is what the steps depend on; analytics beacons don't hold us up
+        start = time.perf_counter()
+        await page.goto(url, {"waitUntil": "domcontentloaded", "timeout": timeout_ms})
+        await wait_for_dom_stable(page, timeout_ms=self.timeout("settle", 5000))
+        self.timeouts.record(self.host, "navigate", (time.perf_counter() - start) * 1000)
+
+    async def selector(self, page, kind: str, selector: str, default_ms: int, visible: bool = True) -> bool:
+        start = time.perf_counter()
+        ready = await wait_for_selector_ready(page, selector, self.timeout(kind, default_ms), visible)
+        if ready:
+            self.timeouts.record(self.host, kind, (time.perf_counter() - start) * 1000)
+        return ready
+
+    async def response(self, page, url_pattern: str, default_ms: int) -> bool:
+        start = time.perf_counter()
+        matched = await wait_for_response(page, url_pattern, self.timeout("response", default_ms))
+        if matched:
+            self.timeouts.record(self.host, "response", (time.perf_counter() - start) * 1000)
+        return matched
+
+    async def settle(self, page, max_ms: int = 5000):
+        start = time.perf_counter()
+        if await wait_for_dom_stable(page, timeout_ms=min(max_ms, self.timeout("settle", max_ms))):
+            self.timeouts.record(self.host, "settle", (time.perf_counter() - start) * 1000)
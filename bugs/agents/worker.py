@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import signal
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from browser_pool import BrowserPool
+from llm import create_llm
+from run_test import run_test
+from events import EventEmitter
+
+# Load environment variables
+load_dotenv()
+
+SOCKET_PATH = os.getenv("WORKER_SOCKET", os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.sock"))
+
+class Worker:
+    """
+    Long-lived test runner that keeps imports, the LLM client and launched browsers warm.
+
+    Each connection sends one JSON-line request on a local unix socket and gets one response line:
+        {"action": "run", "test_id": "..."}  -> {"test_id": "...", "result": {...}}
+        {"action": "ping"}                   -> {"status": "ok"}
+    With "events": true, progress events are streamed as JSON lines before the response.
+    Closing the connection early cancels the run.
+    """
+
+    def __init__(self, socket_path: str = SOCKET_PATH, pool_size: int = 2, headless: bool = True):
+        self.socket_path = socket_path
+        self.browser_pool = BrowserPool(size=pool_size, headless=headless)
+        self.llm = None
+        self._server = None
+
+    async def start(self):
+        self.llm = create_llm()
+        await self.browser_pool.start()
+
+        # Remove a socket left behind by a worker that did not shut down cleanly
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        print(f"Worker listening on {self.socket_path}", file=sys.stderr)
+
+    async def serve_forever(self):
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.browser_pool.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def handle_request(self, request: dict, sink=None) -> dict:
+        action = request.get("action", "run")
+        if action == "ping":
+            return {"status": "ok", "pool": self.browser_pool.stats()}
+        if action == "run":
+            if not request.get("test_id"):
+                return {"error": "Test ID is required"}
+            result = await run_test(
+                request["test_id"],
+                browser_pool=self.browser_pool,
+                llm=self.llm,
+                verbose=False,
+                events=EventEmitter(request["test_id"], sink) if request.get("events") else None
+            )
+            return {"test_id": request["test_id"], "result": result}
+        return {"error": f"Unknown action: {action}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def send(message: dict):
+            writer.write((json.dumps(message) + "\n").encode())
+
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                send({"error": f"Invalid request: {str(e)}"})
+                return
+
+            # The client never writes again, so the read only returns once it disconnects
+            handled = asyncio.ensure_future(self.handle_request(request, send))
+            disconnected = asyncio.ensure_future(reader.read())
+            done, _ = await asyncio.wait({handled, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if handled not in done:
+                handled.cancel()
+                await asyncio.gather(handled, return_exceptions=True)
+                return
+            disconnected.cancel()
+            send(handled.result())
+            await writer.drain()
+        finally:
+            writer.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a warm test worker on a local socket")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--pool-size", type=int, default=2, help="Number of browsers to keep launched")
+    args = parser.parse_args()
+    if args.pool_size < 1:
+        parser.error("--pool-size must be at least 1")
+
+    asyncio.run(Worker(socket_path=args.socket, pool_size=args.pool_size).serve_forever())
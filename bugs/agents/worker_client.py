@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import socket
+from typing import Optional
+
+# Kept to the standard library on purpose: this runs once per request and must start fast
+SOCKET_PATH = os.getenv("WORKER_SOCKET", os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.sock"))
+
+def send_request(request: dict, socket_path: Optional[str] = None, on_event=None) -> dict:
+    """Send one request to the warm worker, pass any streamed events to on_event, and return the response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path or SOCKET_PATH)
+        client.sendall((json.dumps(request) + "\n").encode())
+        with client.makefile('r') as lines:
+            for line in lines:
+                message = json.loads(line)
+                if "event" not in message:
+                    return message
+                if on_event:
+                    on_event(line.rstrip("\n"))
+    return {"error": "Worker closed the connection without a response"}
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--events"]
+    stream_events = "--events" in sys.argv[1:]
+    if len(args) != 1:
+        print("Usage: python worker_client.py <test_id> [--events]")
+        sys.exit(1)
+    test_id = args[0]
+
+    try:
+        response = send_request(
+            {"action": "run", "test_id": test_id, "events": stream_events},
+            on_event=lambda line: print(line, flush=True)
+        )
+    except (FileNotFoundError, ConnectionRefusedError):
+        # No worker running, fall back to a one-off run in this process
+        run_test_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_test.py")
+        os.execv(sys.executable, [sys.executable, run_test_path, test_id] + (["--events"] if stream_events else []))
+
+    if "error" in response:
+        print(json.dumps(response, indent=2), file=sys.stderr)
+        sys.exit(1)
+    if not stream_events:
+        print(json.dumps(response["result"], indent=2))
+
+if __name__ == "__main__":
+    main()
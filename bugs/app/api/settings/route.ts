@@ -61,10 +61,22 @@ export async function POST(request: Request) {
       fs.mkdirSync(agentsDir, { recursive: true });
     }
 
-    // Save the config
+    if (data.network !== undefined && (typeof data.network !== 'object' || data.network === null || Array.isArray(data.network))) {
+      return NextResponse.json(
+        { error: 'Network profile must be an object' },
+        { status: 400 }
+      );
+    }
+
+    // Merge into the existing config so settings not shown on the page (e.g. network) are kept
+    const existing = fs.existsSync(CONFIG_FILE)
+      ? JSON.parse(fs.readFileSync(CONFIG_FILE, 'utf8'))
+      : {};
     const config = {
+      ...existing,
       target_url: data.target_url.trim(),
       auto_run: Boolean(data.auto_run),
+      ...(data.network !== undefined && { network: data.network }),
     };
 
     fs.writeFileSync(CONFIG_FILE, JSON.stringify(config, null, 2));
@@ -15,9 +15,9 @@ export async function POST(request: Request) {
       );
     }
 
-    // Run the Python script to execute the test
+    // Hand the test to the warm worker (falls back to a one-off run if it isn't running)
     const pythonProcess = spawn(PYTHON_PATH, [
-      path.join(process.cwd(), 'agents', 'run_test.py'),
+      path.join(process.cwd(), 'agents', 'worker_client.py'),
       data.testId
     ]);
 
@@ -0,0 +1,88 @@
+import { NextResponse } from 'next/server';
+import path from 'path';
+import { spawn } from 'child_process';
+
+const PYTHON_PATH = path.join(process.cwd(), 'venv', 'bin', 'python3');
+
+export const dynamic = 'force-dynamic';
+
+// Streams a test run's progress events as Server-Sent Events: GET /api/tests/run/stream?testId=...
+export async function GET(request: Request) {
+  const testId = new URL(request.url).searchParams.get('testId');
+
+  if (!testId) {
+    return NextResponse.json(
+      { error: 'Test ID is required' },
+      { status: 400 }
+    );
+  }
+
+  const pythonProcess = spawn(PYTHON_PATH, [
+    path.join(process.cwd(), 'agents', 'worker_client.py'),
+    testId,
+    '--events'
+  ]);
+
+  const encoder = new TextEncoder();
+  const stream = new ReadableStream({
+    start(controller) {
+      let buffered = '';
+      let closed = false;
+
+      const close = () => {
+        if (!closed) {
+          closed = true;
+          controller.close();
+        }
+      };
+
+      // Forward each JSON-lines event as soon as it is complete; anything else is only logged
+      pythonProcess.stdout.on('data', (data) => {
+        buffered += data.toString();
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim() || closed) {
+            continue;
+          }
+          try {
+            JSON.parse(line);
+          } catch {
+            console.log('Python script output:', line);
+            continue;
+          }
+          controller.enqueue(encoder.encode(`data: ${line}\n\n`));
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        console.error('Python script error:', data.toString());
+      });
+
+      pythonProcess.on('close', (code) => {
+        console.log('Python process exited with code:', code);
+        if (!closed) {
+          controller.enqueue(encoder.encode(`event: end\ndata: ${JSON.stringify({ code })}\n\n`));
+        }
+        close();
+      });
+
+      // Client went away: stop the run instead of letting it finish unobserved
+      request.signal.addEventListener('abort', () => {
+        pythonProcess.kill('SIGTERM');
+        close();
+      });
+    },
+    cancel() {
+      pythonProcess.kill('SIGTERM');
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      'Connection': 'keep-alive'
+    }
+  });
+}